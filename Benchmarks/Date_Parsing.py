@@ -0,0 +1,61 @@
+"""
+Benchmark of the vectorized days-to-sell calculation against the original row-by-row apply.
+
+Run from the repository root:
+    python -m Benchmarks.Date_Parsing [rows]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from Pricing.Price_History import calculate_date_difference, days_between
+
+
+def make_pricing_dates(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Build purchase/sale date columns shaped like a real pricing history export:
+    a mix of mm/dd/yyyy strings, yyyy/mm/dd strings, datetimes and a few blanks.
+    """
+    rng = np.random.default_rng(seed)
+    purchase = pd.Timestamp('2019-01-01') + pd.to_timedelta(rng.integers(0, 2000, rows), unit='D')
+    sale = purchase + pd.to_timedelta(rng.integers(0, 365, rows), unit='D')
+
+    def mix(dates):
+        kinds = rng.integers(0, 10, rows)
+        us = dates.strftime('%m/%d/%Y').to_numpy(dtype=object)
+        iso = dates.strftime('%Y/%m/%d').to_numpy(dtype=object)
+        values = np.where(kinds < 5, us, iso).astype(object)
+        as_datetime = kinds == 8
+        values[as_datetime] = dates[as_datetime].to_pydatetime()
+        values[kinds == 9] = None
+        return pd.Series(values, dtype=object)
+
+    return pd.DataFrame({'Purchase Date': mix(purchase), 'Sale Date': mix(sale)})
+
+
+def run(rows: int = 500_000):
+    df = make_pricing_dates(rows)
+
+    start = time.perf_counter()
+    vectorized = days_between(df['Purchase Date'], df['Sale Date'])
+    vectorized_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    row_by_row = df.apply(
+        lambda row: calculate_date_difference(row['Purchase Date'], row['Sale Date']),
+        axis=1
+    )
+    row_by_row_seconds = time.perf_counter() - start
+
+    assert (vectorized.to_numpy() == row_by_row.to_numpy()).all(), 'vectorized result differs'
+
+    print(f'rows            : {rows}')
+    print(f'row-by-row apply: {row_by_row_seconds:.3f} s')
+    print(f'vectorized      : {vectorized_seconds:.3f} s')
+    print(f'speedup         : {row_by_row_seconds / vectorized_seconds:.1f}x')
+
+
+if __name__ == '__main__':
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -1,125 +1,674 @@
-from flask import Flask, render_template, request, jsonify, send_file
-from dash import Dash, dcc, html
-import dash
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+_IMPORT_START = time.perf_counter()
+
 import tempfile
-from Pricing.Ebay_Scraping import scrape_ebay_data
-from Pricing.Price_History import (
-    process_pricing_history, profit_distribution, sale_price_vs_profit,
-    sales_by_condition, days_to_sell_distribution,
-    avg_profit_by_purchase_range, monthly_profit_over_time,
-    profit_margin_distribution, avg_days_to_sell_by_condition, monthly_sales_volume
-)
-from ExcelFormatAPI.FormatReportProduction import format_excel_file
-from ExcelFormatAPI.Auto_Attribute import process_extreme_attributes
+from flask import Flask, render_template, request, jsonify, send_file
+
+from Utilities.Lazy_Import import lazy_import, warm_up as warm_up_modules, import_report, record_startup
+from Utilities.LRU_Cache import LRUCache
+from Utilities.Logger import configure_logging, get_logger, init_app
+from Utilities.Metrics import CONTENT_TYPE, count_bytes, render_metrics
+from Utilities.Profiling import is_artifact, is_authorized, profiled
+
+# Heavy modules (pandas, numpy, plotly, openpyxl, bs4, requests) are only imported
+# by the route or callback that first needs them
+dash = lazy_import('dash')
+ebay_scraping = lazy_import('Pricing.Ebay_Scraping')
+price_history = lazy_import('Pricing.Price_History')
+pricing_dataset = lazy_import('Pricing.Dataset')
+shared_store = lazy_import('Pricing.Shared_Store')
+session_store = lazy_import('Pricing.Session_Store')
+filtering = lazy_import('Pricing.Filtering')
+rendering = lazy_import('Pricing.Rendering')
+price_model = lazy_import('Pricing.Price_Model')
+comparables = lazy_import('Pricing.Comparables')
+summary = lazy_import('Pricing.Summary')
+simulation = lazy_import('Pricing.Simulation')
+inventory_aging = lazy_import('Pricing.Inventory_Aging')
+pd = lazy_import('pandas')
+format_report = lazy_import('ExcelFormatAPI.FormatReportProduction')
+openpyxl = lazy_import('openpyxl')
+auto_attribute = lazy_import('ExcelFormatAPI.Auto_Attribute')
 
 # Initialize Flask app
 app = Flask(__name__)
+configure_logging()
+init_app(app)
+
+logger = get_logger(__name__)
 
 # Global temp file storage
 TEMP_FILES = {}
 
-# Shared DataFrame holder
-df_holder = {'df': process_pricing_history()}  # Initially load placeholder
+# Holder for the current read-only PricingSnapshot (None until a pricing history file is uploaded).
+# Each upload publishes a new snapshot with a higher version, so callbacks read one consistent
+# (version, frame) pair and cached figures from older datasets are never served.
+df_holder = {'snapshot': None}
 
-# -------------------- DASH APP --------------------
-dash_app = Dash(
-    __name__,
-    server=app,
-    url_base_pathname='/dash/'
+# Where uploaded pricing datasets live; exactly one of:
+#   session (default) - each browser session, identified by a cookie or an X-Session-Token header,
+#                       gets its own dataset so analysts don't overwrite each other's uploads
+#   shared            - one dataset for everyone, published to a memory-mapped store that every
+#                       worker process reads instead of only the worker that handled the upload
+#   local             - one dataset held by the worker that handled the upload
+# session and shared need pyarrow; without it the app runs in local mode.
+DATASET_MODES = ('session', 'shared', 'local')
+DATASET_MODE = os.getenv('DATASET_MODE', 'session')
+if DATASET_MODE not in DATASET_MODES:
+    raise ValueError(f"DATASET_MODE must be one of {', '.join(DATASET_MODES)}, not {DATASET_MODE!r}")
+SESSION_COOKIE = 'pricing_session'
+
+# Built figures keyed by (dataset scope, dataset_key, filters, graph name), bounded by the size of their data.
+# The estimate is also reported as each figure's payload in /metrics.
+FIGURE_CACHE = LRUCache(
+    max_bytes=int(os.getenv('FIGURE_CACHE_MB', '256')) * 1024 * 1024,
+    sizeof=lambda fig: rendering.figure_payload_bytes(fig)
 )
 
-# Mapping of graph display names to functions
-graph_functions = {
-    "Profit Distribution": profit_distribution,
-    "Sale Price vs. Profit": sale_price_vs_profit,
-    "Sales by Condition": sales_by_condition,
-    "Days to Sell Distribution": days_to_sell_distribution,
-    "Avg Profit by Purchase Range": avg_profit_by_purchase_range,
-    "Monthly Profit Over Time": monthly_profit_over_time,
-    "Profit Margin Distribution": profit_margin_distribution,
-    "Avg Days to Sell by Condition": avg_days_to_sell_by_condition,
-    "Monthly Sales Volume": monthly_sales_volume
+# Filter indexes keyed by (dataset scope, dataset_key), and filtered views keyed by (scope, dataset_key, filters)
+FILTER_INDEXES = LRUCache(
+    max_bytes=int(os.getenv('FILTER_INDEX_MB', '128')) * 1024 * 1024,
+    sizeof=lambda index: index.nbytes
+)
+FILTERED_VIEWS = LRUCache(
+    max_bytes=int(os.getenv('FILTERED_VIEW_MB', '128')) * 1024 * 1024,
+    sizeof=lambda snapshot: int(snapshot.frame.memory_usage(deep=True).sum())
+)
+
+# Sale outcomes arranged for lot simulations, keyed by (dataset scope, dataset_key)
+EMPIRICAL_SALES = LRUCache(
+    max_bytes=int(os.getenv('SIMULATION_CACHE_MB', '64')) * 1024 * 1024,
+    sizeof=lambda sales: sales.nbytes
+)
+
+# Figures are built on this pool so the charts of one view render in parallel; requests for a
+# figure already being built wait for that build instead of starting another
+FIGURE_WORKERS = int(os.getenv('FIGURE_WORKERS', '4'))
+_figure_pool = None
+_figure_builds = {}  # figure cache key -> Future
+_figure_builds_lock = threading.Lock()
+_figure_pool_lock = threading.Lock()
+
+# With LAZY_CHARTS=1 the "All" view only loads its first EAGER_CHARTS charts up front and the rest
+# as they are scrolled into view
+LAZY_CHARTS = os.getenv('LAZY_CHARTS', '0') == '1'
+EAGER_CHARTS = int(os.getenv('EAGER_CHARTS', '2'))
+
+# -------------------- DASH APP --------------------
+DASH_PREFIX = '/dash/'
+
+# Graph display names mapped to the names of their functions in Pricing.Price_History
+GRAPH_NAMES = {
+    "Profit Distribution": 'profit_distribution',
+    "Sale Price vs. Profit": 'sale_price_vs_profit',
+    "Sales by Condition": 'sales_by_condition',
+    "Days to Sell Distribution": 'days_to_sell_distribution',
+    "Avg Profit by Purchase Range": 'avg_profit_by_purchase_range',
+    "Monthly Profit Over Time": 'monthly_profit_over_time',
+    "Profit Margin Distribution": 'profit_margin_distribution',
+    "Avg Days to Sell by Condition": 'avg_days_to_sell_by_condition',
+    "Monthly Sales Volume": 'monthly_sales_volume',
+    "Top Profit Items by Condition": 'top_profit_items_by_condition',
+    "Sale Price Percentiles by Item": 'sale_price_percentiles_by_item'
 }
 
-# Dash layout
-dash_app.layout = html.Div([
-    html.H1(id="dashboard-title", children="Financial Summary", style={'textAlign': 'center'}),
-
-    html.Div([
-        html.Label("Select View"),
-        dcc.RadioItems(
-            id="view-type",
-            options=[
-                {"label": "Dropdown", "value": "dropdown"},
-                {"label": "All", "value": "all"}
-            ],
-            value="dropdown",
-            labelStyle={"display": "inline-block", 'margin-right': '10px'}
-        )
-    ], style={'margin-bottom': '10px'}),
-
-    html.Div([
-        dcc.Dropdown(
-            id='graph-selector',
-            options=[{'label': name, 'value': name} for name in graph_functions.keys()],
-            value='Profit Distribution',
-            multi=False
+# Inventory aging graph display names mapped to the names of their functions in Pricing.Inventory_Aging
+AGING_GRAPH_NAMES = {
+    "Capital Tied Up by Aging Bucket": 'capital_by_aging_bucket',
+    "Avg Days on Hand by Category and Condition": 'days_on_hand_by_category',
+    "Capital Tied Up by Category and Condition": 'capital_by_category_condition'
+}
+
+# Mapping of graph display names to functions, filled in when the Dash app is built
+graph_functions = {}
+aging_functions = {}
+
+_dash_app = None
+_dash_lock = threading.Lock()
+
+
+def dataset_mode() -> str:
+    """DATASET_MODE in effect: local when the configured mode needs pyarrow and it is missing"""
+    return DATASET_MODE if DATASET_MODE == 'local' or shared_store.is_available() else 'local'
+
+
+def use_shared_store() -> bool:
+    return dataset_mode() == 'shared'
+
+
+def use_sessions() -> bool:
+    return dataset_mode() == 'session'
+
+
+def session_token():
+    """Session token sent with the current request, or None"""
+    token = request.cookies.get(SESSION_COOKIE) or request.headers.get('X-Session-Token')
+    return token if session_store.is_valid_token(token) else None
+
+
+def dataset_scope():
+    """Key of the dataset the current request sees: its session token, or None for the shared dataset"""
+    return session_token() if use_sessions() else None
+
+
+def current_snapshot():
+    """Return the active PricingSnapshot (None until a pricing history file is uploaded)"""
+    if use_sessions():
+        token = session_token()
+        return session_store.sessions.get(token) if token else None
+    if use_shared_store():
+        return shared_store.current_snapshot()
+    return df_holder['snapshot']
+
+
+def publish_snapshot(snapshot, token=None):
+    """Make a snapshot the active dataset of a session, of every worker, or of this worker (see DATASET_MODE)"""
+    if use_sessions():
+        return session_store.sessions.put(token, snapshot)
+    if use_shared_store():
+        snapshot = shared_store.publish(snapshot)
+    df_holder['snapshot'] = snapshot
+    return snapshot
+
+
+def aging_path(token=None):
+    """File the inventory aging is published to (see DATASET_MODE), or None when it stays in this worker"""
+    if use_sessions():
+        token = token or session_token()
+        return session_store.sessions.aging_path(token) if token else None
+    if use_shared_store():
+        return os.path.join(shared_store.STORE_DIR, 'inventory-aging.arrow')
+    return None
+
+
+def current_aging():
+    """Return the active InventoryAging (at version 0 until an all-time inventory is uploaded)"""
+    if use_sessions() and session_token() is None:
+        return inventory_aging.InventoryAging()
+    path = aging_path()
+    return inventory_aging.published_aging(path) if path else inventory_aging.inventory_aging
+
+
+def active_filters(start_date, end_date, conditions, items, cost_min, cost_max):
+    """
+    Collect the dashboard filter values that are set.
+
+    :return: Hashable tuple of (name, value) pairs, or None when no filter is active.
+    """
+    filters = {
+        'start': start_date,
+        'end': end_date,
+        'conditions': tuple(sorted(conditions)) if conditions else None,
+        'items': tuple(sorted(items)) if items else None,
+        'cost_min': cost_min,
+        'cost_max': cost_max
+    }
+    active = tuple((name, value) for name, value in filters.items() if value is not None)
+    return active or None
+
+
+def dataset_key(snapshot):
+    """
+    Identify a dataset in cache keys.
+
+    Versions alone are not unique: they start again at 1 when a session expires or the store is
+    reset, and only the worker that handled an upload invalidates its caches, so the creation time
+    is part of the key too.
+    """
+    return snapshot.version, snapshot.created
+
+
+def filtered_view(snapshot, filters, scope):
+    """Snapshot restricted to the active filters, using the dataset's cached filter index"""
+    if filters is None:
+        return snapshot
+
+    def build():
+        index = FILTER_INDEXES.get_or_create(
+            (scope, dataset_key(snapshot)),
+            lambda: filtering.build_filter_index(snapshot)
         )
-    ], id='dropdown-container', style={'width': '50%', 'margin': '0 auto'}),
-
-    html.Div(id='graph-container', children=html.P("No data loaded. Please upload a pricing history file."))
-])
-
-# Callback to update view
-@dash_app.callback(
-    [
-        dash.Output('dropdown-container', 'style'),
-        dash.Output('graph-container', 'children')
-    ],
-    [
-        dash.Input('view-type', 'value'),
-        dash.Input('graph-selector', 'value')
-    ]
-)
-def update_view(view_type, selected_graph):
-    df = df_holder.get('df')
-    if df is None or df.empty:
-        return {'display': 'none'}, html.P("No data available. Upload a file to see graphs.")
+        return filtering.filtered_snapshot(snapshot, index, **dict(filters))
+
+    return FILTERED_VIEWS.get_or_create((scope, dataset_key(snapshot), filters), build)
+
+
+def empirical_sales(snapshot, scope):
+    """Sale outcomes of a dataset arranged for lot simulations, built once per dataset version"""
+    return EMPIRICAL_SALES.get_or_create(
+        (scope, dataset_key(snapshot)),
+        lambda: simulation.build_empirical_sales(snapshot.frame)
+    )
+
+
+def get_figure_pool():
+    global _figure_pool
+    with _figure_pool_lock:
+        if _figure_pool is None:
+            _figure_pool = ThreadPoolExecutor(max_workers=FIGURE_WORKERS, thread_name_prefix='figure')
+    return _figure_pool
+
+
+def submit_figure(name, snapshot, filters, scope):
+    """
+    Start building a graph on the figure pool unless it is cached or already being built.
+
+    :param name: Display name of the graph (key of graph_functions).
+    :param snapshot: PricingSnapshot to draw from.
+    :param filters: Active filters from active_filters, or None.
+    :param scope: Dataset scope (session token or None); passed in because pool threads have no request.
+    :return: Future resolving to the Plotly figure.
+    """
+    key = (scope, dataset_key(snapshot), filters, name)
+    with _figure_builds_lock:
+        future = _figure_builds.get(key)
+        if future is not None:
+            return future
+
+    cached = FIGURE_CACHE.get(key)
+    if cached is not None:
+        future = Future()
+        future.set_result(cached)
+        return future
+
+    def build():
+        try:
+            return FIGURE_CACHE.put(key, draw_figure(name, filtered_view(snapshot, filters, scope)))
+        finally:
+            with _figure_builds_lock:
+                _figure_builds.pop(key, None)
+
+    with _figure_builds_lock:
+        future = _figure_builds.get(key)
+        if future is None:
+            future = _figure_builds[key] = get_figure_pool().submit(build)
+    return future
+
+
+def get_figure(name, snapshot, filters=None, scope=None):
+    """
+    Return the named graph for a dataset snapshot, building it only on a cache miss.
+
+    :param name: Display name of the graph (key of graph_functions).
+    :param snapshot: PricingSnapshot to draw from.
+    :param filters: Active filters from active_filters, or None.
+    :param scope: Dataset scope (session token or None).
+    :return: Plotly figure object.
+    """
+    return submit_figure(name, snapshot, filters, scope).result()
+
+
+def view_key(snapshot, filters) -> str:
+    """
+    Identify the figures of a dataset version under a set of filters.
+
+    Hashed so the session token that scopes the dataset never reaches the browser.
+    """
+    if snapshot is None:
+        return None
+    raw = repr((dataset_scope(), dataset_key(snapshot), filters))
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
 
-    if view_type == 'all':
-        all_graphs = [
+
+def dashboard_title(snapshot) -> str:
+    return f"Financial Summary of {snapshot.frame['Item'].iloc[0]}"
+
+
+def draw_figure(name, snapshot):
+    """Build a graph, handing aggregate charts the snapshot's precomputed cube"""
+    func = graph_functions[name]
+    if func.__name__ in price_history.CUBE_CHARTS:
+        return func(snapshot.frame, cube=snapshot.cube)
+    return func(snapshot.frame)
+
+
+def create_dash_app():
+    """
+    Build the Dash financial dashboard on its own Flask server.
+
+    Dash, plotly and pandas are only imported here, so deployments that never serve
+    the dashboard never pay for them.
+
+    :return: Dash app instance.
+    """
+    from dash import Dash, dcc, html
+
+    for name, func_name in GRAPH_NAMES.items():
+        graph_functions[name] = getattr(price_history, func_name)
+    for name, func_name in AGING_GRAPH_NAMES.items():
+        aging_functions[name] = getattr(inventory_aging, func_name)
+
+    dash_app = Dash(
+        __name__,
+        server=init_app(Flask('dash')),
+        url_base_pathname=DASH_PREFIX
+    )
+
+    # Dash layout
+    dash_app.layout = html.Div([
+        html.H1(id="dashboard-title", children="Financial Summary", style={'textAlign': 'center'}),
+
+        html.Div([
+            html.Label("Select View"),
+            dcc.RadioItems(
+                id="view-type",
+                options=[
+                    {"label": "Dropdown", "value": "dropdown"},
+                    {"label": "All", "value": "all"}
+                ],
+                value="dropdown",
+                labelStyle={"display": "inline-block", 'margin-right': '10px'}
+            )
+        ], style={'margin-bottom': '10px'}),
+
+        html.Div([
+            dcc.Dropdown(
+                id='graph-selector',
+                options=[{'label': name, 'value': name} for name in graph_functions.keys()],
+                value='Profit Distribution',
+                multi=False
+            )
+        ], id='dropdown-container', style={'width': '50%', 'margin': '0 auto'}),
+
+        html.Div([
+            dcc.DatePickerRange(
+                id='sale-date-filter',
+                start_date_placeholder_text='Sold from',
+                end_date_placeholder_text='Sold to',
+                clearable=True
+            ),
+            dcc.Dropdown(id='condition-filter', multi=True, placeholder='Condition', style={'minWidth': '160px'}),
+            dcc.Dropdown(id='item-filter', multi=True, placeholder='Item', style={'minWidth': '220px'}),
+            dcc.Input(id='cost-min-filter', type='number', placeholder='Min cost', debounce=True),
+            dcc.Input(id='cost-max-filter', type='number', placeholder='Max cost', debounce=True)
+        ], id='filter-container', style={
+            'display': 'flex', 'gap': '10px', 'alignItems': 'center',
+            'justifyContent': 'center', 'flexWrap': 'wrap', 'margin': '10px 0'
+        }),
+
+        html.P(id='graph-message', children="No data loaded. Please upload a pricing history file."),
+
+        # One chart slot per graph. Each is filled by its own callback, so the charts of the "All"
+        # view are built in parallel and appear as they finish; the client shows or hides the
+        # slots, so switching views needs no server call.
+        html.Div([
+            html.Div([
+                html.H3(name, id={'type': 'graph-heading', 'index': name}, style={'textAlign': 'center'}),
+                dcc.Loading(dcc.Graph(id={'type': 'dashboard-graph', 'index': name}, responsive=True)),
+                # Dataset key the client wants this chart for, and the key of the figure it holds
+                dcc.Store(id={'type': 'figure-wanted', 'index': name}),
+                dcc.Store(id={'type': 'figure-key', 'index': name})
+            ], id={'type': 'graph-wrapper', 'index': name}, style={'display': 'none'})
+            for name in graph_functions
+        ], id='graph-container'),
+
+        # Aging of the stock on hand in the uploaded all-time inventory
+        html.Div([
+            html.H2("Inventory Aging", style={'textAlign': 'center'}),
+            html.P(id='aging-message'),
             html.Div([
-                html.H3(name, style={'textAlign': 'center'}),
-                dcc.Graph(figure=func(df))
-            ], style={'marginBottom': '40px'})
-            for name, func in graph_functions.items()
+                dcc.Loading(dcc.Graph(id={'type': 'aging-graph', 'index': name}, responsive=True))
+                for name in aging_functions
+            ])
+        ], id='aging-container'),
+
+        # What-if simulation of buying a lot, drawn from the loaded sales
+        html.Div([
+            html.H3("Lot Profit Simulator", style={'textAlign': 'center'}),
+            dcc.Textarea(
+                id='lot-input',
+                placeholder="One line per item: Item, Condition, Quantity",
+                style={'width': '100%', 'height': '100px'}
+            ),
+            dcc.Input(id='lot-cost', type='number', placeholder='Purchase cost of the lot', min=0),
+            html.Button("Simulate", id='simulate-button', n_clicks=0),
+            html.P(id='simulation-summary'),
+            dcc.Loading(dcc.Graph(id='simulation-graph', responsive=True))
+        ], id='simulation-container', style={'width': '60%', 'margin': '20px auto'}),
+
+        # Title, message and key of the current dataset version and filters (no figures)
+        dcc.Store(id='dataset-info'),
+        dcc.Location(id='url')
+    ])
+
+    filter_states = [
+        dash.State('sale-date-filter', 'start_date'),
+        dash.State('sale-date-filter', 'end_date'),
+        dash.State('condition-filter', 'value'),
+        dash.State('item-filter', 'value'),
+        dash.State('cost-min-filter', 'value'),
+        dash.State('cost-max-filter', 'value')
+    ]
+
+    # Callback to describe the current dataset and filters, and start building the charts in view
+    @dash_app.callback(
+        dash.Output('dataset-info', 'data'),
+        [
+            dash.Input('url', 'pathname'),
+            dash.Input('sale-date-filter', 'start_date'),
+            dash.Input('sale-date-filter', 'end_date'),
+            dash.Input('condition-filter', 'value'),
+            dash.Input('item-filter', 'value'),
+            dash.Input('cost-min-filter', 'value'),
+            dash.Input('cost-max-filter', 'value')
+        ],
+        [
+            dash.State('view-type', 'value'),
+            dash.State('graph-selector', 'value')
         ]
-        return {'display': 'none'}, all_graphs
+    )
+    def update_dataset_info(pathname, start_date, end_date, conditions, items, cost_min, cost_max,
+                            view_type, selected_graph):
+        snapshot = current_snapshot()
+        if snapshot is None or snapshot.empty:
+            return {'key': None, 'loaded': False, 'title': "Financial Summary",
+                    'message': "No data available. Upload a file to see graphs."}
 
-    # Dropdown view: one graph only
-    if selected_graph and selected_graph in graph_functions:
-        fig = graph_functions[selected_graph](df)
-        return {'width': '50%', 'margin': '0 auto', 'display': 'block'}, dcc.Graph(figure=fig)
+        scope = dataset_scope()
+        filters = active_filters(start_date, end_date, conditions, items, cost_min, cost_max)
+        if filters is not None and filtered_view(snapshot, filters, scope).empty:
+            return {'key': view_key(snapshot, filters), 'loaded': True, 'title': dashboard_title(snapshot),
+                    'message': "No sales match the selected filters."}
 
-    return {'width': '50%', 'margin': '0 auto', 'display': 'block'}, html.P("Please select a valid graph.")
+        # Prefetch: the per-chart callbacks that follow pick up these builds instead of starting their own
+        names = list(graph_functions)
+        if view_type == 'all':
+            prefetch = names[:EAGER_CHARTS] if LAZY_CHARTS else names
+        else:
+            prefetch = [selected_graph] if selected_graph in graph_functions else []
+        for name in prefetch:
+            submit_figure(name, snapshot, filters, scope)
 
-# Callback to update title
-@dash_app.callback(
-    dash.Output('dashboard-title', 'children'),
-    dash.Input('view-type', 'value')
-)
-def update_title(view_type):
-    df = df_holder.get('df')
-    if df is not None and 'Item' in df.columns and len(df) > 0:
-        return f"Financial Summary of {df['Item'].iloc[0]}"
-    return "Financial Summary"
+        return {'key': view_key(snapshot, filters), 'loaded': True, 'title': dashboard_title(snapshot),
+                'message': None, 'lazy': LAZY_CHARTS, 'eager': EAGER_CHARTS}
+
+    # Callback to build one chart, run once per chart the client asks for
+    @dash_app.callback(
+        [
+            dash.Output({'type': 'dashboard-graph', 'index': dash.MATCH}, 'figure'),
+            dash.Output({'type': 'figure-key', 'index': dash.MATCH}, 'data')
+        ],
+        dash.Input({'type': 'figure-wanted', 'index': dash.MATCH}, 'data'),
+        [dash.State({'type': 'figure-wanted', 'index': dash.MATCH}, 'id')] + filter_states,
+        prevent_initial_call=True
+    )
+    def load_figure(wanted_key, component_id, start_date, end_date, conditions, items, cost_min, cost_max):
+        snapshot = current_snapshot()
+        if wanted_key is None or snapshot is None or snapshot.empty:
+            raise dash.exceptions.PreventUpdate
+
+        filters = active_filters(start_date, end_date, conditions, items, cost_min, cost_max)
+        key = view_key(snapshot, filters)
+        fig = get_figure(component_id['index'], snapshot, filters, dataset_scope())
+        return fig, key
+
+    # View switching, graph selection and lazy loading happen in the browser (assets/dashboard.js)
+    dash_app.clientside_callback(
+        dash.ClientsideFunction(namespace='dashboard', function_name='updateView'),
+        [
+            dash.Output('dropdown-container', 'style'),
+            dash.Output('graph-message', 'children'),
+            dash.Output({'type': 'graph-wrapper', 'index': dash.ALL}, 'style'),
+            dash.Output({'type': 'graph-heading', 'index': dash.ALL}, 'style'),
+            dash.Output({'type': 'figure-wanted', 'index': dash.ALL}, 'data')
+        ],
+        [
+            dash.Input('view-type', 'value'),
+            dash.Input('graph-selector', 'value'),
+            dash.Input('dataset-info', 'data')
+        ],
+        [
+            dash.State({'type': 'graph-wrapper', 'index': dash.ALL}, 'id'),
+            dash.State({'type': 'figure-key', 'index': dash.ALL}, 'data')
+        ]
+    )
+
+    dash_app.clientside_callback(
+        dash.ClientsideFunction(namespace='dashboard', function_name='updateTitle'),
+        dash.Output('dashboard-title', 'children'),
+        dash.Input('dataset-info', 'data')
+    )
+
+    # Callback to fill the filter choices from the loaded dataset
+    @dash_app.callback(
+        [
+            dash.Output('condition-filter', 'options'),
+            dash.Output('item-filter', 'options'),
+            dash.Output('sale-date-filter', 'min_date_allowed'),
+            dash.Output('sale-date-filter', 'max_date_allowed')
+        ],
+        dash.Input('url', 'pathname')
+    )
+    def update_filter_options(pathname):
+        snapshot = current_snapshot()
+        if snapshot is None or snapshot.empty:
+            return [], [], None, None
+
+        index = FILTER_INDEXES.get_or_create(
+            (dataset_scope(), dataset_key(snapshot)),
+            lambda: filtering.build_filter_index(snapshot)
+        )
+        dates = index.sale_dates[:index.dated]
+        first, last = (str(dates[0])[:10], str(dates[-1])[:10]) if len(dates) else (None, None)
+        return list(index.conditions), list(index.items), first, last
+
+    # Callback to draw the inventory aging charts, cached per inventory version and day
+    @dash_app.callback(
+        [
+            dash.Output({'type': 'aging-graph', 'index': dash.ALL}, 'figure'),
+            dash.Output('aging-message', 'children')
+        ],
+        dash.Input('url', 'pathname')
+    )
+    def update_aging_graphs(pathname):
+        aging = current_aging()
+        if aging.version == 0:
+            return [{}] * len(aging_functions), "No inventory loaded. Upload an all-time inventory to see its aging."
+
+        as_of = time.strftime('%Y-%m-%d')
+        cells = None
+        figures = []
+        for name, func in aging_functions.items():
+            key = (dataset_scope(), 'inventory', aging.version, aging.updated, as_of, name)
+            fig = FIGURE_CACHE.get(key)
+            if fig is None:
+                cells = aging.cells(as_of) if cells is None else cells
+                fig = func(cells)
+                FIGURE_CACHE.put(key, fig)
+            figures.append(fig)
+        return figures, f"Stock on hand as of {as_of} (inventory version {aging.version})."
+
+    # Callback to simulate the profit of the lot entered
+    @dash_app.callback(
+        [
+            dash.Output('simulation-graph', 'figure'),
+            dash.Output('simulation-summary', 'children')
+        ],
+        dash.Input('simulate-button', 'n_clicks'),
+        [
+            dash.State('lot-input', 'value'),
+            dash.State('lot-cost', 'value')
+        ],
+        prevent_initial_call=True
+    )
+    def simulate(n_clicks, lot_text, purchase_cost):
+        snapshot = current_snapshot()
+        if snapshot is None or snapshot.empty:
+            return dash.no_update, "No data loaded. Please upload a pricing history file."
+        try:
+            lot = simulation.parse_lot(lot_text)
+        except ValueError:
+            return dash.no_update, "Quantities must be numbers."
+        if not lot or purchase_cost is None:
+            return dash.no_update, "Enter the lot's items and its purchase cost."
+
+        result = simulation.simulate_lot(empirical_sales(snapshot, dataset_scope()), lot, purchase_cost)
+        stats = result.as_dict()
+        return simulation.simulation_figure(result), (
+            f"Expected profit ${stats['expected_profit']:,.2f}; "
+            f"P10 ${stats['profit_quantiles']['P10']:,.2f}, P90 ${stats['profit_quantiles']['P90']:,.2f}; "
+            f"{100 * stats['loss_probability']:.1f}% chance of loss; "
+            f"lot sold within {stats['days_to_clear_quantiles']['P90']:.0f} days in 90% of scenarios."
+        )
+
+    return dash_app
+
+
+def get_dash_app():
+    """Return the Dash app, building it on first use"""
+    global _dash_app
+    if _dash_app is None:
+        with _dash_lock:
+            if _dash_app is None:
+                start = time.perf_counter()
+                _dash_app = create_dash_app()
+                record_startup('dash_app', time.perf_counter() - start)
+    return _dash_app
+
+
+class LazyDashMiddleware:
+    """WSGI middleware that sends dashboard requests to the Dash app, building it on the first one"""
+
+    def __init__(self, wsgi_app, prefix):
+        self.wsgi_app = wsgi_app
+        self.prefix = prefix
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if path.startswith(self.prefix) or path == self.prefix.rstrip('/'):
+            return get_dash_app().server.wsgi_app(environ, start_response)
+        return self.wsgi_app(environ, start_response)
+
+
+app.wsgi_app = LazyDashMiddleware(app.wsgi_app, DASH_PREFIX)
+
+
+def warm_up():
+    """
+    Preload every heavy module and build the Dash app.
+
+    Call from a pre-fork server's master process (e.g. a gunicorn ``on_starting`` hook with
+    ``--preload``, or set WARM_UP=1) so workers start with everything already imported.
+
+    :return: Import report after warm-up.
+    """
+    warm_up_modules()
+    get_dash_app()
+    return import_report()
 
 # -------------------- FLASK ROUTES --------------------
 @app.route('/format-excel', methods=['POST'])
+@profiled(TEMP_FILES)
 def format_excel():
     file_storage = request.files['file']
+    count_bytes('format_excel_file', request.content_length or 0)
     try:
-        workbook = format_excel_file(file_storage)
+        workbook = format_report.format_excel_file(file_storage)
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
         workbook.save(temp_file.name)
 
@@ -133,13 +682,16 @@ def format_excel():
             mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
     except Exception as e:
+        logger.exception("Request failed: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/format-extreme', methods=['POST'])
+@profiled(TEMP_FILES)
 def attribute():
     file_storage = request.files['file']
+    count_bytes('process_extreme_attributes', request.content_length or 0)
     try:
-        workbook = process_extreme_attributes(file_storage)
+        workbook = auto_attribute.process_extreme_attributes(file_storage)
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
         workbook.save(temp_file.name)
 
@@ -153,15 +705,19 @@ def attribute():
             mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
     except Exception as e:
+        logger.exception("Request failed: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/download/<filename>')
 def download_file(filename):
     if filename in TEMP_FILES:
+        if is_artifact(TEMP_FILES[filename]) and not is_authorized():
+            return "Profiling artifacts require the X-Profile-Token header.", 403
         return send_file(TEMP_FILES[filename], as_attachment=True)
     return "File not found or expired.", 404
 
 @app.route('/upload-pricing-history', methods=['POST'])
+@profiled(TEMP_FILES)
 def upload_pricing_history():
     file = request.files.get('file')
     if not file:
@@ -170,12 +726,211 @@ def upload_pricing_history():
     try:
         temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
         file.save(temp_file.name)
-        df_holder['df'] = process_pricing_history(temp_file.name)
-        return jsonify({'success': True})
+        count_bytes('process_pricing_history', os.path.getsize(temp_file.name))
+        token = (session_token() or session_store.new_token()) if use_sessions() else None
+        current = current_snapshot()
+        version = current.version + 1 if current is not None else 1
+
+        # mode=append adds a new period to the loaded history instead of replacing it
+        if request.values.get('mode') == 'append' and current is not None:
+            snapshot = pricing_dataset.append_pricing_snapshot(current, temp_file.name, version)
+        else:
+            snapshot = pricing_dataset.load_pricing_snapshot(temp_file.name, version)
+        publish_snapshot(snapshot, token)
+        for cache in (FIGURE_CACHE, FILTER_INDEXES, FILTERED_VIEWS, EMPIRICAL_SALES):
+            cache.invalidate(lambda key: key[0] == token)
+
+        if token is None:
+            return jsonify({'success': True})
+        response = jsonify({'success': True, 'session': token})
+        response.set_cookie(SESSION_COOKIE, token, httponly=True, samesite='Lax')
+        return response
+    except pricing_dataset.SchemaError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
+        logger.exception("Request failed: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/price-inventory', methods=['POST'])
+@profiled(TEMP_FILES)
+def price_inventory():
+    """
+    Price inventory rows with the trained model.
+
+    A JSON body {"rows": [{spec column: value, ...}, ...]} gets {"prices": [...]} back; an uploaded
+    inventory workbook gets the same rows back as a formatted workbook with a Predicted Price column.
+    """
+    file = request.files.get('file')
+    data = None if file else request.get_json(silent=True)
+    if not file and (not data or not isinstance(data.get('rows'), list)):
+        return jsonify({'error': 'No inventory rows provided'}), 400
+
+    try:
+        model = price_model.get_model()
+    except FileNotFoundError:
+        return jsonify({'error': 'No price model has been trained'}), 503
+
+    try:
+        if data is not None:
+            prices = price_model.predict_prices(pd.DataFrame(data['rows']), model)
+            return jsonify({'prices': [round(float(price), 2) for price in prices]})
+
+        count_bytes('price_inventory_file', request.content_length or 0)
+        priced = price_model.price_inventory(pd.read_excel(file), model)
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
+        workbook = openpyxl.Workbook(write_only=True)
+        format_report.write_formatted_sheet(workbook, priced, 'Priced Inventory')
+        workbook.save(temp_file.name)
+
+        filename = temp_file.name.split('/')[-1]
+        TEMP_FILES[filename] = temp_file.name
+
+        return send_file(
+            temp_file.name,
+            as_attachment=True,
+            download_name="priced_inventory.xlsx",
+            mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+    except Exception as e:
+        logger.exception("Request failed: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/comparables', methods=['POST'])
+def find_comparables():
+    """Sold items most similar to a device: {"item": {spec column: value, ...}, "k": 10}"""
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('item'), dict):
+        return jsonify({'error': 'No item provided'}), 400
+
+    try:
+        k = int(data.get('k', comparables.DEFAULT_K))
+        index = comparables.store_comparables()
+        nearest = index.nearest(data['item'], k)
+        return app.response_class(
+            '{"comparables": %s}' % nearest.to_json(orient='records', date_format='iso'),
+            content_type='application/json'
+        )
+    except Exception as e:
+        logger.exception("Request failed: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/pricing-summary')
+def pricing_summary():
+    """
+    Summary of the active pricing history: the standard tables, or one top-K / percentile query.
+
+    Query parameters: k, quantiles (comma-separated levels), and optionally top=<column> with
+    group=<column> and order=asc, or percentiles=<column> with by=<column>.
+    """
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return jsonify({'error': 'No pricing history loaded'}), 404
+
+    try:
+        k = int(request.args.get('k', summary.DEFAULT_K))
+        quantiles = [float(level) for level in request.args.get('quantiles', '0.1,0.5,0.9').split(',')]
+    except ValueError:
+        return jsonify({'error': 'k must be an integer and quantiles comma-separated numbers'}), 400
+    if not all(0 <= level <= 1 for level in quantiles):  # also rejects nan
+        return jsonify({'error': 'quantiles must be between 0 and 1'}), 400
+    if k < 0:
+        return jsonify({'error': 'k must not be negative'}), 400
+
+    try:
+        frame = snapshot.frame
+        if request.args.get('top'):
+            tables = {'top': summary.top_k(frame, request.args['top'], k, group=request.args.get('group'),
+                                           largest=request.args.get('order') != 'asc')}
+        elif request.args.get('percentiles'):
+            tables = {'percentiles': summary.grouped_quantiles(frame, request.args['percentiles'],
+                                                               request.args.get('by', 'Item'), quantiles)}
+        else:
+            tables = summary.summarize(frame, k, quantiles)
+        return jsonify({
+            'version': snapshot.version,
+            'tables': {name: summary.as_records(table) for name, table in tables.items()}
+        })
+    except KeyError as e:
+        return jsonify({'error': f'Unknown column: {e}'}), 400
+    except Exception as e:
+        logger.exception("Request failed: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/upload-inventory', methods=['POST'])
+@profiled(TEMP_FILES)
+def upload_inventory():
+    """
+    Load a newer all-time inventory workbook; the aging report only reprocesses rows that changed.
+
+    The aging is published like pricing datasets (see DATASET_MODE), so every worker serves it.
+    """
+    file = request.files.get('file')
+    if not file:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    try:
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".xlsx")
+        file.save(temp_file.name)
+        count_bytes('process_all_time_inventory', os.path.getsize(temp_file.name))
+        token = (session_token() or session_store.new_token()) if use_sessions() else None
+        inventory = inventory_aging.read_inventory(temp_file.name)
+        path = aging_path(token)
+        if path is None:
+            changes = inventory_aging.inventory_aging.update(inventory)
+        else:
+            changes = inventory_aging.publish_update(path, inventory)
+
+        if token is None:
+            return jsonify({'success': True, **changes})
+        response = jsonify({'success': True, 'session': token, **changes})
+        response.set_cookie(SESSION_COOKIE, token, httponly=True, samesite='Lax')
+        return response
+    except Exception as e:
+        logger.exception("Request failed: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/inventory-aging')
+def inventory_aging_report():
+    """Stock on hand per category and condition; as_of=<date> measures ages at another date than today"""
+    aging = current_aging()
+    if aging.version == 0:
+        return jsonify({'error': 'No inventory loaded'}), 404
+
+    try:
+        report = aging.report(request.args.get('as_of'))
+        return jsonify({'version': aging.version, 'report': summary.as_records(report.reset_index())})
+    except Exception as e:
+        logger.exception("Request failed: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/simulate-lot', methods=['POST'])
+def simulate_lot():
+    """
+    Monte Carlo profit of buying a lot from the active pricing history:
+    {"lot": [{"item": ..., "condition": ..., "quantity": n}, ...], "purchase_cost": x, "scenarios": n, "seed": n}
+    """
+    snapshot = current_snapshot()
+    if snapshot is None:
+        return jsonify({'error': 'No pricing history loaded'}), 404
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('lot'), list) or data.get('purchase_cost') is None:
+        return jsonify({'error': 'A lot and its purchase cost are required'}), 400
+
+    try:
+        result = simulation.simulate_lot(
+            empirical_sales(snapshot, dataset_scope()),
+            data['lot'],
+            float(data['purchase_cost']),
+            int(data.get('scenarios', simulation.DEFAULT_SCENARIOS)),
+            data.get('seed')
+        )
+        return jsonify({'version': snapshot.version, **result.as_dict()})
+    except Exception as e:
+        logger.exception("Request failed: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/scrape-ebay', methods=['POST'])
+@profiled(TEMP_FILES)
 def scrape_ebay():
     data = request.get_json()  # <-- parse JSON payload
 
@@ -186,15 +941,29 @@ def scrape_ebay():
     pages = int(data.get('pages', 1))
 
     try:
-        result = scrape_ebay_data(query, pages)
+        result = ebay_scraping.scrape_ebay_data(query, pages)
         return jsonify({'results': result})
     except Exception as e:
+        logger.exception("Request failed: %s", e)
         return jsonify({'error': str(e)}), 500
 
+@app.route('/metrics')
+def metrics():
+    return app.response_class(render_metrics(), content_type=CONTENT_TYPE)
+
+@app.route('/import-report')
+def import_time_report():
+    return jsonify(import_report())
+
 @app.route('/')
 def home():
     return render_template('index.html')
 
+record_startup('app_import', time.perf_counter() - _IMPORT_START)
+
+if os.getenv('WARM_UP') == '1':
+    warm_up()
+
 # -------------------- MAIN --------------------
 if __name__ == '__main__':
     app.run(debug=True)
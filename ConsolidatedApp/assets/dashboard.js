@@ -0,0 +1,101 @@
+// Client-side callbacks for the financial dashboard.
+// Every chart slot keeps the figure it was last given; switching views and picking a graph only
+// show or hide slots, and a chart is requested from the server (by setting its figure-wanted store
+// to the current dataset key) only when it is shown and does not yet hold the current figure.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    dashboard: {
+        // Dataset key each chart was last requested for, so a chart is never requested twice
+        _requested: {},
+        _observer: null,
+
+        _wrapperElement: function (name) {
+            return document.getElementById(JSON.stringify({index: name, type: 'graph-wrapper'}));
+        },
+
+        // Request charts below the fold once they scroll into view
+        _observeLazy: function (names, key) {
+            const dashboard = window.dash_clientside.dashboard;
+            if (dashboard._observer) {
+                dashboard._observer.disconnect();
+            }
+            if (!names.length || !('IntersectionObserver' in window)) {
+                names.forEach(function (name) { dashboard._request(name, key); });
+                return;
+            }
+            dashboard._observer = new IntersectionObserver(function (entries, observer) {
+                entries.forEach(function (entry) {
+                    if (entry.isIntersecting) {
+                        observer.unobserve(entry.target);
+                        dashboard._request(JSON.parse(entry.target.id).index, key);
+                    }
+                });
+            }, {rootMargin: '200px'});
+            // Wait for the slots to be shown before observing them
+            setTimeout(function () {
+                names.forEach(function (name) {
+                    const element = dashboard._wrapperElement(name);
+                    if (element) {
+                        dashboard._observer.observe(element);
+                    }
+                });
+            }, 0);
+        },
+
+        _request: function (name, key) {
+            const dashboard = window.dash_clientside.dashboard;
+            if (dashboard._requested[name] !== key) {
+                dashboard._requested[name] = key;
+                window.dash_clientside.set_props({index: name, type: 'figure-wanted'}, {data: key});
+            }
+        },
+
+        updateView: function (viewType, selectedGraph, info, wrapperIds, figureKeys) {
+            const dashboard = window.dash_clientside.dashboard;
+            const noUpdate = window.dash_clientside.no_update;
+            const names = wrapperIds.map(function (id) { return id.index; });
+            const loaded = Boolean(info && info.loaded);
+            const key = info ? info.key : null;
+
+            const dropdownStyle = viewType === 'all' || !loaded
+                ? {display: 'none'}
+                : {width: '50%', margin: '0 auto', display: 'block'};
+
+            let message = info ? info.message : 'No data loaded. Please upload a pricing history file.';
+            if (!message && viewType !== 'all' && names.indexOf(selectedGraph) < 0) {
+                message = 'Please select a valid graph.';
+            }
+
+            const visible = names.map(function (name) {
+                return !message && (viewType === 'all' || name === selectedGraph);
+            });
+            const wrapperStyles = visible.map(function (show) {
+                return show ? {display: 'block', marginBottom: '40px'} : {display: 'none'};
+            });
+            const headingStyles = names.map(function () {
+                return viewType === 'all' ? {textAlign: 'center'} : {display: 'none'};
+            });
+
+            const lazy = [];
+            const wanted = names.map(function (name, i) {
+                if (!visible[i] || figureKeys[i] === key || dashboard._requested[name] === key) {
+                    return noUpdate;
+                }
+                if (viewType === 'all' && info.lazy && i >= info.eager) {
+                    lazy.push(name);
+                    return noUpdate;
+                }
+                dashboard._requested[name] = key;
+                return key;
+            });
+            if (viewType === 'all' && info && info.lazy) {
+                dashboard._observeLazy(lazy, key);
+            }
+
+            return [dropdownStyle, message || null, wrapperStyles, headingStyles, wanted];
+        },
+
+        updateTitle: function (info) {
+            return info && info.title ? info.title : 'Financial Summary';
+        }
+    }
+});
@@ -3,6 +3,7 @@ from dotenv import load_dotenv
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.workbook import Workbook
 from ExcelFormatAPI.FormatReportProduction import process_workbook
+from Utilities.Metrics import timed, count_rows
 
 
 load_dotenv()
@@ -201,9 +202,11 @@ def process_extreme_desktops(df: pd.DataFrame):
     return dash_df, desktop_df
 
 
+@timed('process_extreme_attributes')
 def process_extreme_attributes(workbook):
     try:
         raw_dataframe = pd.read_excel(workbook)
+        count_rows('process_extreme_attributes', len(raw_dataframe))
 
         device_type = raw_dataframe['Category'].iloc[0]
 
@@ -1,11 +1,19 @@
 import json
+import warnings
 from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill, Border, Side, Alignment
 from openpyxl.styles.differential import DifferentialStyle
 from openpyxl.formatting.rule import Rule
-from openpyxl.worksheet.table import Table
+from openpyxl.worksheet.filters import AutoFilter
+from openpyxl.worksheet.table import Table, TableColumn
 from openpyxl.utils import get_column_letter
 
+from Utilities.Logger import get_logger
+from Utilities.Metrics import timed, count_rows
+
+logger = get_logger(__name__)
+
 # TODO: handle description cleaning and copying to notes
 
 # FORMATTING RULES
@@ -77,6 +85,7 @@ def format_header(sheet):
         cell.fill = ORANGE_FILL
 
 
+@timed('autofit')
 def autofit(sheet):
     """Loops through each cell to get longest string and apply column spacing accordingly"""
     for col in sheet.columns:
@@ -109,6 +118,7 @@ def check_no_attribute(sheet, check_empty_range):
     sheet.conditional_formatting.add(check_empty_range, empty)
 
 
+@timed('apply_conditional_formatting')
 def apply_conditional_formatting(sheet, sheet_name):
     """Applies conditional formatting to passed in sheet"""
     max_row = sheet.max_row
@@ -202,7 +212,7 @@ def FOR_TESTING_convert_to_JSON(workbook):
         return json.dumps(json_data)
 
     except Exception as e:
-        print(f"Error converting to JSON: {e}")
+        logger.exception("Error converting to JSON: %s", e)
         raise
 
 def transform_api_response(api_response):
@@ -266,17 +276,18 @@ def format_JSON_data(data):
 
             else:
                 wb.remove(sheet)
-                print(f"Deleted empty sheet: {sheet.title}")
+                logger.debug("Deleted empty sheet: %s", sheet.title)
                 continue
 
         return wb
 
     except Exception as e:
-        print(f"Error formatting JSON data: {e}")
+        logger.debug("Error formatting JSON data: %s", e)
         raise
 
 from openpyxl.workbook.workbook import Workbook as OpenpyxlWorkbook
 
+@timed('copy_data')
 def copy_data(old_wb):
     """Copies data from original excel file and inserts into newly created file"""
 
@@ -292,11 +303,12 @@ def copy_data(old_wb):
 
         # skip empty sheets
         if is_sheet_empty(original_sheet):
-            print(f'{sheet_name} is empty; skipping')
+            logger.debug('%s is empty; skipping', sheet_name)
             continue
 
         # create sheet in new workbook
         new_sheet = wb.create_sheet(title=sheet_name)
+        count_rows('copy_data', original_sheet.max_row - 1)
 
         # copy data from old sheet to new sheet columnwise
         for col in original_sheet.iter_cols():
@@ -320,6 +332,7 @@ def is_sheet_empty(sheet):
     return False
 
 
+@timed('process_workbook')
 def process_workbook(workbook):
     """Processes workbook object and returns formatted workbook object"""
 
@@ -327,7 +340,7 @@ def process_workbook(workbook):
     try:
         if not isinstance(workbook, OpenpyxlWorkbook):
             raise TypeError("Could not process workbook.")
-        print("Valid workbook with sheet names: ", workbook.sheetnames)
+        logger.debug("Valid workbook with sheet names: %s", workbook.sheetnames)
 
         # copy data to new workbook
         wb = copy_data(workbook)
@@ -336,6 +349,7 @@ def process_workbook(workbook):
         for sheet_name in wb.sheetnames:
             # get current sheet
             current_sheet = wb[sheet_name]
+            count_rows('process_workbook', current_sheet.max_row - 1)
 
             # create table
             create_table(current_sheet)
@@ -354,9 +368,10 @@ def process_workbook(workbook):
         return wb
 
     except TypeError as e:
-        print(f"Error occurred: {e}")
+        logger.debug("Error occurred: %s", e)
         raise
 
+@timed('format_excel_file')
 def format_excel_file(excel_file):
     """Formats passed in excel file and returns workbook object"""
     # parameter will be full excel file object
@@ -373,5 +388,70 @@ def format_excel_file(excel_file):
         return processed_workbook
 
     except Exception as e:
-        print(f"Error occurred: {e}")
-        raise
\ No newline at end of file
+        logger.debug("Error occurred: %s", e)
+        raise
+
+def _cell_values(column) -> list:
+    """Values of a DataFrame column as plain Python objects, with None for missing values"""
+    return column.astype(object).where(column.notna(), None).tolist()
+
+
+def _fitted_width(header, values) -> int:
+    """Column width autofit would give: longest non-empty value (header included) plus 3"""
+    return max((len(str(value)) for value in [header, *values] if value), default=0) + 3
+
+
+@timed('write_formatted_sheet')
+def write_formatted_sheet(wb, df, sheet_name='Sheet1'):
+    """
+    Renders a DataFrame straight into a formatted sheet of a write-only workbook.
+
+    Produces the same sheet as writing the frame to Excel and running copy_data, create_table,
+    format_header and autofit on it, without the intermediate file: Description text is cleaned,
+    every cell gets the border and alignment, the header gets the orange fill, columns are fitted
+    and the data is wrapped in a table.
+
+    :param wb: Workbook created with write_only=True.
+    :param df: DataFrame to write (column names become the header).
+    :param sheet_name: Title of the new sheet.
+    :return: The new worksheet.
+    """
+    sheet = wb.create_sheet(title=sheet_name)
+    headers = [str(col) for col in df.columns]
+    columns = []
+    for header, col in zip(headers, df.columns):
+        values = _cell_values(df[col])
+        if header == "Description":
+            values = [clean_text(value) for value in values]
+        columns.append(values)
+
+    # widths must be set before any row is written in write-only mode
+    for index, (header, values) in enumerate(zip(headers, columns), 1):
+        sheet.column_dimensions[get_column_letter(index)].width = _fitted_width(header, values)
+
+    def styled(value, fill=None):
+        cell = WriteOnlyCell(sheet, value=value)
+        cell.border = BORDER
+        cell.alignment = ALIGNMENT
+        if fill is not None:
+            cell.fill = fill
+        return cell
+
+    sheet.append([styled(header, ORANGE_FILL) for header in headers])
+    for row in zip(*columns):
+        sheet.append([styled(value) for value in row])
+    count_rows('write_formatted_sheet', len(df))
+
+    if headers:
+        table_range = f'A1:{get_column_letter(len(headers))}{len(df) + 1}'
+        # write-only sheets cannot read the header back, so the table columns are named here
+        table = Table(
+            displayName=f'Table_{sheet_name.replace(" ", "")}',
+            ref=table_range,
+            autoFilter=AutoFilter(ref=table_range),
+            tableColumns=[TableColumn(id=index, name=header) for index, header in enumerate(headers, 1)]
+        )
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='In write-only mode')
+            sheet.add_table(table)
+    return sheet
@@ -1,14 +1,29 @@
+import os
+import time
+
+_IMPORT_START = time.perf_counter()
+
 import io
 import uuid
-import requests
 from flask import Flask, render_template, request, jsonify, send_file
 import tempfile
 
-from ExcelFormatAPI.Auto_Attribute import process_extreme_attributes
-from ExcelFormatAPI.FormatReportProduction import format_excel_file, format_JSON_data
+from Utilities.Lazy_Import import lazy_import, warm_up, import_report, record_startup
+from Utilities.Logger import configure_logging, get_logger, init_app
+from Utilities.Metrics import CONTENT_TYPE, count_bytes, render_metrics
+from Utilities.Profiling import is_artifact, is_authorized, profiled
+
+# Heavy modules are only imported by the first request that needs them
+requests = lazy_import('requests')
+auto_attribute = lazy_import('ExcelFormatAPI.Auto_Attribute')
+format_report = lazy_import('ExcelFormatAPI.FormatReportProduction')
 
 # Initialize Flask app
 app = Flask(__name__)
+configure_logging()
+init_app(app)
+
+logger = get_logger(__name__)
 
 # Endpoint
 URL = 'https://api.smartimageserve.com/upload'
@@ -34,9 +49,9 @@ def generate_download_link(workbook):
     try:
         workbook.save(file_stream)
         file_stream.seek(0)  # go to beginning of stream before uploading
-        print(f'File generated')
+        logger.debug('File generated')
     except Exception as e:
-        print(f'Error saving file: {e}')
+        logger.exception('Error saving file: %s', e)
 
     # Generate URL
     payload = {'folderName': 'greenteksolutions'}
@@ -59,7 +74,7 @@ def generate_download_link(workbook):
         'secure_url': secure_url,
         'status': status
     }
-    print(output)  # for debugging purposes
+    logger.debug('Upload response: %s', output)
 
     # Return download url for front end to process
     return jsonify({
@@ -76,6 +91,7 @@ def handle_formatting_upload(file_storage, processor_func):
     :param processor_func: Function to process the uploaded file and return an openpyxl Workbook.
     :return: Flask response with the formatted file or JSON error.
     """
+    count_bytes(processor_func.__name__, request.content_length or 0)
     try:
         # Process the uploaded file with the provided function
         workbook = processor_func(file_storage)
@@ -96,24 +112,27 @@ def handle_formatting_upload(file_storage, processor_func):
         )
 
     except Exception as e:
+        logger.exception("Request failed: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/format-excel', methods=['POST'])
+@profiled(TEMP_FILES)
 def format_excel():
     """
     Endpoint for general Excel formatting.
     """
     file_storage = request.files['file']
-    return handle_formatting_upload(file_storage, format_excel_file)
+    return handle_formatting_upload(file_storage, format_report.format_excel_file)
 
 
 @app.route('/format-extreme', methods=['POST'])
+@profiled(TEMP_FILES)
 def format_extreme():
     """
     Endpoint for Extreme Testing formatting.
     """
     file_storage = request.files['file']
-    return handle_formatting_upload(file_storage, process_extreme_attributes)
+    return handle_formatting_upload(file_storage, auto_attribute.process_extreme_attributes)
 
 @app.route('/fetch-data-debugging')
 def fetch_data():
@@ -143,6 +162,7 @@ def home():
     return render_template('index.html')
 
 @app.route('/format')
+@profiled(TEMP_FILES)
 def format_data():
     try:
         # FIXME: make payload dynamic by obtaining data from statistics form
@@ -161,20 +181,53 @@ def format_data():
         data = response.json()
 
         # Format JSON data
-        processed_workbook = format_JSON_data(data)
+        processed_workbook = format_report.format_JSON_data(data)
 
         output = generate_download_link(processed_workbook)
-        print(output)  # for debugging purposes
+        logger.debug('Download link response: %s', output.get_json())
 
         # Return download url for front end to process
         return output
 
     except requests.exceptions.RequestException as e:
+        logger.exception("Request failed: %s", e)
         return jsonify({"error": f"Failed to retrieve data: {str(e)}"}), 500
 
     except Exception as e:
+        logger.exception("Request failed: %s", e)
         return jsonify({"error": f"Something went wrong: {str(e)}"}), 500
 
+@app.route('/download/<filename>')
+def download_file(filename):
+    """
+    Serve a previously generated file (formatted workbook or profiling artifact).
+    """
+    if filename in TEMP_FILES:
+        if is_artifact(TEMP_FILES[filename]) and not is_authorized():
+            return "Profiling artifacts require the X-Profile-Token header.", 403
+        return send_file(TEMP_FILES[filename], as_attachment=True)
+    return "File not found or expired.", 404
+
+@app.route('/metrics')
+def metrics():
+    """
+    Expose per-stage latency histograms and row/byte/error counters in Prometheus text format.
+    """
+    return app.response_class(render_metrics(), content_type=CONTENT_TYPE)
+
+@app.route('/import-report')
+def import_time_report():
+    """
+    Report app import time and which heavy modules have been loaded so far.
+    """
+    return jsonify(import_report())
+
+record_startup('app_import', time.perf_counter() - _IMPORT_START)
+
+# Pre-fork servers can set WARM_UP=1 to import everything in the master process
+if os.getenv('WARM_UP') == '1':
+    warm_up()
+
 if __name__ == '__main__':
     """
     Run the Flask application in debug mode.
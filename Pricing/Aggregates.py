@@ -0,0 +1,209 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Number of purchase cost ranges (matches avg_profit_by_purchase_range)
+COST_BINS = 20
+
+# Resolution of the per-group sale price histogram used for quantiles
+SKETCH_BINS = 128
+
+# Dimensions of the cube, in group order
+CUBE_KEYS = ['month', 'condition', 'cost_bin']
+
+
+@dataclass(frozen=True)
+class AggregateCube:
+    """
+    Compact summary of a pricing history: one row per month x condition x cost bin.
+
+    groups holds count, sums, extremes and non-null counts for each group; price_sketch holds,
+    for the same rows, a histogram of sale prices over price_edges from which quantiles are read.
+    """
+    groups: pd.DataFrame
+    price_sketch: np.ndarray
+    cost_edges: np.ndarray
+    price_edges: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return len(self.groups)
+
+
+def _bin_index(values: pd.Series, edges: np.ndarray) -> np.ndarray:
+    """Bin number of each value (first bin closed on both ends, like pd.cut with include_lowest); -1 if missing"""
+    bins = np.searchsorted(edges, values.to_numpy(dtype='float64', na_value=np.nan), side='left') - 1
+    bins = np.clip(bins, 0, len(edges) - 2)
+    bins[values.isna().to_numpy()] = -1
+    return bins
+
+
+def _month_start(sale_dates: pd.Series) -> pd.Series:
+    if not pd.api.types.is_datetime64_any_dtype(sale_dates):
+        sale_dates = pd.to_datetime(sale_dates, errors='coerce')
+    return sale_dates.dt.to_period('M').dt.to_timestamp()
+
+
+def _edges(values: pd.Series, bins: int) -> np.ndarray:
+    values = values.dropna()
+    if values.empty:
+        return np.array([0.0, 1.0])
+    return np.histogram_bin_edges(values, bins=bins)
+
+
+def build_cube(df: pd.DataFrame, cost_edges: np.ndarray = None, price_edges: np.ndarray = None) -> AggregateCube:
+    """
+    Aggregate a processed pricing history in a single pass.
+
+    :param df: Pricing history with Sale Date, Condition, Purchase Cost, Sale Price, Profit and # Days to sell.
+    :param cost_edges: Purchase cost bin edges; derived from the data when omitted.
+    :param price_edges: Sale price sketch bin edges; derived from the data when omitted.
+    :return: AggregateCube.
+    """
+    cost = pd.to_numeric(df['Purchase Cost'], errors='coerce')
+    price = pd.to_numeric(df['Sale Price'], errors='coerce')
+
+    if cost_edges is None:
+        cost_edges = _edges(cost, COST_BINS)
+    if price_edges is None:
+        price_edges = _edges(price, SKETCH_BINS)
+
+    rows = pd.DataFrame({
+        'month': _month_start(df['Sale Date']).to_numpy(),
+        'condition': df['Condition'].to_numpy(),
+        'cost_bin': _bin_index(cost, cost_edges),
+        'profit': pd.to_numeric(df['Profit'], errors='coerce').to_numpy(),
+        'sale_price': price.to_numpy(),
+        'days': df['# Days to sell'].to_numpy()
+    })
+
+    grouped = rows.groupby(CUBE_KEYS, dropna=False, observed=True, sort=True)
+    groups = grouped.agg(
+        count=('days', 'size'),
+        profit_sum=('profit', 'sum'),
+        profit_n=('profit', 'count'),
+        sale_sum=('sale_price', 'sum'),
+        sale_n=('sale_price', 'count'),
+        sale_min=('sale_price', 'min'),
+        sale_max=('sale_price', 'max'),
+        days_sum=('days', 'sum')
+    ).reset_index()
+
+    # Histogram of sale prices per group, filled with one bincount over (group, price bin) pairs
+    group_ids = grouped.ngroup().to_numpy()
+    price_bins = _bin_index(price, price_edges)
+    valid = price_bins >= 0
+    sketch_bins = len(price_edges) - 1
+    flat = np.bincount(
+        group_ids[valid] * sketch_bins + price_bins[valid],
+        minlength=len(groups) * sketch_bins
+    )
+    price_sketch = flat.reshape(len(groups), sketch_bins)
+
+    return AggregateCube(groups=groups, price_sketch=price_sketch, cost_edges=cost_edges, price_edges=price_edges)
+
+
+def rollup(cube: AggregateCube, by: str) -> pd.DataFrame:
+    """
+    Collapse the cube onto one dimension.
+
+    :param cube: AggregateCube.
+    :param by: One of CUBE_KEYS.
+    :return: DataFrame indexed by the dimension with summed measures plus profit_mean and days_mean.
+    """
+    measures = cube.groups.drop(columns=[key for key in CUBE_KEYS if key != by])
+    summed = measures.groupby(by, observed=True, sort=True).agg(
+        count=('count', 'sum'),
+        profit_sum=('profit_sum', 'sum'),
+        profit_n=('profit_n', 'sum'),
+        sale_sum=('sale_sum', 'sum'),
+        sale_n=('sale_n', 'sum'),
+        sale_min=('sale_min', 'min'),
+        sale_max=('sale_max', 'max'),
+        days_sum=('days_sum', 'sum')
+    )
+    summed['profit_mean'] = summed['profit_sum'] / summed['profit_n'].replace(0, np.nan)
+    summed['days_mean'] = summed['days_sum'] / summed['count']
+    return summed
+
+
+def sketch_quantiles(cube: AggregateCube, by: str, quantiles) -> pd.DataFrame:
+    """
+    Approximate sale price quantiles per value of one dimension from the merged sketches.
+
+    Values are interpolated linearly inside the histogram bin holding each quantile.
+
+    :param cube: AggregateCube.
+    :param by: One of CUBE_KEYS.
+    :param quantiles: Iterable of quantile levels between 0 and 1.
+    :return: DataFrame indexed by the dimension with one column per quantile level.
+    """
+    quantiles = np.asarray(list(quantiles), dtype='float64')
+    labels = cube.groups[by]
+    codes, uniques = pd.factorize(labels, sort=True)
+
+    # Merge the sketches of every group sharing a label
+    merged = np.zeros((len(uniques), cube.price_sketch.shape[1]), dtype='int64')
+    np.add.at(merged, codes[codes >= 0], cube.price_sketch[codes >= 0])
+
+    cumulative = np.cumsum(merged, axis=1)
+    totals = cumulative[:, -1:]
+    targets = quantiles[None, :] * totals  # (labels, quantiles)
+
+    # First bin whose cumulative count reaches each target
+    bins = np.minimum((cumulative[:, None, :] < targets[:, :, None]).sum(axis=2), merged.shape[1] - 1)
+    below = np.take_along_axis(np.hstack([np.zeros_like(totals), cumulative]), bins, axis=1)
+    in_bin = np.take_along_axis(merged, bins, axis=1)
+    fraction = np.where(in_bin > 0, (targets - below) / np.where(in_bin > 0, in_bin, 1), 0.0)
+
+    edges = cube.price_edges
+    values = edges[bins] + np.clip(fraction, 0, 1) * (edges[bins + 1] - edges[bins])
+    values[totals[:, 0] == 0] = np.nan
+
+    return pd.DataFrame(values, index=pd.Index(uniques, name=by), columns=quantiles)
+
+
+def _within(values: pd.Series, edges: np.ndarray) -> bool:
+    values = pd.to_numeric(values, errors='coerce').dropna()
+    return values.empty or (values.min() >= edges[0] and values.max() <= edges[-1])
+
+
+def merge_cube(cube: AggregateCube, new_rows: pd.DataFrame, all_rows: pd.DataFrame) -> AggregateCube:
+    """
+    Fold newly appended rows into an existing cube.
+
+    When the new rows fall inside the cube's cost and price ranges the bin edges of the combined
+    data are unchanged, so only the new rows are aggregated and added group by group. Otherwise the
+    edges move and the cube is rebuilt from all rows.
+
+    :param cube: Cube of the existing rows.
+    :param new_rows: Rows being appended.
+    :param all_rows: Existing and new rows together (only used for a rebuild).
+    :return: AggregateCube of all rows.
+    """
+    if new_rows.empty:
+        return cube
+    if not (_within(new_rows['Purchase Cost'], cube.cost_edges) and _within(new_rows['Sale Price'], cube.price_edges)):
+        return build_cube(all_rows)
+
+    delta = build_cube(new_rows, cost_edges=cube.cost_edges, price_edges=cube.price_edges)
+    stacked = pd.concat([cube.groups, delta.groups], ignore_index=True)
+
+    grouped = stacked.groupby(CUBE_KEYS, dropna=False, observed=True, sort=True)
+    groups = grouped.agg(
+        count=('count', 'sum'),
+        profit_sum=('profit_sum', 'sum'),
+        profit_n=('profit_n', 'sum'),
+        sale_sum=('sale_sum', 'sum'),
+        sale_n=('sale_n', 'sum'),
+        sale_min=('sale_min', 'min'),
+        sale_max=('sale_max', 'max'),
+        days_sum=('days_sum', 'sum')
+    ).reset_index()
+
+    group_ids = grouped.ngroup().to_numpy()
+    price_sketch = np.zeros((len(groups), cube.price_sketch.shape[1]), dtype=cube.price_sketch.dtype)
+    np.add.at(price_sketch, group_ids, np.vstack([cube.price_sketch, delta.price_sketch]))
+
+    return AggregateCube(groups=groups, price_sketch=price_sketch, cost_edges=cube.cost_edges, price_edges=cube.price_edges)
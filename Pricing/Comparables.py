@@ -0,0 +1,265 @@
+import importlib.util
+import threading
+
+import numpy as np
+import pandas as pd
+
+from Pricing.Price_Model import NUMERIC_FEATURES, extract_features, item_specs, spec_frame, spec_key
+from Utilities.Lazy_Import import lazy_import
+from Utilities.Logger import get_logger
+from Utilities.Metrics import count_rows, timed
+
+# scipy is optional: without it every group is searched with a vectorized scan
+spatial = lazy_import('scipy.spatial')
+SCIPY_AVAILABLE = importlib.util.find_spec('scipy') is not None
+
+logger = get_logger(__name__)
+
+# Features a comparable must match exactly
+MATCH_FEATURES = ('cpu_family', 'condition')
+
+# Groups smaller than this are scanned directly, which beats a tree at that size
+TREE_MIN_ROWS = 2048
+
+# Dead rows (replaced by a refresh) tolerated, as a share of all rows, before the index is compacted
+MAX_DEAD_SHARE = 0.5
+
+# Distinct spec combinations whose group and point are remembered for queries
+MAX_CACHED_SPECS = 100_000
+
+DEFAULT_K = 10
+
+
+def spec_points(features: pd.DataFrame) -> np.ndarray:
+    """Numeric specs as points: capacities on a log2 scale so 8 vs 16 GB counts like 256 vs 512 GB"""
+    points = features[list(NUMERIC_FEATURES)].to_numpy(dtype='float64', copy=True)
+    for col, name in enumerate(NUMERIC_FEATURES):
+        if name.endswith('_gb'):
+            points[:, col] = np.log2(1 + points[:, col])
+    return points
+
+
+class _Group:
+    """
+    Rows sharing the exact-match features, indexed by their distinct points.
+
+    Sold items repeat the same specs many times, so distances are computed to each distinct point
+    once (through a k-d tree when the group has many) and the nearest points are expanded to
+    their rows.
+    """
+
+    def __init__(self, rows: np.ndarray, points: np.ndarray):
+        self.points, inverse, self.counts = np.unique(points, axis=0, return_inverse=True, return_counts=True)
+        order = np.argsort(inverse.ravel(), kind='stable')
+        self.rows = rows[order]  # rows of each distinct point are contiguous, in row order
+        self.starts = np.concatenate([[0], np.cumsum(self.counts)[:-1]])
+        self.tree = spatial.cKDTree(self.points) if SCIPY_AVAILABLE and len(self.points) >= TREE_MIN_ROWS else None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _nearest_points(self, point: np.ndarray, k: int):
+        """The k nearest distinct points (enough to hold k rows) and their distances, nearest first"""
+        k = min(k, len(self.points))
+        if self.tree is not None:
+            distances, found = self.tree.query(point, k=k)
+            return np.atleast_1d(found), np.atleast_1d(distances)
+        squared = ((self.points - point) ** 2).sum(axis=1)
+        found = np.argpartition(squared, k - 1)[:k] if k < len(squared) else np.arange(len(squared))
+        found = found[np.argsort(squared[found], kind='stable')]
+        return found, np.sqrt(squared[found])
+
+    def nearest(self, point: np.ndarray, k: int):
+        """Rows and distances of the k nearest items, nearest first"""
+        found, distances = self._nearest_points(point, k)
+        enough = int(np.searchsorted(np.cumsum(self.counts[found]), k)) + 1
+        found, distances = found[:enough], distances[:enough]
+        rows = np.concatenate([self.rows[start:start + count]
+                               for start, count in zip(self.starts[found], self.counts[found])])
+        return rows[:k], np.repeat(distances, self.counts[found])[:k]
+
+
+class ComparablesIndex:
+    """
+    Index of sold items for finding the K most similar ones to a device being priced.
+
+    Rows are grouped by the exact-match features (CPU family and condition by default); within a
+    group, items are points in a space of standardized numeric specs (CPU generation and clock,
+    log RAM and drive size) and the nearest points are the comparables. The scaling is fixed when
+    the index is first built so that adding rows only rebuilds the groups they fall in.
+    """
+
+    def __init__(self, match=MATCH_FEATURES):
+        self.match = tuple(match)
+        self.frame = pd.DataFrame()
+        self.points = np.empty((0, len(NUMERIC_FEATURES)))
+        self.codes = np.empty(0, dtype='int64')
+        self.key_codes = {}  # exact-match key -> group code
+        self.alive = np.empty(0, dtype=bool)
+        self.partitions = np.empty(0, dtype=object)
+        self.groups = {}
+        self.center = None
+        self.scale = None
+        self.stamps = {}  # feature store partition -> revision it was read at
+        self.spec_lookup = {}  # spec_key -> (group key, scaled point)
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    def _group_keys(self, features: pd.DataFrame) -> np.ndarray:
+        columns = [features[name].astype(str).to_numpy(dtype=object) for name in self.match]
+        keys = np.empty(len(features), dtype=object)
+        keys[:] = list(zip(*columns)) if columns else [()] * len(features)
+        return keys
+
+    def _scaled(self, points: np.ndarray) -> np.ndarray:
+        # unknown specs sit at the center so they neither attract nor repel
+        return np.nan_to_num((points - self.center) / self.scale, nan=0.0)
+
+    def _remember(self, specs: pd.DataFrame, keys: np.ndarray, scaled: np.ndarray):
+        """Remember the group and point of each distinct spec combination, so queries skip parsing"""
+        first = np.flatnonzero(~specs.duplicated().to_numpy())
+        for row, values in zip(first, specs.iloc[first].itertuples(index=False)):
+            if len(self.spec_lookup) >= MAX_CACHED_SPECS:
+                break
+            self.spec_lookup.setdefault(spec_key(values), (keys[row], scaled[row]))
+
+    def _locate(self, item: dict):
+        """Group key and scaled point of an item to look up"""
+        specs = item_specs(item)
+        found = self.spec_lookup.get(specs)
+        if found is None:
+            features = extract_features(pd.DataFrame([item]))
+            found = (self._group_keys(features)[0], self._scaled(spec_points(features))[0])
+            if len(self.spec_lookup) < MAX_CACHED_SPECS:
+                self.spec_lookup[specs] = found
+        return found
+
+    def _codes(self, keys: np.ndarray) -> np.ndarray:
+        """Integer code of each group key, assigning new codes to keys not seen before"""
+        for key in keys:
+            if key not in self.key_codes:
+                self.key_codes[key] = len(self.key_codes)
+        return np.fromiter((self.key_codes[key] for key in keys), dtype='int64', count=len(keys))
+
+    def _rebuild(self, codes):
+        """Rebuild the groups with the given codes from their live rows"""
+        labels = {code: key for key, code in self.key_codes.items()}
+        for code in codes:
+            rows = np.flatnonzero((self.codes == code) & self.alive)
+            if len(rows):
+                self.groups[labels[code]] = _Group(rows, self.points[rows])
+            else:
+                self.groups.pop(labels[code], None)
+
+    @timed('comparables_extend')
+    def extend(self, sold: pd.DataFrame, partitions=None):
+        """
+        Add sold items, rebuilding only the groups that receive rows.
+
+        :param sold: Merged pricing/spec rows (see Pricing.Price_Model.SPEC_COLUMNS).
+        :param partitions: Feature store partition of every row (or one for all rows), if any.
+        """
+        if not len(sold):
+            return
+        features = extract_features(sold)
+        raw = spec_points(features)
+        if self.center is None:
+            self.center = np.nan_to_num(np.nanmean(np.where(np.isnan(raw).all(axis=0), 0.0, raw), axis=0))
+            self.scale = np.nan_to_num(np.nanstd(np.where(np.isnan(raw).all(axis=0), 0.0, raw), axis=0))
+            self.scale[self.scale == 0] = 1.0
+
+        keys = self._group_keys(features)
+        scaled = self._scaled(raw)
+        self._remember(spec_frame(sold), keys, scaled)
+
+        codes = self._codes(keys)
+        sold = sold.reset_index(drop=True)
+        self.frame = pd.concat([self.frame, sold], ignore_index=True) if len(self.frame.columns) else sold
+        self.points = np.vstack([self.points, scaled])
+        self.codes = np.concatenate([self.codes, codes])
+        self.alive = np.concatenate([self.alive, np.ones(len(sold), dtype=bool)])
+        self.partitions = np.concatenate([self.partitions, np.broadcast_to(np.asarray(partitions, dtype=object), len(sold))])
+        self._rebuild(np.unique(codes))
+        count_rows('comparables_extend', len(sold))
+
+    def remove_partitions(self, names):
+        """Drop the rows of feature store partitions, rebuilding only the groups that held them"""
+        dropped = self.alive & np.isin(self.partitions, list(names))
+        if dropped.any():
+            self.alive &= ~dropped
+            self._rebuild(np.unique(self.codes[dropped]))
+
+    def compact(self):
+        """Rebuild from the live rows only, keeping the scaling"""
+        live = np.flatnonzero(self.alive)
+        self.frame = self.frame.iloc[live].reset_index(drop=True)
+        self.points, self.codes, self.partitions = self.points[live], self.codes[live], self.partitions[live]
+        self.alive = np.ones(len(live), dtype=bool)
+        self.groups = {}
+        self._rebuild(np.unique(self.codes))
+
+    def refresh(self, store) -> list:
+        """
+        Bring the index up to date with a feature store, re-reading only the partitions ingested
+        since the last refresh.
+
+        :param store: Pricing.Feature_Store.FeatureStore.
+        :return: Names of the partitions re-read.
+        """
+        partitions = store.partitions()
+        changed = [name for name, info in sorted(partitions.items()) if self.stamps.get(name) != info['revision']]
+        if changed:
+            frames = [store.read_partition(name) for name in changed]
+            self.remove_partitions(changed)
+            self.extend(
+                pd.concat(frames, ignore_index=True),
+                np.repeat(np.array(changed, dtype=object), [len(frame) for frame in frames])
+            )
+            self.stamps.update({name: partitions[name]['revision'] for name in changed})
+        if len(self.alive) and (~self.alive).mean() > MAX_DEAD_SHARE:
+            self.compact()
+        return changed
+
+    def nearest(self, item: dict, k: int = DEFAULT_K) -> pd.DataFrame:
+        """
+        The k sold items most similar to a device.
+
+        :param item: The device's spec columns (same names as the sold rows, e.g. Processor,
+            RAM Capacity, Drive Capacity, Condition).
+        :param k: Number of comparables.
+        :return: Sold rows, nearest first, with a 'Distance' column (0 means identical specs);
+            empty when no sold item matches the exact-match features.
+
+        Specs already seen in the sold history are not parsed again, which keeps a query well
+        under a millisecond.
+        """
+        if self.center is None or k <= 0:
+            return self.frame.iloc[:0].assign(Distance=pd.Series(dtype='float64'))
+        key, point = self._locate(item)
+        group = self.groups.get(key)
+        if group is None:
+            return self.frame.iloc[:0].assign(Distance=pd.Series(dtype='float64'))
+
+        rows, distances = group.nearest(point, k)
+        return self.frame.iloc[rows].assign(Distance=distances).reset_index(drop=True)
+
+
+_lock = threading.Lock()
+_index = {'index': None}
+
+
+def store_comparables(store=None) -> ComparablesIndex:
+    """
+    Comparables index over the feature store, built on first use and refreshed incrementally
+    whenever partitions are ingested.
+    """
+    if store is None:
+        from Pricing.Feature_Store import features as store
+    with _lock:
+        if _index['index'] is None:
+            _index['index'] = ComparablesIndex()
+        changed = _index['index'].refresh(store)
+        if changed:
+            logger.info("Comparables index refreshed %d partitions (%d items)", len(changed), len(_index['index']))
+        return _index['index']
@@ -0,0 +1,241 @@
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from Pricing.Aggregates import AggregateCube, build_cube, merge_cube
+from Pricing.Price_History import parse_dates, days_between, process_pricing_history
+from Pricing.Serial_Join import normalize_sn
+from Utilities.Logger import get_logger
+
+logger = get_logger(__name__)
+
+# Copy-on-Write guarantees that frames derived from a snapshot never write back into it.
+# It is always on from pandas 3; pandas 2.x needs it switched on.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Columns every chart depends on
+REQUIRED_COLUMNS = [
+    'Item',
+    'Condition',
+    'Purchase Date',
+    'Purchase Cost',
+    'Sale Date',
+    'Sale Price',
+    'Profit'
+]
+
+# Final dtype of each known column, applied once at ingest
+DATE_COLUMNS = ['Purchase Date', 'Sale Date']
+NUMERIC_COLUMNS = ['Purchase Cost', 'Sale Price', 'Profit', 'Revenue Share']
+CATEGORICAL_COLUMNS = ['Condition', 'Status']
+
+DAYS_TO_SELL = '# Days to sell'
+
+# Columns that identify one sale; appended rows matching an existing key are skipped.
+# Appending needs the SN column: without it distinct sales on the same day at the same price would collide.
+DEDUP_KEY = ['SN', 'Sale Date', 'Sale Price']
+
+
+class SchemaError(ValueError):
+    """Raised when an uploaded pricing history is missing required columns"""
+
+
+@dataclass(frozen=True)
+class PricingSnapshot:
+    """
+    Read-only, versioned view of a processed pricing history and its aggregate cube.
+
+    Rows are ordered by Sale Date (missing dates last) so date ranges are contiguous slices.
+
+    Chart functions receive snapshot.frame directly and must treat it as immutable; with
+    Copy-on-Write any frame they derive from it is independent, so no defensive copies are needed
+    and concurrent callbacks can share one snapshot without locks.
+
+    The frozen dataclass only stops its fields being replaced: the frame object itself is shared by
+    every reader, so code must never assign a column or write values through snapshot.frame
+    (derive a frame with assign, a filter or copy instead, which costs nothing until written).
+    tests/test_dataset.py runs every chart, summary and filter over a snapshot to check this.
+    """
+    version: int
+    frame: pd.DataFrame
+    cube: AggregateCube = None
+    keys: np.ndarray = None
+    created: float = field(default_factory=time.time)
+
+    @property
+    def empty(self) -> bool:
+        return self.frame.empty
+
+    @property
+    def rows(self) -> int:
+        return len(self.frame)
+
+
+def validate_schema(df: pd.DataFrame):
+    """
+    Check that all required columns are present.
+
+    :param df: Processed pricing history DataFrame.
+    :raises SchemaError: If any required column is missing.
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise SchemaError(f"Pricing history is missing required columns: {', '.join(missing)}")
+
+
+def convert_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert every known column to its final dtype.
+
+    Dates become datetime64 (NaT where unparseable), money columns float64 and
+    low-cardinality text columns categorical.
+
+    :param df: Processed pricing history DataFrame.
+    :return: New DataFrame with converted columns.
+    """
+    converted = {}
+    for col in df.columns:
+        values = df[col]
+        if col in DATE_COLUMNS:
+            values = parse_dates(values)
+        elif col in NUMERIC_COLUMNS:
+            values = pd.to_numeric(values, errors='coerce').astype('float64')
+        elif col in CATEGORICAL_COLUMNS:
+            values = values.astype('category')
+        converted[col] = values
+
+    typed = pd.DataFrame(converted, index=df.index)
+
+    # Derived once here so no chart has to recompute it
+    if DAYS_TO_SELL not in typed.columns:
+        typed[DAYS_TO_SELL] = days_between(typed['Purchase Date'], typed['Sale Date'])
+
+    return typed.reset_index(drop=True)
+
+
+def sort_by_sale_date(frame: pd.DataFrame, keys: np.ndarray = None):
+    """
+    Order rows by Sale Date, keeping the original order among equal dates.
+
+    :param frame: Typed pricing history frame.
+    :param keys: Optional row keys to reorder alongside the frame.
+    :return: Sorted frame, or (frame, keys) when keys are given.
+    """
+    order = np.argsort(frame['Sale Date'].to_numpy(), kind='stable')  # NaT sorts last
+    sorted_frame = frame.take(order).reset_index(drop=True)
+    if keys is None:
+        return sorted_frame
+    return sorted_frame, keys[order]
+
+
+def ingest_pricing_history(df: pd.DataFrame, version: int) -> PricingSnapshot:
+    """
+    Validate and type a processed pricing history and publish it as a snapshot.
+
+    :param df: Output of process_pricing_history.
+    :param version: Version number of the new snapshot.
+    :return: PricingSnapshot ready to hand to chart functions.
+    """
+    validate_schema(df)
+    frame = sort_by_sale_date(convert_dtypes(df))
+    snapshot = PricingSnapshot(version=version, frame=frame, cube=build_cube(frame), keys=row_keys(frame))
+    logger.info("Published pricing snapshot v%d with %d rows", version, snapshot.rows)
+    return snapshot
+
+
+def load_pricing_snapshot(filepath: str, version: int) -> PricingSnapshot:
+    """
+    Read a pricing history Excel file and publish it as a snapshot.
+
+    :param filepath: Path to the pricing history workbook.
+    :param version: Version number of the new snapshot.
+    :return: PricingSnapshot.
+    """
+    result = process_pricing_history(filepath)
+    if isinstance(result, Exception):
+        raise result
+    return ingest_pricing_history(result, version)
+
+
+def row_keys(frame: pd.DataFrame) -> np.ndarray:
+    """
+    Hash each row's DEDUP_KEY columns (those present) into one 64-bit key.
+
+    :param frame: Typed pricing history frame.
+    :return: uint64 array with one key per row.
+    """
+    columns = [col for col in DEDUP_KEY if col in frame.columns]
+    key_frame = frame[columns]
+    if 'SN' in columns:
+        # serial numbers may arrive as numbers in one file and text in another
+        key_frame = key_frame.assign(SN=normalize_sn(key_frame['SN']))
+    return pd.util.hash_pandas_object(key_frame, index=False).to_numpy()
+
+
+def _concat_frames(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
+    """Concatenate two typed frames, keeping categorical columns categorical"""
+    combined = pd.concat([old, new], ignore_index=True)
+    for col in CATEGORICAL_COLUMNS:
+        if col in old.columns and col in new.columns:
+            combined[col] = union_categoricals([old[col], new[col]], ignore_order=True)
+    return combined
+
+
+def append_pricing_history(snapshot: PricingSnapshot, df: pd.DataFrame, version: int) -> PricingSnapshot:
+    """
+    Publish a new snapshot with the rows of a newly uploaded period added to an existing one.
+
+    Only the new rows are typed and have their derived columns computed; rows whose DEDUP_KEY
+    already exists, in the snapshot or earlier in the same file, are skipped, and the aggregate
+    cube is updated incrementally.
+
+    :param snapshot: Current snapshot.
+    :param df: Output of process_pricing_history for the new file.
+    :param version: Version number of the new snapshot.
+    :return: PricingSnapshot containing the old and new rows.
+    :raises SchemaError: If the new file has no SN column.
+    """
+    validate_schema(df)
+    if 'SN' not in df.columns:
+        raise SchemaError('Appending a pricing history needs its SN column to skip sales already loaded')
+    new_frame = convert_dtypes(df)
+    new_keys = row_keys(new_frame)
+
+    fresh = ~np.isin(new_keys, snapshot.keys) & ~pd.Series(new_keys).duplicated().to_numpy()
+    new_frame = new_frame[fresh].reset_index(drop=True)
+    new_keys = new_keys[fresh]
+
+    frame, keys = sort_by_sale_date(
+        _concat_frames(snapshot.frame, new_frame),
+        np.concatenate([snapshot.keys, new_keys])
+    )
+    appended = PricingSnapshot(
+        version=version,
+        frame=frame,
+        cube=merge_cube(snapshot.cube, new_frame, frame),
+        keys=keys
+    )
+    logger.info(
+        "Appended %d new rows (%d duplicates skipped) to pricing snapshot v%d -> v%d",
+        len(new_frame), int((~fresh).sum()), snapshot.version, version
+    )
+    return appended
+
+
+def append_pricing_snapshot(snapshot: PricingSnapshot, filepath: str, version: int) -> PricingSnapshot:
+    """
+    Read a pricing history Excel file covering a new period and append it to a snapshot.
+
+    :param snapshot: Current snapshot.
+    :param filepath: Path to the new pricing history workbook.
+    :param version: Version number of the new snapshot.
+    :return: PricingSnapshot.
+    """
+    result = process_pricing_history(filepath)
+    if isinstance(result, Exception):
+        raise result
+    return append_pricing_history(snapshot, result, version)
@@ -1,6 +1,13 @@
+import logging
 import requests, re, numpy as np
 from bs4 import BeautifulSoup
 
+from Utilities.Logger import get_logger, debug_sampled
+from Utilities.Metrics import timed, count_rows, count_bytes
+
+logger = get_logger(__name__)
+
+@timed('fetch_ebay_data')
 def fetch_ebay_data(search: str, num_pages: int = 5):
     """Fetch eBay data for a given search term and number of pages"""
     prices = []
@@ -14,10 +21,11 @@ def fetch_ebay_data(search: str, num_pages: int = 5):
 
         # Send GET request to eBay
         response = requests.get(url)
+        count_bytes('fetch_ebay_data', len(response.content))
 
         # Check if the request was successful
         if response.status_code != 200:
-            print(f'Error fetching data from eBay: {response.status_code}')
+            logger.warning('Error fetching data from eBay: %s', response.status_code)
             continue
 
         # Parse the HTML content of the page
@@ -26,14 +34,14 @@ def fetch_ebay_data(search: str, num_pages: int = 5):
         # Handle zero results
         page_text = soup.get_text().lower()
         if '0 results found for' in page_text:
-            print(f'0 sold results found for "{search}".')
+            logger.info('0 sold results found for "%s".', search)
 
         # Find all price elements on the page
         price_elements = soup.find_all('span', class_='s-item__price')
 
         # If no price elements found, then page is empty or there is an issue
         if not price_elements:
-            print(f'No results found on page {page}. Stopping further requests.')
+            logger.info('No results found on page %d. Stopping further requests.', page)
             break  # Scraping stopped if no results found
 
         # Extract the price from each element
@@ -49,7 +57,7 @@ def fetch_ebay_data(search: str, num_pages: int = 5):
                     high_price = float(re.sub(r'[^\d.]', '', high_price))  # Clean and convert the high price
                     price = (low_price + high_price) / 2  # Use the average of the range
                 except ValueError:
-                    print(f'Error parsing price range: {price_text}')
+                    debug_sampled(logger, 'price_range_parse', 'Error parsing price range: %s', price_text)
                     continue  # Skip this price if there's a parsing error
             else:
                 try:
@@ -60,14 +68,16 @@ def fetch_ebay_data(search: str, num_pages: int = 5):
                     if price < 20.0:
                         continue
                 except ValueError:
-                    print(f'Error parsing price: {price_text}')
+                    debug_sampled(logger, 'price_parse', 'Error parsing price: %s', price_text)
                     continue  # Skip this price if it can't be parsed
 
             prices.append(price)
 
+    count_rows('fetch_ebay_data', len(prices))
+
     # Handle the case where no valid prices were found
     if not prices:
-        print('No valid prices found.')
+        logger.info('No valid prices found for "%s".', search)
         return []
 
     return prices
@@ -79,7 +89,7 @@ def remove_outliers(prices: list):
     prices = np.array(prices)
     if len(prices) < 4:
         return prices # Not enough to filter
-    print(f'Unfiltered prices: {prices}')
+    logger.debug('Unfiltered prices: %s', prices)
 
     # Calculate Q1 & Q3 (25th and 75th percentile)
     q1 = np.percentile(prices, 25)
@@ -94,25 +104,26 @@ def remove_outliers(prices: list):
     lower_bound = round(max(q1 - 1.5 * iqr, 20), 2)
     upper_bound = round(q3 + 1.5 * iqr,2)
 
-    print(f'lower bound: {lower_bound}\nupper bound: {upper_bound}')
+    logger.debug('lower bound: %s, upper bound: %s', lower_bound, upper_bound)
 
     # Exclude outliers
     filtered_prices = prices[(prices >= lower_bound) & (prices <= upper_bound)]
-    removed_prices = prices[~(prices >= lower_bound) | ~(prices <= upper_bound)].tolist()
-    print(f'Removed prices: {removed_prices}')
+    if logger.isEnabledFor(logging.DEBUG):
+        removed_prices = prices[~(prices >= lower_bound) | ~(prices <= upper_bound)].tolist()
+        logger.debug('Removed prices: %s', removed_prices)
     return filtered_prices
 
 
 def calculate_price_statistics(prices: list):
     """Calculate average price, highest price, and lowest price from a list of prices"""
     if len(prices) == 0:
-        print('No data for search term')
+        logger.info('No data for search term')
         return None
 
     # Remove outliers
     filtered_prices = remove_outliers(prices)
 
-    print(f'Filtered prices: {filtered_prices}')
+    logger.debug('Filtered prices: %s', filtered_prices)
 
     return np.mean(filtered_prices), max(filtered_prices), min(filtered_prices)
 
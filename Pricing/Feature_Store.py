@@ -0,0 +1,274 @@
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from Pricing.Serial_Join import normalize_sn
+from Utilities.Atomic_Write import write_atomic
+from Utilities.Columnar_Cache import PYARROW_AVAILABLE, file_digest, make_arrow_compatible
+from Utilities.Lazy_Import import lazy_import
+from Utilities.Logger import configure_logging, get_logger
+from Utilities.Metrics import count_bytes, count_rows, timed
+
+try:
+    import fcntl
+except ImportError:  # Windows: ingests are still serialized within one process
+    fcntl = None
+
+pa = lazy_import('pyarrow')
+pq = lazy_import('pyarrow.parquet')
+
+logger = get_logger(__name__)
+
+# Root of the month-partitioned merged sales and testing data
+FEATURE_STORE_DIR = os.getenv('FEATURE_STORE_DIR', os.path.join(tempfile.gettempdir(), 'work-projects-features'))
+
+# Rows are partitioned by the month of this column
+PARTITION_COLUMN = 'Sales Date'
+
+# Partition of rows without a sale date
+UNDATED = 'undated'
+
+MANIFEST = 'manifest.json'
+DATA_FILE = 'data.parquet'
+
+
+def is_available() -> bool:
+    return PYARROW_AVAILABLE
+
+
+def partition_names(dates: pd.Series) -> pd.Series:
+    """Partition of each row: its month as 'YYYY-MM', or 'undated'"""
+    months = pd.to_datetime(dates, errors='coerce').dt.strftime('%Y-%m')
+    return months.fillna(UNDATED)
+
+
+def row_identity(frame: pd.DataFrame) -> pd.Series:
+    """Normalized serial number plus sale date; a later ingest of the same sale replaces the earlier row"""
+    dates = pd.to_datetime(frame[PARTITION_COLUMN], errors='coerce').astype('string')
+    return normalize_sn(frame['SN']).fillna('') + '|' + dates.fillna('')
+
+
+def source_key(*filepaths: str) -> str:
+    """Identity of a set of source files by content, so the same sources are never ingested twice"""
+    return hashlib.sha256('|'.join(file_digest(path) for path in filepaths).encode()).hexdigest()
+
+
+class _StoreLock:
+    """Exclusive lock across processes (and threads) while the store is being written"""
+
+    _thread_lock = threading.Lock()
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            self._file = open(os.path.join(self.root, 'ingest.lock'), 'w')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        self._thread_lock.release()
+
+
+class FeatureStore:
+    """
+    Merged recovered revenue and testing data kept as one Parquet file per sale month.
+
+    A manifest lists every partition with its row count, columns, date range and the revision
+    (ingest number) that last wrote it, and the sources already ingested. Ingesting rewrites only
+    the partitions holding the new rows; queries read only the partitions overlapping the
+    requested dates and only the requested columns.
+    """
+
+    def __init__(self, root: str = FEATURE_STORE_DIR):
+        self.root = root
+
+    def _partition_path(self, name: str) -> str:
+        return os.path.join(self.root, f'month={name}', DATA_FILE)
+
+    def manifest(self) -> dict:
+        try:
+            with open(os.path.join(self.root, MANIFEST)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'partitions': {}, 'sources': {}}
+
+    def _write_manifest(self, manifest: dict):
+        def write(path):
+            with open(path, 'w') as f:
+                json.dump(manifest, f, indent=2, sort_keys=True)
+
+        write_atomic(os.path.join(self.root, MANIFEST), write)
+
+    def partitions(self) -> dict:
+        """Partition name to its manifest entry (rows, revision, columns, first and last sale date)"""
+        return self.manifest()['partitions']
+
+    def read_partition(self, name: str, columns=None) -> pd.DataFrame:
+        """One partition's rows, optionally only some of its columns"""
+        path = self._partition_path(name)
+        if columns is not None:
+            present = set(pq.read_schema(path).names)
+            columns = [col for col in columns if col in present]
+        return pq.read_table(path, columns=columns).to_pandas()
+
+    def _write_partition(self, name: str, frame: pd.DataFrame, revision: int) -> dict:
+        path = self._partition_path(name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        table = pa.Table.from_pandas(make_arrow_compatible(frame), preserve_index=False)
+        write_atomic(path, lambda temp_path: pq.write_table(table, temp_path))
+        count_bytes('feature_store_write', os.path.getsize(path))
+
+        dates = pd.to_datetime(frame[PARTITION_COLUMN], errors='coerce')
+        return {
+            'rows': len(frame),
+            'revision': revision,
+            'columns': [str(col) for col in frame.columns],
+            'first': None if dates.isna().all() else dates.min().isoformat(),
+            'last': None if dates.isna().all() else dates.max().isoformat(),
+            'updated': datetime.now().isoformat(timespec='seconds')
+        }
+
+    @timed('feature_store_ingest')
+    def ingest(self, frame: pd.DataFrame, source: str = None) -> list:
+        """
+        Add merged rows to the store, rewriting only the month partitions they fall in.
+
+        Within a partition a row replaces any earlier row for the same serial number and sale date.
+
+        :param frame: Merged DataFrame (see Pricing.ML_Export.merged_inventory).
+        :param source: Identity of the sources the rows came from (see source_key); sources already
+            ingested are skipped.
+        :return: Names of the partitions rewritten.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with _StoreLock(self.root):
+            manifest = self.manifest()
+            if source is not None and source in manifest['sources']:
+                logger.info("Sources already in the feature store; nothing to ingest")
+                return []
+
+            revision = manifest.get('revision', 0) + 1
+            touched = []
+            names = partition_names(frame[PARTITION_COLUMN])
+            for name, rows in frame.groupby(names.to_numpy(), sort=True):
+                if name in manifest['partitions']:
+                    rows = pd.concat([self.read_partition(name), rows], ignore_index=True)
+                rows = rows[~row_identity(rows).duplicated(keep='last')]
+                rows = rows.sort_values(PARTITION_COLUMN, kind='stable').reset_index(drop=True)
+                manifest['partitions'][name] = self._write_partition(name, rows, revision)
+                touched.append(name)
+
+            manifest['revision'] = revision
+            if source is not None:
+                manifest['sources'][source] = {'rows': len(frame), 'ingested': datetime.now().isoformat(timespec='seconds')}
+            self._write_manifest(manifest)
+
+        count_rows('feature_store_ingest', len(frame))
+        logger.info("Ingested %d rows into %d feature store partitions", len(frame), len(touched))
+        return touched
+
+    def ingest_files(self, recovered_revenue: str, all_time: str) -> list:
+        """
+        Merge a recovered revenue report with an all-time inventory and ingest the result,
+        unless these exact files were ingested before.
+
+        :return: Names of the partitions rewritten.
+        """
+        source = source_key(recovered_revenue, all_time)
+        if source in self.manifest()['sources']:
+            logger.info("Sources already in the feature store; nothing to ingest")
+            return []
+
+        from Pricing.ML_Export import merged_inventory
+        return self.ingest(merged_inventory(recovered_revenue, all_time), source)
+
+    def _pruned(self, start, end) -> list:
+        """Partitions that can hold rows sold between start and end"""
+        names = sorted(self.partitions())
+        if start is None and end is None:
+            return names
+        first = pd.Timestamp(start).strftime('%Y-%m') if start is not None else None
+        last = pd.Timestamp(end).strftime('%Y-%m') if end is not None else None
+        return [
+            name for name in names
+            if name != UNDATED and (first is None or name >= first) and (last is None or name <= last)
+        ]
+
+    @timed('feature_store_query')
+    def query(self, columns=None, start=None, end=None) -> pd.DataFrame:
+        """
+        Read a slice of the store.
+
+        :param columns: Columns to read, or None for all; columns missing from a partition are NA.
+        :param start: First sale date to include, or None.
+        :param end: Last sale date to include (the whole day), or None.
+        :return: DataFrame of the matching rows in sale date order (undated rows last).
+        """
+        dated = start is not None or end is not None
+        read_columns = columns
+        if columns is not None and dated and PARTITION_COLUMN not in columns:
+            read_columns = [*columns, PARTITION_COLUMN]
+
+        frames = []
+        for name in self._pruned(start, end):
+            part = self.read_partition(name, read_columns)
+            if dated:
+                dates = pd.to_datetime(part[PARTITION_COLUMN], errors='coerce')
+                keep = dates.notna()
+                if start is not None:
+                    keep &= dates >= pd.Timestamp(start)
+                if end is not None:
+                    keep &= dates < pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+                part = part[keep]
+            frames.append(part)
+
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        result = pd.concat(frames, ignore_index=True)
+        if columns is not None:
+            result = result.reindex(columns=columns)
+        count_rows('feature_store_query', len(result))
+        return result
+
+
+# Store used by the apps and scripts in this process
+features = FeatureStore()
+
+
+def main(argv=None):
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Maintain the month-partitioned feature store.")
+    parser.add_argument('--root', default=FEATURE_STORE_DIR, help="Feature store directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest = commands.add_parser('ingest', help="Merge and ingest a recovered revenue report")
+    ingest.add_argument('recovered_revenue', help="Recovered revenue workbook")
+    ingest.add_argument('all_time', help="All-time inventory workbook")
+    commands.add_parser('partitions', help="List the partitions")
+    args = parser.parse_args(argv)
+
+    if not is_available():
+        parser.error("the feature store requires pyarrow")
+
+    store = FeatureStore(args.root)
+    if args.command == 'ingest':
+        touched = store.ingest_files(args.recovered_revenue, args.all_time)
+        print(f"Rewrote {len(touched)} partitions: {', '.join(touched)}")
+    else:
+        for name, info in sorted(store.partitions().items()):
+            print(f"{name}: {info['rows']} rows")
+
+
+if __name__ == "__main__":
+    main()
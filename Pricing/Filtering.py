@@ -0,0 +1,131 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from Pricing.Aggregates import build_cube
+from Pricing.Dataset import PricingSnapshot
+
+
+@dataclass(frozen=True)
+class FilterIndex:
+    """
+    Lookup structures for filtering one snapshot without scanning the whole frame.
+
+    The snapshot's frame is already sorted by Sale Date, so sale_dates is sorted too (with the
+    rows missing a date after the first `dated` rows) and a date range is two binary searches.
+    Condition and Item are kept as integer codes so a selection becomes a table lookup.
+    """
+    sale_dates: np.ndarray
+    dated: int
+    condition_codes: np.ndarray
+    conditions: np.ndarray
+    item_codes: np.ndarray
+    items: np.ndarray
+    cost: np.ndarray
+
+    @property
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in (self.sale_dates, self.condition_codes, self.item_codes, self.cost))
+
+
+def _codes(values: pd.Series):
+    """Integer code of each value (-1 if missing) and the labels, as strings, the codes refer to"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), np.asarray(values.cat.categories.astype(str), dtype=object)
+    codes, labels = pd.factorize(values, sort=True)
+    return codes, np.asarray(labels.astype(str), dtype=object)
+
+
+def build_filter_index(snapshot: PricingSnapshot) -> FilterIndex:
+    """
+    Build the filter index of a snapshot.
+
+    :param snapshot: PricingSnapshot whose frame is sorted by Sale Date.
+    :return: FilterIndex.
+    """
+    frame = snapshot.frame
+    sale_dates = frame['Sale Date'].to_numpy()
+    condition_codes, conditions = _codes(frame['Condition'])
+    item_codes, items = _codes(frame['Item'])
+
+    return FilterIndex(
+        sale_dates=sale_dates,
+        dated=int((~np.isnat(sale_dates)).sum()),
+        condition_codes=condition_codes,
+        conditions=conditions,
+        item_codes=item_codes,
+        items=items,
+        cost=frame['Purchase Cost'].to_numpy(dtype='float64', na_value=np.nan)
+    )
+
+
+def _selection(codes: np.ndarray, labels: np.ndarray, selected) -> np.ndarray:
+    """Rows whose code is one of the selected labels; the extra False entry catches missing (-1) codes"""
+    allowed = np.append(np.isin(labels, list(selected)), False)
+    return allowed[codes]
+
+
+def filter_rows(index: FilterIndex, start=None, end=None, conditions=None, items=None,
+                cost_min=None, cost_max=None):
+    """
+    Locate the rows matching every active filter.
+
+    The date range narrows the search to a contiguous slice first; the other filters are combined
+    as boolean masks over that slice only.
+
+    :param index: FilterIndex of the snapshot.
+    :param start: First sale date to include (anything pd.Timestamp accepts), or None.
+    :param end: Last sale date to include (the whole day), or None.
+    :param conditions: Conditions to keep, or None/empty for all.
+    :param items: Items to keep, or None/empty for all.
+    :param cost_min: Lowest purchase cost to keep, or None.
+    :param cost_max: Highest purchase cost to keep, or None.
+    :return: (slice of the sorted frame, boolean mask over that slice or None when every row matches).
+    """
+    low, high = 0, len(index.sale_dates)
+    if start is not None or end is not None:
+        dates = index.sale_dates[:index.dated]
+        unit = dates.dtype
+        high = index.dated  # rows without a sale date never match a date range
+        if start is not None:
+            low = int(np.searchsorted(dates, pd.Timestamp(start).to_datetime64().astype(unit), side='left'))
+        if end is not None:
+            day_after = (pd.Timestamp(end).normalize() + pd.Timedelta(days=1)).to_datetime64().astype(unit)
+            high = int(np.searchsorted(dates, day_after, side='left'))
+        high = max(low, high)
+
+    rows = slice(low, high)
+    mask = None
+
+    def combine(part):
+        nonlocal mask
+        mask = part if mask is None else mask & part
+
+    if conditions:
+        combine(_selection(index.condition_codes[rows], index.conditions, conditions))
+    if items:
+        combine(_selection(index.item_codes[rows], index.items, items))
+    if cost_min is not None:
+        combine(index.cost[rows] >= cost_min)
+    if cost_max is not None:
+        combine(index.cost[rows] <= cost_max)
+
+    return rows, mask
+
+
+def filtered_snapshot(snapshot: PricingSnapshot, index: FilterIndex, **filters) -> PricingSnapshot:
+    """
+    Snapshot of the rows matching the filters, with its own cube.
+
+    :param snapshot: PricingSnapshot to filter.
+    :param index: FilterIndex of the snapshot.
+    :param filters: Keyword arguments of filter_rows.
+    :return: PricingSnapshot with the same version (and created time) as the original.
+    """
+    rows, mask = filter_rows(index, **filters)
+    view = snapshot.frame.iloc[rows]
+    if mask is not None:
+        view = view[mask]
+    view = view.reset_index(drop=True)
+    return PricingSnapshot(version=snapshot.version, frame=view, cube=build_cube(view), created=snapshot.created)
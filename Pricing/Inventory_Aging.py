@@ -0,0 +1,428 @@
+import json
+import os
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from Pricing.Price_History import parse_dates, process_all_time_inventory
+from Pricing.Sheet_Reader import SHEET_COLUMN
+from Utilities.Atomic_Write import write_arrow_table, write_atomic
+from Utilities.Lazy_Import import lazy_import
+from Utilities.LRU_Cache import LRUCache
+from Utilities.Logger import get_logger
+from Utilities.Metrics import count_bytes, count_rows, timed
+
+try:
+    import fcntl
+except ImportError:  # Windows: updates are still serialized within one process
+    fcntl = None
+
+pa = lazy_import('pyarrow')
+px = lazy_import('plotly.express')
+
+logger = get_logger(__name__)
+
+# Inventory columns used, each with the names it goes by across sheets and exports. The all-time
+# inventory has one sheet per category, so rows are tagged with their sheet (see read_sheets).
+AGING_COLUMNS = {
+    'category': (SHEET_COLUMN, 'Category'),
+    'condition': ('Condition',),
+    'received': ('Date Received', 'Added Date', 'Added'),
+    'cost': ('Cost', 'Purchase Cost'),
+    'quantity': ('QTY', 'Quantity'),
+    'status': ('Status',)
+}
+
+# Statuses of items no longer on hand (compared case-insensitively)
+SOLD_STATUSES = tuple(
+    status.strip().lower()
+    for status in os.getenv('INVENTORY_SOLD_STATUSES', 'Sold,Shipped,Invoiced,Scrapped,Recycled').split(',')
+)
+
+# Lower bounds (in days on hand) of the aging buckets
+AGING_BUCKETS = (0, 30, 60, 90, 180, 365)
+BUCKET_LABELS = [f'{low}-{high - 1}' for low, high in zip(AGING_BUCKETS, AGING_BUCKETS[1:])] + [f'{AGING_BUCKETS[-1]}+']
+UNDATED = 'Undated'
+UNCATEGORIZED = 'Uncategorized'
+
+# Received day of rows without a received date
+NO_DATE = -1
+
+GROUP = ['Category', 'Condition']
+
+# Published aging states kept in memory by each worker, keyed by (file, file stamp)
+AGING_CACHE_BYTES = int(os.getenv('AGING_CACHE_MB', '64')) * 1024 * 1024
+
+# A published file is marked as used at most this often (session files expire by their mtime)
+TOUCH_INTERVAL_SECONDS = 60
+
+HASH_COLUMN = '__row_hash'
+METADATA_KEY = b'inventory_aging'
+
+
+def _pick(frame: pd.DataFrame, names):
+    """First of a field's column names present in the frame, or None"""
+    return next((name for name in names if name in frame.columns), None)
+
+
+def read_columns() -> list:
+    """Every column name the aging report may use, for reading only those from the workbook"""
+    return [name for names in AGING_COLUMNS.values() for name in names]
+
+
+def _column_hashes(values: pd.Series) -> np.ndarray:
+    """Hash of every value of a column; text and mixed columns hash each distinct value once"""
+    if values.dtype != object and not pd.api.types.is_string_dtype(values.dtype):
+        return pd.util.hash_pandas_object(values, index=False).to_numpy()
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return pd.util.hash_array(np.asarray(uniques, dtype=object))[codes]
+
+
+def row_hashes(frame: pd.DataFrame) -> np.ndarray:
+    """
+    Identity of each row by the values the report uses: a row whose category, condition, date,
+    cost, quantity or status changes gets a new hash. Repeats of an identical row are numbered so
+    each keeps its own hash.
+    """
+    columns = [name for name in read_columns() if name in frame.columns]
+    per_column = pd.DataFrame({name: _column_hashes(frame[name]) for name in columns}, index=pd.RangeIndex(len(frame)))
+    hashes = pd.util.hash_pandas_object(per_column, index=False).to_numpy()
+    repeat = pd.Series(hashes).groupby(hashes).cumcount().to_numpy(dtype='uint64')
+    return hashes + repeat * np.uint64(0x9E3779B97F4A7C15)
+
+
+def _contains(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Whether each value is in a sorted array"""
+    if not len(sorted_values):
+        return np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(sorted_values, values).clip(max=len(sorted_values) - 1)
+    return sorted_values[positions] == values
+
+
+def aging_rows(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    What each inventory row contributes to the report.
+
+    :param frame: Concatenated all-time inventory sheets.
+    :return: DataFrame with Category, Condition, Received (days since 1970-01-01, NO_DATE if
+        unknown), Units and Capital (cost times quantity), with zero units for items no longer on hand.
+    """
+    def text(field, default):
+        column = _pick(frame, AGING_COLUMNS[field])
+        if column is None:
+            return pd.Series(default, index=frame.index, dtype='string')
+        return frame[column].astype('string').str.strip().replace('', pd.NA).fillna(default)
+
+    def number(field, default):
+        column = _pick(frame, AGING_COLUMNS[field])
+        if column is None:
+            return np.full(len(frame), default, dtype='float64')
+        return pd.to_numeric(frame[column], errors='coerce').fillna(default).to_numpy(dtype='float64')
+
+    received_column = _pick(frame, AGING_COLUMNS['received'])
+    if received_column is None:
+        received = np.full(len(frame), NO_DATE, dtype='int64')
+    else:
+        dates = parse_dates(frame[received_column]).to_numpy(dtype='datetime64[D]')
+        received = np.where(np.isnat(dates), NO_DATE, dates.astype('int64'))
+
+    units = number('quantity', 1.0)
+    status_column = _pick(frame, AGING_COLUMNS['status'])
+    if status_column is not None:
+        status = frame[status_column].astype('string').str.strip().str.lower()
+        units = np.where(status.isin(SOLD_STATUSES).to_numpy(dtype=bool, na_value=False), 0.0, units)
+
+    return pd.DataFrame({
+        'Category': text('category', UNCATEGORIZED).to_numpy(dtype=object),
+        'Condition': text('condition', 'Unknown').to_numpy(dtype=object),
+        'Received': received,
+        'Units': units,
+        'Capital': units * number('cost', 0.0)
+    })
+
+
+def bucket_labels(days: np.ndarray) -> np.ndarray:
+    """Aging bucket of each days-on-hand value (NaN for undated rows)"""
+    labels = np.asarray(BUCKET_LABELS + [UNDATED], dtype=object)
+    positions = np.searchsorted(AGING_BUCKETS, np.nan_to_num(days, nan=0.0), side='right') - 1
+    return labels[np.where(np.isnan(days), len(BUCKET_LABELS), positions.clip(0))]
+
+
+class InventoryAging:
+    """
+    Aging of the stock on hand in an all-time inventory, kept up to date incrementally.
+
+    The report is built from a cube of units and capital per category, condition and received
+    day; days on hand and aging buckets follow from the cube for any as-of date, so the cube only
+    changes with the inventory. When a newer inventory snapshot arrives, its rows are compared with
+    the previous snapshot's by row_hashes and only the rows added or changed are parsed, their
+    contributions added and those of the rows gone subtracted.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.updated = None  # time of the last change; versions restart when a published file is deleted
+        self.hashes = np.empty(0, dtype='uint64')  # sorted
+        self.rows = aging_rows(pd.DataFrame())  # contribution of each hash, in hash order
+        self.cube = pd.DataFrame(columns=['Units', 'Capital'], index=pd.MultiIndex.from_arrays(
+            [[], [], []], names=GROUP + ['Received']))
+        self._lock = threading.Lock()
+
+    @property
+    def nbytes(self) -> int:
+        return self.hashes.nbytes + int(self.rows.memory_usage(deep=True).sum())
+
+    @staticmethod
+    def _cells(rows: pd.DataFrame) -> pd.DataFrame:
+        held = rows[rows['Units'] != 0]
+        return held.groupby(GROUP + ['Received'], sort=False)[['Units', 'Capital']].sum()
+
+    @timed('inventory_aging_update')
+    def update(self, inventory: pd.DataFrame) -> dict:
+        """
+        Bring the report up to date with a newer inventory snapshot.
+
+        :param inventory: Concatenated all-time inventory sheets (see process_all_time_inventory).
+        :return: Counts of the rows 'added' and 'removed' since the previous snapshot, and the new 'version'.
+        """
+        hashes = row_hashes(inventory)
+        with self._lock:
+            added = np.flatnonzero(~_contains(self.hashes, hashes))
+            kept = _contains(np.sort(hashes), self.hashes)
+            removed = np.flatnonzero(~kept)
+
+            if len(added) or len(removed):
+                new_rows = aging_rows(inventory.iloc[added])
+                changes = pd.concat([
+                    self._cells(new_rows),
+                    -self._cells(self.rows.iloc[removed])
+                ])
+                cube = pd.concat([self.cube, changes]).groupby(level=[0, 1, 2], sort=False).sum()
+                self.cube = cube[cube['Units'].abs() > 1e-9]
+
+                merged_hashes = np.concatenate([self.hashes[kept], hashes[added]])
+                order = np.argsort(merged_hashes, kind='stable')
+                self.hashes = merged_hashes[order]
+                self.rows = pd.concat([self.rows[kept], new_rows], ignore_index=True).iloc[order].reset_index(drop=True)
+                self.version += 1
+                self.updated = time.time()
+
+            count_rows('inventory_aging_update', len(added))
+            logger.info("Inventory aging v%d: %d rows added, %d removed", self.version, len(added), len(removed))
+            return {'added': len(added), 'removed': len(removed), 'version': self.version}
+
+    def save(self, path: str):
+        """Atomically write the state as an Arrow IPC file (row hashes and contributions)"""
+        with self._lock:
+            columns = {HASH_COLUMN: pa.array(self.hashes, type=pa.uint64())}
+            columns.update({col: pa.array(self.rows[col].to_numpy()) for col in self.rows.columns})
+            metadata = {METADATA_KEY: json.dumps({'version': self.version, 'updated': self.updated}).encode()}
+        table = pa.table(columns).replace_schema_metadata(metadata)
+        write_atomic(path, lambda temp_path: write_arrow_table(temp_path, table))
+        count_bytes('inventory_aging_write', os.path.getsize(path))
+
+    @classmethod
+    def load(cls, path: str) -> 'InventoryAging':
+        """Read a state written by save"""
+        with pa.memory_map(path) as source:
+            table = pa.ipc.open_file(source).read_all()
+        aging = cls()
+        info = json.loads(table.schema.metadata[METADATA_KEY])
+        aging.version, aging.updated = info['version'], info.get('updated')
+        aging.hashes = table.column(HASH_COLUMN).to_numpy()
+        aging.rows = table.drop_columns([HASH_COLUMN]).to_pandas()
+        aging.rows[GROUP] = aging.rows[GROUP].astype(object)
+        aging.cube = aging._cells(aging.rows)
+        return aging
+
+    def cells(self, as_of=None) -> pd.DataFrame:
+        """
+        The cube with the days on hand and aging bucket of every cell as of a date.
+
+        :param as_of: Date the ages are measured at (default today).
+        :return: DataFrame with Category, Condition, Days on Hand, Aging Bucket, Units and Capital.
+        """
+        as_of = np.datetime64(pd.Timestamp(as_of or date.today()).date(), 'D').astype('int64')
+        with self._lock:
+            cube = self.cube.reset_index()
+        received = cube['Received'].to_numpy(dtype='int64')
+        days = np.where(received == NO_DATE, np.nan, (as_of - received).clip(0).astype('float64'))
+        return pd.DataFrame({
+            'Category': cube['Category'].to_numpy(dtype=object),
+            'Condition': cube['Condition'].to_numpy(dtype=object),
+            'Days on Hand': days,
+            'Aging Bucket': pd.Categorical(bucket_labels(days), categories=BUCKET_LABELS + [UNDATED], ordered=True),
+            'Units': cube['Units'].to_numpy(dtype='float64'),
+            'Capital': cube['Capital'].to_numpy(dtype='float64')
+        })
+
+    def report(self, as_of=None) -> pd.DataFrame:
+        """
+        Stock on hand per category and condition.
+
+        :param as_of: Date the ages are measured at (default today).
+        :return: DataFrame indexed by Category and Condition with Units, Capital, Avg Days on Hand,
+            Max Days on Hand and the capital held in each aging bucket.
+        """
+        cells = self.cells(as_of)
+        dated = cells['Days on Hand'].notna()
+        cells = cells.assign(
+            **{'Unit Days': (cells['Days on Hand'] * cells['Units']).fillna(0.0), 'Dated Units': cells['Units'].where(dated, 0.0)}
+        )
+        grouped = cells.groupby(GROUP, sort=True)
+        report = grouped[['Units', 'Capital', 'Unit Days', 'Dated Units']].sum()
+        report['Avg Days on Hand'] = report['Unit Days'] / report['Dated Units'].replace(0.0, np.nan)
+        report['Max Days on Hand'] = grouped['Days on Hand'].max()
+        buckets = cells.pivot_table(index=GROUP, columns='Aging Bucket', values='Capital',
+                                    aggfunc='sum', fill_value=0.0, observed=True)
+        report = report.drop(columns=['Unit Days', 'Dated Units']).join(buckets.add_prefix('Capital '))
+        return report.fillna({col: 0.0 for col in report.columns if col.startswith('Capital ')})
+
+
+def read_inventory(filepath: str) -> pd.DataFrame:
+    """An all-time inventory workbook's rows, reading only the columns the report uses and tagging each with its sheet"""
+    inventory = process_all_time_inventory(filepath, read_columns(), SHEET_COLUMN)
+    if isinstance(inventory, Exception):
+        raise inventory
+    return inventory
+
+
+# Aging of the inventory uploaded to this process (used when datasets are not shared between workers)
+inventory_aging = InventoryAging()
+
+_published = LRUCache(max_bytes=AGING_CACHE_BYTES, sizeof=lambda aging: aging.nbytes)
+
+
+class _FileLock:
+    """Exclusive lock across processes (and threads) while a published aging state is updated"""
+
+    _thread_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            self._file = open(self.path, 'w')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        self._thread_lock.release()
+
+
+def _stamp(path: str):
+    """Identity of a published file: every save replaces it, giving it a new inode (the mtime tracks use)"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None, None
+    return (stat.st_ino, stat.st_size), stat
+
+
+def published_aging(path: str) -> InventoryAging:
+    """
+    Aging state published to a file that every worker process reads (see publish_update).
+
+    Each worker keeps the states it has read and re-reads the file only once it was replaced.
+
+    :param path: The state's file, in the shared store or a session's directory.
+    :return: InventoryAging (empty, at version 0, if nothing was published yet).
+    """
+    stamp, stat = _stamp(path)
+    if stamp is None:
+        return InventoryAging()
+    if time.time() - stat.st_mtime >= TOUCH_INTERVAL_SECONDS:
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+    return _published.get_or_create((path, stamp), lambda: InventoryAging.load(path))
+
+
+def publish_update(path: str, inventory: pd.DataFrame) -> dict:
+    """
+    Update a published aging state with a newer inventory snapshot and republish it.
+
+    Updates are serialized across processes and start from the latest published state, so they
+    stay incremental whichever worker handles them.
+
+    :param path: The state's file, in the shared store or a session's directory.
+    :param inventory: Concatenated all-time inventory sheets (see read_inventory).
+    :return: Changes, as returned by InventoryAging.update.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _FileLock(os.path.join(os.path.dirname(path), 'aging.lock')):
+        aging = published_aging(path)
+        changes = aging.update(inventory)
+        if changes['added'] or changes['removed'] or not os.path.exists(path):
+            aging.save(path)
+            _published.invalidate(lambda key: key[0] == path)
+            _published.put((path, _stamp(path)[0]), aging)
+    return changes
+
+
+def capital_by_aging_bucket(cells: pd.DataFrame):
+    """
+    Visualize the capital tied up in stock on hand by how long it has been held.
+
+    :param cells: InventoryAging.cells of the inventory.
+    :return: Plotly stacked bar chart figure object.
+    """
+    totals = cells.groupby(['Aging Bucket', 'Category'], observed=True)['Capital'].sum().reset_index()
+    fig = px.bar(
+        totals,
+        x='Aging Bucket',
+        y='Capital',
+        color='Category',
+        title='Capital Tied Up by Aging Bucket',
+        labels={'Capital': 'Capital ($)', 'Aging Bucket': 'Days on Hand'},
+        category_orders={'Aging Bucket': BUCKET_LABELS + [UNDATED]}
+    )
+    return fig
+
+
+def days_on_hand_by_category(cells: pd.DataFrame):
+    """
+    Visualize the average days items have been on hand per category and condition.
+
+    :param cells: InventoryAging.cells of the inventory.
+    :return: Plotly grouped bar chart figure object.
+    """
+    dated = cells[cells['Days on Hand'].notna()]
+    totals = dated.assign(**{'Unit Days': dated['Days on Hand'] * dated['Units']}).groupby(GROUP)[['Unit Days', 'Units']].sum()
+    averages = (totals['Unit Days'] / totals['Units']).rename('Avg Days on Hand').reset_index()
+    fig = px.bar(
+        averages,
+        x='Category',
+        y='Avg Days on Hand',
+        color='Condition',
+        barmode='group',
+        title='Avg Days on Hand by Category and Condition'
+    )
+    return fig
+
+
+def capital_by_category_condition(cells: pd.DataFrame):
+    """
+    Visualize where the capital on hand sits, per category and condition.
+
+    :param cells: InventoryAging.cells of the inventory.
+    :return: Plotly treemap figure object.
+    """
+    totals = cells.groupby(GROUP)['Capital'].sum().reset_index()
+    totals = totals[totals['Capital'] > 0]
+    fig = px.treemap(
+        totals,
+        path=[px.Constant('All Inventory'), 'Category', 'Condition'],
+        values='Capital',
+        title='Capital Tied Up by Category and Condition'
+    )
+    return fig
@@ -0,0 +1,120 @@
+import argparse
+import os
+
+import pandas as pd
+from dotenv import load_dotenv
+from openpyxl import Workbook
+
+from ExcelFormatAPI.FormatReportProduction import write_formatted_sheet
+from Pricing.Price_History import find_data_overlaps, process_all_time_inventory, process_recovered_revenue
+from Pricing.Serial_Join import serial_index_for_file
+from Utilities.Columnar_Cache import PYARROW_AVAILABLE, make_arrow_compatible
+from Utilities.Lazy_Import import lazy_import
+from Utilities.Logger import configure_logging, get_logger
+from Utilities.Metrics import count_bytes, timed, Timer
+
+pa = lazy_import('pyarrow')
+feather = lazy_import('pyarrow.feather')
+pq = lazy_import('pyarrow.parquet')
+
+load_dotenv()
+
+logger = get_logger(__name__)
+
+DEFAULT_OUTPUT = 'final_output.xlsx'
+DEFAULT_SHEET = 'Sheet1'
+
+
+def _loaded(result, name: str, path: str) -> pd.DataFrame:
+    """Frame returned by a process_* loader, or a clear error when it had no file or failed to load it"""
+    if result is None:
+        raise ValueError(f"No {name} workbook given (pass a path or set its TESTING_* environment variable)")
+    if isinstance(result, Exception):
+        raise ValueError(f"Could not load the {name} workbook {path}: {result}") from result
+    return result
+
+
+def merged_inventory(recovered_revenue: str = None, all_time: str = None) -> pd.DataFrame:
+    """
+    Recovered revenue rows joined with the all-time inventory on serial number.
+
+    :param recovered_revenue: Path to the recovered revenue workbook (defaults to TESTING_RECOVERED_REVENUE).
+    :param all_time: Path to the all-time inventory workbook (defaults to TESTING_ALL_TIME).
+    :return: Merged DataFrame without columns that are blank in every row.
+    :raises ValueError: When a workbook is not given or cannot be loaded.
+    """
+    recovered_revenue = recovered_revenue or os.getenv("TESTING_RECOVERED_REVENUE")
+    all_time = all_time or os.getenv("TESTING_ALL_TIME")
+    rr_df = _loaded(process_recovered_revenue(recovered_revenue), 'recovered revenue', recovered_revenue)
+    inventory = _loaded(process_all_time_inventory(all_time), 'all-time inventory', all_time)
+    rr_index = serial_index_for_file(recovered_revenue, 'recovered_revenue', rr_df['SN'])  # reused on later runs
+    merged = find_data_overlaps(rr_df, inventory, index=rr_index)
+    return merged.dropna(axis=1, how='all')  # Drop columns where all values are blank
+
+
+def write_columnar(df: pd.DataFrame, path: str):
+    """
+    Write a frame for the ML side: Parquet for a .parquet path, Feather (Arrow IPC) otherwise.
+
+    :param df: DataFrame to write.
+    :param path: Output path.
+    """
+    if not PYARROW_AVAILABLE:
+        raise RuntimeError("pyarrow is required to write columnar output")
+    table = pa.Table.from_pandas(make_arrow_compatible(df), preserve_index=False)
+    if path.lower().endswith('.parquet'):
+        pq.write_table(table, path)
+    else:
+        feather.write_feather(table, path)
+    count_bytes('columnar_export', os.path.getsize(path))
+
+
+@timed('ml_export')
+def export_merged(df: pd.DataFrame, output: str = DEFAULT_OUTPUT, columnar: str = None,
+                  sheet_name: str = DEFAULT_SHEET):
+    """
+    Render the merged frame straight into the formatted workbook, and optionally a columnar file.
+
+    Both outputs are written from the same in-memory frame; no intermediate workbook is written
+    or read back.
+
+    :param df: Merged DataFrame (see merged_inventory).
+    :param output: Path of the formatted .xlsx workbook.
+    :param columnar: Path of the columnar file (.parquet or .feather), or None to skip it.
+    :param sheet_name: Title of the workbook's sheet.
+    """
+    wb = Workbook(write_only=True)
+    write_formatted_sheet(wb, df, sheet_name)
+    with Timer('save_workbook'):
+        wb.save(output)
+    logger.info("Wrote %d rows to %s", len(df), output)
+
+    if columnar:
+        write_columnar(df, columnar)
+        logger.info("Wrote %d rows to %s", len(df), columnar)
+
+
+def main(argv=None):
+    configure_logging()
+    parser = argparse.ArgumentParser(
+        description="Merge recovered revenue with the all-time inventory and export the result."
+    )
+    parser.add_argument('--recovered-revenue', help="Recovered revenue workbook (default: $TESTING_RECOVERED_REVENUE)")
+    parser.add_argument('--all-time', help="All-time inventory workbook (default: $TESTING_ALL_TIME)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help="Formatted workbook to write")
+    parser.add_argument('--columnar', help="Also write a .parquet or .feather file for the ML side")
+    parser.add_argument('--sheet-name', default=DEFAULT_SHEET, help="Title of the workbook's sheet")
+    args = parser.parse_args(argv)
+
+    if args.columnar and not PYARROW_AVAILABLE:
+        parser.error("--columnar requires pyarrow")
+
+    try:
+        merged = merged_inventory(args.recovered_revenue, args.all_time)
+    except ValueError as e:
+        parser.error(str(e))
+    export_merged(merged, args.output, args.columnar, args.sheet_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,16 +3,101 @@ import os
 from datetime import datetime
 
 import numpy as np
-import openpyxl
 import pandas as pd
-import plotly.express as px
 from dotenv import load_dotenv
 
-from ExcelFormatAPI.FormatReportProduction import create_table, format_header, autofit, copy_data
+from Pricing.Aggregates import build_cube, rollup, sketch_quantiles
+from Pricing.Rendering import SCATTER_POINT_BUDGET, as_array, binned_histogram, density_downsample, is_large
+from Pricing.Serial_Join import join_on_serial
+from Pricing.Sheet_Reader import read_sheets
+from Pricing.Summary import grouped_quantiles, top_k
+from Utilities.Columnar_Cache import cached_frame
+from Utilities.Lazy_Import import lazy_import
+from Utilities.Logger import get_logger
+from Utilities.Metrics import timed, count_rows, count_error
+
+# plotly is only needed once a chart is drawn, not for loading or merging data
+px = lazy_import('plotly.express')
+go = lazy_import('plotly.graph_objects')
 
 # Load environment variables (e.g., file paths or other configurations)
 load_dotenv()
 
+logger = get_logger(__name__)
+
+# Charts drawn from an AggregateCube instead of the raw rows; they take an optional cube argument
+CUBE_CHARTS = {
+    'sales_by_condition',
+    'avg_profit_by_purchase_range',
+    'monthly_profit_over_time',
+    'avg_days_to_sell_by_condition',
+    'monthly_sales_volume'
+}
+
+# Rows per group in the top-K summary tables
+TOP_ITEMS_PER_GROUP = 10
+
+# Spreadsheet columns read from each report
+PRICING_HISTORY_COLUMNS = 'B, C, E, G, H, I, K, L, N, O, R'
+RECOVERED_REVENUE_COLUMNS = 'F, H, N, O, P, R, S, T, U, V, Y, Z'
+
+# Date formats accepted in the raw spreadsheets, tried in order
+DATE_FORMATS = ['%m/%d/%Y', '%Y/%m/%d']
+
+
+def _is_parseable_type(value_type) -> bool:
+    """Only strings and datetime objects can ever match DATE_FORMATS (see calculate_date_difference)"""
+    return issubclass(value_type, (str, datetime))
+
+
+def parse_dates(values) -> pd.Series:
+    """
+    Parse a whole column of dates at once.
+
+    Datetime values are kept as-is and strings are parsed against each of DATE_FORMATS in turn,
+    so results match calculate_date_difference's row-by-row parsing. Anything else becomes NaT.
+
+    :param values: Series (or array-like) of strings, datetimes or blanks.
+    :return: Series of datetime64 values with NaT where parsing failed.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series
+
+    # Real exports repeat the same few thousand dates across many rows, so only the
+    # distinct values are parsed and the results are broadcast back by their codes
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    uniques = pd.Series(uniques, dtype=object)
+
+    # Classify by type once per distinct type rather than once per row
+    value_types = uniques.map(type)
+    parseable = value_types.map({t: _is_parseable_type(t) for t in value_types.unique()}).astype(bool)
+    candidates = uniques.where(parseable)
+
+    parsed = pd.to_datetime(candidates, format=DATE_FORMATS[0], errors='coerce')
+    for fmt in DATE_FORMATS[1:]:
+        missing = parsed.isna() & parseable
+        if not missing.any():
+            break
+        parsed[missing] = pd.to_datetime(candidates[missing], format=fmt, errors='coerce')
+
+    # code -1 marks blanks, which take the trailing NaT
+    lookup = np.append(parsed.to_numpy(), np.datetime64('NaT'))
+    return pd.Series(lookup[codes], index=series.index)
+
+
+def days_between(start, end) -> pd.Series:
+    """
+    Vectorized version of calculate_date_difference for whole columns.
+
+    :param start: Column of start dates (strings or datetimes).
+    :param end: Column of end dates (strings or datetimes).
+    :return: Integer Series of absolute day differences, 0 where either date is missing or invalid.
+    """
+    delta = parse_dates(end) - parse_dates(start)
+    return delta.dt.days.abs().fillna(0).astype('int64')
+
+
 def calculate_date_difference(date1, date2) -> int:
     """
     Calculate the number of days between two dates.
@@ -65,24 +150,16 @@ def get_ebay_url(item_id: str) -> str:
 
 def print_summary(values):
     """
-    Print key financial details and metrics for items in the dataset.
+    Print summary tables (see Pricing.Summary.summarize) or individual rows of the dataset.
 
-    :param values: Dictionary where keys are labels (e.g., 'Max Profit Item')
-                   and values are rows from the DataFrame.
+    :param values: Dictionary where keys are labels (e.g., 'Top Profit Items')
+                   and values are DataFrames, or single rows from the DataFrame.
     """
     for key, value in values.items():
+        table = value if isinstance(value, pd.DataFrame) else pd.DataFrame([value])
         print(key)
         print("-" * 40)
-        print(f"Item ID         : {value['Item']}")
-        print(f"Condition       : {value['Condition']}")
-        print(f"Purchase Date   : {value['Purchase Date']}")
-        print(f"Purchase Cost   : ${value['Purchase Cost']:.2f}")
-        print(f"Sale Date       : {value['Sale Date']}")
-        print(f"Sale Price      : ${value['Sale Price']:.2f}")
-        print(f"Profit          : ${value['Profit']:.2f}")
-        print(f"Revenue Share   : {value['Revenue Share']}")
-        print(f"Status          : {value['Status']}")
-        print(f"# Days to Sell  : {value['# Days to sell']}")
+        print(table.to_string(index=table.index.name is not None, float_format=lambda x: f"{x:.2f}"))
         print("-" * 40)
 
 
@@ -93,6 +170,9 @@ def profit_distribution(df):
     :param df: DataFrame containing a 'Profit' column with numeric data.
     :return: Plotly histogram figure object.
     """
+    if is_large(len(df)):
+        return binned_histogram(df['Profit'], 50, 'Profit Distribution', 'Profit ($)', 'Number of Items', 'blue')
+
     fig = px.histogram(
         df,
         x='Profit',
@@ -115,17 +195,28 @@ def sale_price_vs_profit(df):
     """
     Create a scatterplot showing the relationship between sale price and profit.
 
+    Large datasets are drawn with WebGL and, above SCATTER_POINT_BUDGET points, density
+    downsampled so dense regions are thinned while outliers are kept.
+
     :param df: DataFrame with items' sale prices, profits, and conditions.
     :return: Plotly scatterplot figure object.
     """
+    large = is_large(len(df))
+    title = 'Sale Price vs. Profit'
+    if large and len(df) > SCATTER_POINT_BUDGET > 0:
+        keep = density_downsample(as_array(df['Sale Price']), as_array(df['Profit']), SCATTER_POINT_BUDGET)
+        title = f'Sale Price vs. Profit ({len(keep):,} of {len(df):,} items shown)'
+        df = df.iloc[keep]
+
     fig = px.scatter(
         df,
         x='Sale Price',
         y='Profit',
         color='Condition',
-        title='Sale Price vs. Profit',
+        title=title,
         labels={'Sale Price': 'Sale Price ($)', 'Profit': 'Profit ($)'},
-        hover_data=['Item', 'Condition', 'Purchase Date', 'Purchase Cost', 'Sale Date', 'Sale Price']
+        hover_data=['Item', 'Condition', 'Purchase Date', 'Purchase Cost', 'Sale Date', 'Sale Price'],
+        render_mode='webgl' if large else 'auto'
     )
 
     # Adjust marker properties for better aesthetics
@@ -133,20 +224,40 @@ def sale_price_vs_profit(df):
     return fig
 
 
-def sales_by_condition(df):
+def sales_by_condition(df, cube=None):
     """
     Create a boxplot displaying sales prices grouped by item condition.
 
+    Box statistics come from the cube's sale price sketches, so the plot costs the same
+    however many rows the history has.
+
     :param df: DataFrame containing sale prices and item conditions.
+    :param cube: Optional precomputed AggregateCube of df.
     :return: Plotly boxplot figure object.
     """
-    fig = px.box(
-        df,
-        x='Condition',
-        y='Sale Price',
+    cube = cube if cube is not None else build_cube(df)
+    stats = rollup(cube, 'condition')
+    quartiles = sketch_quantiles(cube, 'condition', [0.25, 0.5, 0.75]).reindex(stats.index)
+
+    # Sketch quantiles are approximate, so keep them inside the exact group extremes
+    q1, median, q3 = (quartiles[q].clip(stats['sale_min'], stats['sale_max']) for q in quartiles.columns)
+    iqr = q3 - q1
+
+    fig = go.Figure(go.Box(
+        x=stats.index.astype(str),
+        q1=q1,
+        median=median,
+        q3=q3,
+        lowerfence=np.maximum(stats['sale_min'], q1 - 1.5 * iqr),
+        upperfence=np.minimum(stats['sale_max'], q3 + 1.5 * iqr),
+        name='Sale Price',
+        marker_color=px.colors.sequential.Plasma[0]
+    ))
+
+    fig.update_layout(
         title='Sales by Condition',
-        labels={'Sale Price': 'Sale Price ($)'},
-        color_discrete_sequence=px.colors.sequential.Plasma
+        xaxis_title='Condition',
+        yaxis_title='Sale Price ($)'
     )
 
     return fig
@@ -159,11 +270,12 @@ def days_to_sell_distribution(df):
     :param df: DataFrame with purchase and sale dates.
     :return: Plotly histogram figure object.
     """
-    # Add a column for days to sell, calculated using the helper function
-    df['# Days to sell'] = df.apply(
-        lambda row: calculate_date_difference(row['Purchase Date'], row['Sale Date']),
-        axis=1
-    )
+    # Days to sell is computed once at ingest; only derive it for frames that skipped ingest
+    if '# Days to sell' not in df.columns:
+        df = df.assign(**{'# Days to sell': days_between(df['Purchase Date'], df['Sale Date'])})
+
+    if is_large(len(df)):
+        return binned_histogram(df['# Days to sell'], 50, 'Days to Sell Distribution', 'Days to Sell', 'Number of Items', 'blue')
 
     fig = px.histogram(
         df,
@@ -183,21 +295,25 @@ def days_to_sell_distribution(df):
     return fig
 
 
-def avg_profit_by_purchase_range(df):
+def avg_profit_by_purchase_range(df, cube=None):
     """
     Generate a bar chart showing average profit for purchase cost ranges.
 
     :param df: DataFrame containing 'Purchase Cost' and 'Profit' columns.
+    :param cube: Optional precomputed AggregateCube of df.
     :return: Plotly bar chart figure object.
     """
-    df = df.copy()  # Avoid modifying the original DataFrame
-    bin_edges = np.histogram_bin_edges(df['Purchase Cost'].dropna(), bins=20)
-    df['Cost Range'] = pd.cut(df['Purchase Cost'], bins=bin_edges, include_lowest=True)
+    cube = cube if cube is not None else build_cube(df)
+    stats = rollup(cube, 'cost_bin')
+    stats = stats[stats.index >= 0]  # rows without a purchase cost have no range
 
-    # Convert the interval (Cost Range) to string for JSON serialization
-    df['Cost Range'] = df['Cost Range'].astype(str)
+    # Interval labels exactly as pd.cut would produce them, as strings for JSON serialization
+    labels = pd.cut(pd.Series([], dtype='float64'), bins=cube.cost_edges, include_lowest=True).cat.categories.astype(str)
 
-    avg_profit = df.groupby('Cost Range')['Profit'].mean().reset_index()
+    avg_profit = pd.DataFrame({
+        'Cost Range': labels[stats.index.to_numpy()],
+        'Profit': stats['profit_mean'].to_numpy()
+    })
 
     fig = px.bar(
         avg_profit,
@@ -213,20 +329,19 @@ def avg_profit_by_purchase_range(df):
     return fig
 
 
-def monthly_profit_over_time(df):
+def monthly_profit_over_time(df, cube=None):
     """
     Plot the total profit aggregated by month.
 
     :param df: DataFrame with 'Sale Date' and 'Profit' columns.
+    :param cube: Optional precomputed AggregateCube of df.
     :return: Plotly line chart figure object.
     """
-    # Ensure the 'Sale Date' column is in datetime format
-    df['Sale Date'] = pd.to_datetime(df['Sale Date'], errors='coerce')
-    df = df.dropna(subset=['Sale Date'])  # Remove rows with invalid 'Sale Date'
+    cube = cube if cube is not None else build_cube(df)
 
-    # Group by month and calculate total profit
-    profit = df.groupby(df['Sale Date'].dt.to_period('M'))['Profit'].sum().reset_index()
-    profit['Sale Date'] = profit['Sale Date'].dt.to_timestamp()
+    # Months are taken from valid sale dates only, so invalid dates are already excluded
+    monthly = rollup(cube, 'month')
+    profit = pd.DataFrame({'Sale Date': monthly.index, 'Profit': monthly['profit_sum'].to_numpy()})
 
     fig = px.line(
         profit,
@@ -251,12 +366,14 @@ def profit_margin_distribution(df):
     :param df: DataFrame containing 'Profit' and 'Purchase Cost' columns.
     :return: Plotly histogram figure object.
     """
-    df = df.copy()  # Avoid modifying original DataFrame
-    df['Profit Margin (%)'] = (df['Profit'] / df['Purchase Cost']) * 100  # Calculate profit margin %
-    df = df[df['Purchase Cost'] > 0]  # Filter out rows with zero cost to avoid division errors
+    has_cost = df['Purchase Cost'] > 0  # Filter out rows with zero cost to avoid division errors
+    margin = (df.loc[has_cost, 'Profit'] / df.loc[has_cost, 'Purchase Cost']) * 100  # Calculate profit margin %
+
+    if is_large(len(margin)):
+        return binned_histogram(margin, 50, 'Profit Margin Distribution (%)', 'Profit Margin (%)', 'count', 'green')
 
     fig = px.histogram(
-        df,
+        margin.rename('Profit Margin (%)').to_frame(),
         x='Profit Margin (%)',
         nbins=50,
         title='Profit Margin Distribution (%)',
@@ -266,7 +383,7 @@ def profit_margin_distribution(df):
     return fig
 
 
-def avg_days_to_sell_by_condition(df):
+def avg_days_to_sell_by_condition(df, cube=None):
     """
     Visualize average time taken to sell items, grouped by their condition.
 
@@ -275,15 +392,19 @@ def avg_days_to_sell_by_condition(df):
         move faster or slower in the market.
 
     :param df: DataFrame with 'Purchase Date', 'Sale Date', and 'Condition' columns.
+    :param cube: Optional precomputed AggregateCube of df.
     :return: Plotly bar chart figure object.
     """
-    df = df.copy()
-    df['# Days to sell'] = df.apply(
-        lambda row: calculate_date_difference(row['Purchase Date'], row['Sale Date']),
-        axis=1
-    )
+    if cube is None:
+        if '# Days to sell' not in df.columns:
+            df = df.assign(**{'# Days to sell': days_between(df['Purchase Date'], df['Sale Date'])})
+        cube = build_cube(df)
 
-    condition_days = df.groupby('Condition')['# Days to sell'].mean().reset_index()
+    stats = rollup(cube, 'condition')
+    condition_days = pd.DataFrame({
+        'Condition': stats.index.astype(str),
+        '# Days to sell': stats['days_mean'].to_numpy()
+    })
 
     fig = px.bar(
         condition_days,
@@ -296,7 +417,7 @@ def avg_days_to_sell_by_condition(df):
     return fig
 
 
-def monthly_sales_volume(df):
+def monthly_sales_volume(df, cube=None):
     """
     Plot the number of units sold each month.
 
@@ -305,15 +426,14 @@ def monthly_sales_volume(df):
         useful for planning restocking and promotions.
 
     :param df: DataFrame containing a 'Sale Date' column.
+    :param cube: Optional precomputed AggregateCube of df.
     :return: Plotly line chart figure object.
     """
-    df = df.copy()
-    df['Sale Date'] = pd.to_datetime(df['Sale Date'], errors='coerce')  # Convert to datetime
-    df = df.dropna(subset=['Sale Date'])  # Remove rows with invalid dates
+    cube = cube if cube is not None else build_cube(df)
 
-    # Group by month and count number of sales
-    sales_volume = df.groupby(df['Sale Date'].dt.to_period('M')).size().reset_index(name='Sales Count')
-    sales_volume['Sale Date'] = sales_volume['Sale Date'].dt.to_timestamp()  # Convert period back to datetime
+    # Count number of sales per month (rows with invalid dates have no month)
+    monthly = rollup(cube, 'month')
+    sales_volume = pd.DataFrame({'Sale Date': monthly.index, 'Sales Count': monthly['count'].to_numpy()})
 
     fig = px.line(
         sales_volume,
@@ -326,6 +446,54 @@ def monthly_sales_volume(df):
     return fig
 
 
+def summary_table(table: pd.DataFrame, title: str):
+    """
+    Render a summary table (see Pricing.Summary) as a Plotly table figure.
+
+    :param table: DataFrame of results; a named index becomes the first column.
+    :param title: Figure title.
+    :return: Plotly table figure object.
+    """
+    table = table.reset_index() if table.index.name is not None else table
+    cells = []
+    for col in table.columns:
+        values = table[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            values = values.dt.strftime('%Y-%m-%d')
+        elif pd.api.types.is_float_dtype(values):
+            values = values.round(2)
+        cells.append(values.astype(object).where(values.notna(), '').tolist())
+
+    fig = go.Figure(go.Table(
+        header=dict(values=[str(col) for col in table.columns], fill_color='lightgrey', align='left'),
+        cells=dict(values=cells, align='left')
+    ))
+    fig.update_layout(title=title)
+    return fig
+
+
+def top_profit_items_by_condition(df):
+    """
+    Table of the most profitable sales within each condition.
+
+    :param df: DataFrame containing 'Profit' and 'Condition' columns.
+    :return: Plotly table figure object.
+    """
+    return summary_table(top_k(df, 'Profit', TOP_ITEMS_PER_GROUP, group='Condition'), 'Top Profit Items by Condition')
+
+
+def sale_price_percentiles_by_item(df):
+    """
+    Table of P10/P50/P90 sale prices of each item, most frequently sold items first.
+
+    :param df: DataFrame containing 'Sale Price' and 'Item' columns.
+    :return: Plotly table figure object.
+    """
+    percentiles = grouped_quantiles(df, 'Sale Price', 'Item')
+    percentiles = percentiles.sort_values('Count', ascending=False, kind='stable')
+    return summary_table(percentiles, 'Sale Price Percentiles by Item')
+
+
 def process_pricing_history_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     """
     Process the raw dataset to clean, filter, and calculate metrics.
@@ -336,11 +504,8 @@ def process_pricing_history_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     # Step 1: Filter out 'SCRP' (scrap) items from the dataset
     filtered_df = df[df['So Condition'] != 'SCRP'].copy()
 
-    # Step 2: Calculate '# Days to Sell' for each item
-    filtered_df['# Days to sell'] = filtered_df.apply(
-        lambda row: calculate_date_difference(row['Purchase Date'], row['Sale Date']),
-        axis=1
-    )
+    # Step 2: Calculate '# Days to Sell' for each item (once, for every chart to reuse)
+    filtered_df['# Days to sell'] = days_between(filtered_df['Purchase Date'], filtered_df['Sale Date'])
 
     return filtered_df
 
@@ -361,46 +526,47 @@ def output_graphs(df: pd.DataFrame):
     profit_margin_distribution(df).show()
     avg_days_to_sell_by_condition(df).show()
     monthly_sales_volume(df).show()
+    top_profit_items_by_condition(df).show()
+    sale_price_percentiles_by_item(df).show()
 
 
-def read_all_sheets(filepath: str = None) -> pd.DataFrame:
+def read_all_sheets(filepath: str = None, columns=None, sheet_column: str = None) -> pd.DataFrame:
     """
-    Reads specified sheets from an Excel workbook and returns a dictionary of processed DataFrames,
-    each processed based on its sheet name.
+    Reads every category sheet (all but Dash Inventory) from an Excel workbook, in parallel worker
+    processes, and combines them under one schema.
 
     :param filepath: Path to the Excel workbook (.xlsx or .xls).
+    :param columns: Columns to keep, or None for all.
+    :param sheet_column: Column to tag each row with its sheet (category) name, or None.
     :return: single dataframe with all sheet information
     """
     try:
-
-        all_sheets = pd.read_excel(filepath,sheet_name=None) # Reads all sheets
-        all_sheets.pop("Dash Inventory") # Remove dash inventory
-        df = pd.concat(all_sheets.values(), ignore_index=True)
-
-        return df
+        return read_sheets(filepath, columns=columns, sheet_column=sheet_column)
 
     except Exception as e:
         raise RuntimeError(f"Failed to read Excel file: {e}")
 
 
-def find_data_overlaps(df1: pd.DataFrame, df2: pd.DataFrame) -> pd.DataFrame:
+def find_data_overlaps(df1: pd.DataFrame, df2, index=None) -> pd.DataFrame:
     """
     Function to find data that exists in both sheets (will allow to pull pricing data and specs, then output as 1 dataframe with all relevant data for ML
     Intended for merging pricing
 
-    :param df1: first dataframe to compare
-    :param df2: second dataframe to compare
-    :return: combined dataframe
-    """
-    # Merge on both keys (safer if one might be missing)
-    combined_df = pd.merge(df1, df2, on="SN", how="inner")
+    Serial numbers are normalized (whitespace, case, trailing '.0') before matching; df2 is probed
+    in chunks against a hash index of df1, and each serial number is kept once.
 
-    # Drop duplicates after merge if needed
-    combined_df = combined_df.drop_duplicates(subset="SN")
+    :param df1: first dataframe to compare (indexed; its row order is kept)
+    :param df2: second dataframe to compare, or an iterable of its chunks
+    :param index: optional prebuilt SerialIndex of df1['SN'] (see serial_index_for_file)
+    :return: combined dataframe, with the match statistics in attrs['join_stats']
+    """
+    combined_df, stats = join_on_serial(df1, df2, key="SN", index=index)
+    combined_df.attrs['join_stats'] = stats.as_dict()
 
     return combined_df
 
 
+@timed('process_pricing_history')
 def process_pricing_history(filepath: str = None):
     """
     Main function to load, process, and visualize data from a pricing history excel file.
@@ -412,36 +578,48 @@ def process_pricing_history(filepath: str = None):
     # noinspection PyTypeChecker
     if filepath is not None:
         try:
-            df = pd.read_excel(filepath, skiprows=[0], usecols='B, C, E, G, H, I, K, L, N, O, R')
-            filtered_df = process_pricing_history_dataframe(df)
+            def load():
+                df = pd.read_excel(filepath, skiprows=[0], usecols=PRICING_HISTORY_COLUMNS)
+                return process_pricing_history_dataframe(df)
+
+            # Files seen before are memory-mapped from the columnar cache instead of re-parsed
+            filtered_df = cached_frame(filepath, 'pricing_history', load, {'usecols': PRICING_HISTORY_COLUMNS})
+            count_rows('process_pricing_history', len(filtered_df))
             return filtered_df
         except Exception as e:
+            count_error('process_pricing_history')
+            logger.exception("Failed to process pricing history %s", filepath)
             return e
     return None
 
 
-def process_all_time_inventory(filepath: str = None):
+def process_all_time_inventory(filepath: str = None, columns=None, sheet_column: str = None):
     """
     Main function to handle data from an all time inventory w/ testing records excel file
 
     :param filepath: File path to the Excel file containing raw data.
+    :param columns: Columns to keep, or None for all.
+    :param sheet_column: Column to tag each row with its sheet (category) name, or None.
     :return: Processed DataFrame with relevant metrics.
     """
     if filepath is not None:
         try:
-            combined_df = read_all_sheets(filepath)
+            combined_df = cached_frame(
+                filepath, 'all_time_inventory',
+                lambda: read_all_sheets(filepath, columns, sheet_column),
+                {'columns': sorted(columns) if columns is not None else None,
+                 **({'sheet_column': sheet_column} if sheet_column else {})}
+            )
             return combined_df
         except Exception as e:
+            logger.exception("Failed to process %s", filepath)
             return e
     return None
 
 
 def filter_rr_dataframe(df: pd.DataFrame) -> pd.DataFrame:
     filtered_df = df[df['Condition'] != 'SCRP'].copy()
-    filtered_df['# Days to sell'] = filtered_df.apply(
-        lambda row: calculate_date_difference(row['Added Date'], row['Sales Date']),
-        axis=1
-    )
+    filtered_df['# Days to sell'] = days_between(filtered_df['Added Date'], filtered_df['Sales Date'])
     return filtered_df
 
 
@@ -454,27 +632,20 @@ def process_recovered_revenue(filepath: str = None):
     """
     if filepath is not None:
         try:
-            df = pd.read_excel(filepath, usecols='F, H, N, O, P, R, S, T, U, V, Y, Z')
-            df.rename(columns={'Serial Number': 'SN'}, inplace=True)
-            filtered_df = filter_rr_dataframe(df)
+            def load():
+                df = pd.read_excel(filepath, usecols=RECOVERED_REVENUE_COLUMNS)
+                df.rename(columns={'Serial Number': 'SN'}, inplace=True)
+                return filter_rr_dataframe(df)
+
+            filtered_df = cached_frame(filepath, 'recovered_revenue', load, {'usecols': RECOVERED_REVENUE_COLUMNS})
             return filtered_df
         except Exception as e:
+            logger.exception("Failed to process %s", filepath)
             return e
     return None
 
 
 if __name__ == "__main__":
     # print(process_all_time_inventory(os.getenv("TESTING_ALL_TIME")))
-    final_df = (find_data_overlaps(process_recovered_revenue(os.getenv("TESTING_RECOVERED_REVENUE")),process_all_time_inventory(os.getenv("TESTING_ALL_TIME"))))
-    final_df = final_df.dropna(axis=1, how='all') # Drop columns where all values are blank
-    final_df.to_excel('raw_output.xlsx', index=False)
-
-    raw = openpyxl.load_workbook('raw_output.xlsx')
-    final = copy_data(raw)
-    for sheet in final.sheetnames:
-        current_sheet = final[sheet]
-        create_table(current_sheet)
-        format_header(current_sheet)
-        autofit(current_sheet)
-
-    final.save('final_output.xlsx')
+    from Pricing.ML_Export import main
+    main()
@@ -0,0 +1,429 @@
+import argparse
+import json
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from Utilities.Logger import configure_logging, get_logger
+from Utilities.Metrics import count_rows, timed, Timer
+
+logger = get_logger(__name__)
+
+# Where the trained model is saved and loaded from
+MODEL_PATH = os.getenv('PRICE_MODEL_PATH', os.path.join(tempfile.gettempdir(), 'work-projects-models', 'price_model.npz'))
+
+# Strength of the ridge penalty on the model's weights
+RIDGE_ALPHA = float(os.getenv('PRICE_MODEL_ALPHA', '1.0'))
+
+# Categories seen fewer times than this in training are pooled into OTHER
+MIN_CATEGORY_COUNT = 5
+
+# Share of the training rows held out to measure the model's error
+HOLDOUT_SHARE = 0.2
+
+# Spec columns under the names used by the all-time inventory sheets and the raw testing exports;
+# the first one present in a frame is used (merged frames may carry a '_x'/'_y' suffix)
+SPEC_COLUMNS = {
+    'cpu': ('Processor', 'System Processor Information', 'CPU'),
+    'ram': ('RAM Capacity', 'Memory Size #1', 'System Memory Information', 'RAM'),
+    'drive': ('Drive Capacity', 'HDD Capacity #1', 'Storage'),
+    'drive_type': ('Drive Interface', 'HDD Form Factor #1', 'Drive Caddy'),
+    'condition': ('Condition',),
+    'brand': ('Brand', 'MFGR', 'System Manufacturer')
+}
+
+# Sale price column of the recovered revenue report
+TARGET_COLUMNS = ('Sale Price', 'Sales Price', 'Sold Price', 'Price')
+
+CATEGORICAL_FEATURES = ('cpu_family', 'drive_type', 'condition', 'brand')
+NUMERIC_FEATURES = ('cpu_generation', 'cpu_ghz', 'ram_gb', 'drive_gb')
+
+OTHER = 'OTHER'
+MISSING = 'MISSING'
+
+# CPU families, checked in order; the first pattern found in the processor text wins
+CPU_FAMILIES = [
+    (r'ULTRA\s*[579]', 'CORE ULTRA'),
+    (r'\bI9\b|I9-', 'CORE I9'),
+    (r'\bI7\b|I7-', 'CORE I7'),
+    (r'\bI5\b|I5-', 'CORE I5'),
+    (r'\bI3\b|I3-', 'CORE I3'),
+    (r'RYZEN\s*9', 'RYZEN 9'),
+    (r'RYZEN\s*7', 'RYZEN 7'),
+    (r'RYZEN\s*5', 'RYZEN 5'),
+    (r'RYZEN\s*3', 'RYZEN 3'),
+    (r'THREADRIPPER', 'THREADRIPPER'),
+    (r'EPYC', 'EPYC'),
+    (r'XEON', 'XEON'),
+    (r'CORE\s*(?:\(TM\))?\s*2|CORE2', 'CORE 2'),
+    (r'\bM[1-4]\b', 'APPLE'),
+    (r'CELERON', 'CELERON'),
+    (r'PENTIUM', 'PENTIUM'),
+    (r'ATOM', 'ATOM'),
+    (r'ATHLON', 'ATHLON'),
+]
+
+_UNIT_GB = {'T': 1024.0, 'G': 1.0, 'M': 1 / 1024}
+
+
+def _column(frame: pd.DataFrame, names) -> pd.Series:
+    """First of the named columns (or its merge-suffixed form) present in the frame, else all missing"""
+    for name in names:
+        for candidate in (name, f'{name}_y', f'{name}_x'):
+            if candidate in frame.columns:
+                return frame[candidate]
+    return pd.Series(pd.NA, index=frame.index, dtype='string')
+
+
+def _text(values: pd.Series) -> pd.Series:
+    return values.astype('string').str.upper().str.strip()
+
+
+def capacity_gb(values: pd.Series) -> pd.Series:
+    """
+    Capacity in GB parsed from text such as '16GB', '1 TB', '8192MB', '2x8GB' or 'DDR4 16GB'; only
+    a number followed by a unit is a size (so the 4 of DDR4 and the 2 of M.2 are not), except that
+    text which is just a number is taken as GB. 'No Drive' is 0.
+    """
+    text = _text(values)
+    sized = text.str.extract(r'(?:(\d+)\s*X\s*)?(\d+(?:\.\d+)?)\s*([TGM])B?\b(?!\.\d)')
+    bare = text.str.extract(r'^(?:(\d+)\s*X\s*)?(\d+(?:\.\d+)?)$')
+    has_unit = sized[1].notna()
+    count = pd.to_numeric(sized[0].where(has_unit, bare[0]), errors='coerce').fillna(1)
+    size = pd.to_numeric(sized[1].where(has_unit, bare[1]), errors='coerce')
+    unit = sized[2].where(has_unit, 'G').map(_UNIT_GB).astype('float64')
+    gb = (count * size * unit).astype('float64')
+    return gb.mask(text.str.contains(r'\bNO\b|NONE', na=False), 0.0)
+
+
+def cpu_family(values: pd.Series) -> pd.Series:
+    text = _text(values)
+    conditions = [text.str.contains(pattern, na=False).to_numpy() for pattern, _ in CPU_FAMILIES]
+    labels = np.select(conditions, [label for _, label in CPU_FAMILIES], default=OTHER)
+    return pd.Series(labels, index=values.index).where(text.notna().to_numpy(), MISSING)
+
+
+def cpu_generation(values: pd.Series) -> pd.Series:
+    """Generation from the model number: i5-8350U -> 8, i7-12700 -> 12, Ryzen 5 5600X -> 5"""
+    text = _text(values)
+    intel = text.str.extract(r'I[3579]\s*-?\s*(\d{4,5})')[0]
+    intel_gen = intel.str.slice(0, 2).where(intel.str.len() == 5, intel.str.slice(0, 1))
+    amd_gen = text.str.extract(r'RYZEN\s*\d\s*(?:PRO\s*)?(\d)\d{3}')[0]
+    return pd.to_numeric(intel_gen.fillna(amd_gen), errors='coerce').astype('float64')
+
+
+def cpu_ghz(values: pd.Series) -> pd.Series:
+    return pd.to_numeric(_text(values).str.extract(r'(\d+(?:\.\d+)?)\s*GHZ')[0], errors='coerce').astype('float64')
+
+
+def drive_type(interface: pd.Series, capacity: pd.Series) -> pd.Series:
+    text = (_text(interface).fillna('') + ' ' + _text(capacity).fillna('')).str.strip()
+    labels = np.select(
+        [
+            text.str.contains(r'NVME|PCIE', na=False).to_numpy(),
+            text.str.contains(r'SSD|SOLID|M\.2|EMMC', na=False).to_numpy(),
+            text.str.contains(r'HDD|RPM|SATA|SAS|2\.5|3\.5', na=False).to_numpy(),
+            text.str.contains(r'\bNO\b|NONE', na=False).to_numpy(),
+        ],
+        ['NVME', 'SSD', 'HDD', 'NONE'],
+        default=OTHER
+    )
+    return pd.Series(labels, index=interface.index).where((text != '').to_numpy(), MISSING)
+
+
+def _label(values: pd.Series, first_word: bool = False) -> pd.Series:
+    text = _text(values)
+    if first_word:
+        text = text.str.split().str[0]
+    return text.replace('', pd.NA).fillna(MISSING).astype(object)
+
+
+def spec_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """The raw spec columns a frame provides, one column per SPEC_COLUMNS entry"""
+    return pd.DataFrame({name: _column(frame, names) for name, names in SPEC_COLUMNS.items()}, index=frame.index)
+
+
+def item_specs(item: dict) -> tuple:
+    """Raw specs of one item given as a dict, keyed as spec_key keys the same row of spec_frame"""
+    values = []
+    for names in SPEC_COLUMNS.values():
+        candidates = [candidate for name in names for candidate in (name, f'{name}_y', f'{name}_x')]
+        values.append(next((item[candidate] for candidate in candidates if candidate in item), None))
+    return spec_key(values)
+
+
+def spec_key(values) -> tuple:
+    """Hashable form of one row of spec_frame"""
+    return tuple(None if value is None or value is pd.NA or value != value else str(value) for value in values)
+
+
+def _spec_features(specs: pd.DataFrame) -> pd.DataFrame:
+    drive = specs['drive']
+    return pd.DataFrame({
+        'cpu_family': cpu_family(specs['cpu']),
+        'drive_type': drive_type(specs['drive_type'], drive),
+        'condition': _label(specs['condition']),
+        'brand': _label(specs['brand'], first_word=True),
+        'cpu_generation': cpu_generation(specs['cpu']),
+        'cpu_ghz': cpu_ghz(specs['cpu']),
+        'ram_gb': capacity_gb(specs['ram']),
+        'drive_gb': capacity_gb(drive),
+    }, index=specs.index)
+
+
+@timed('price_features')
+def extract_features(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    Model features of every row, computed column-wise from the spec columns.
+
+    Inventories repeat the same few hundred spec combinations across many rows, so each distinct
+    combination is parsed once and the results are broadcast back to its rows.
+
+    :param frame: Merged pricing/spec rows or inventory rows (see SPEC_COLUMNS for the names read).
+    :return: DataFrame with CATEGORICAL_FEATURES (strings) and NUMERIC_FEATURES (floats, NaN if unknown).
+    """
+    specs = spec_frame(frame)
+    codes = specs.groupby(list(specs.columns), dropna=False, sort=False).ngroup().to_numpy()
+    distinct = specs.drop_duplicates()
+    features = _spec_features(distinct.reset_index(drop=True))
+    return features.take(codes).set_index(frame.index)
+
+
+@dataclass
+class PriceModel:
+    """
+    Ridge regression of log sale price on one-hot spec categories and standardized numeric specs.
+
+    Prediction never builds the one-hot matrix: each categorical feature adds the weight of its
+    category (a table lookup by code), and each numeric feature its standardized value times a
+    weight, or a learned missing-value weight when it is unknown.
+    """
+    vocabularies: dict
+    category_weights: dict
+    numeric_mean: np.ndarray
+    numeric_std: np.ndarray
+    numeric_weights: np.ndarray
+    missing_weights: np.ndarray
+    intercept: float
+    metadata: dict = field(default_factory=dict)
+
+    def _codes(self, name: str, values: pd.Series) -> np.ndarray:
+        """Code of each value in the feature's vocabulary; unseen values use OTHER"""
+        vocabulary = self.vocabularies[name]
+        codes = pd.Index(vocabulary).get_indexer(values.to_numpy(dtype=object))
+        return np.where(codes < 0, int(np.flatnonzero(vocabulary == OTHER)[0]), codes)
+
+    def predict_log(self, features: pd.DataFrame) -> np.ndarray:
+        log_price = np.full(len(features), self.intercept)
+        for name in CATEGORICAL_FEATURES:
+            log_price += self.category_weights[name][self._codes(name, features[name])]
+        numeric = features[list(NUMERIC_FEATURES)].to_numpy(dtype='float64')
+        missing = np.isnan(numeric)
+        scaled = np.where(missing, 0.0, (numeric - self.numeric_mean) / self.numeric_std)
+        log_price += scaled @ self.numeric_weights + missing @ self.missing_weights
+        return log_price
+
+    def predict(self, features: pd.DataFrame) -> np.ndarray:
+        return np.clip(np.expm1(self.predict_log(features)), 0.0, None)
+
+    def save(self, path: str = MODEL_PATH):
+        """Write the model as a NumPy archive (no pickled objects), replacing any previous one"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        arrays = {
+            'numeric_mean': self.numeric_mean,
+            'numeric_std': self.numeric_std,
+            'numeric_weights': self.numeric_weights,
+            'missing_weights': self.missing_weights,
+            'intercept': np.array([self.intercept]),
+            'metadata': np.array([json.dumps(self.metadata)]),
+        }
+        for name in CATEGORICAL_FEATURES:
+            arrays[f'vocabulary_{name}'] = self.vocabularies[name].astype(str)
+            arrays[f'weights_{name}'] = self.category_weights[name]
+
+        temp_path = f'{path}.tmp.npz'
+        np.savez(temp_path, **arrays)
+        os.replace(temp_path, path)  # workers never load a partial file
+
+    @classmethod
+    def load(cls, path: str = MODEL_PATH) -> 'PriceModel':
+        with np.load(path, allow_pickle=False) as archive:
+            return cls(
+                vocabularies={name: archive[f'vocabulary_{name}'].astype(object) for name in CATEGORICAL_FEATURES},
+                category_weights={name: archive[f'weights_{name}'] for name in CATEGORICAL_FEATURES},
+                numeric_mean=archive['numeric_mean'],
+                numeric_std=archive['numeric_std'],
+                numeric_weights=archive['numeric_weights'],
+                missing_weights=archive['missing_weights'],
+                intercept=float(archive['intercept'][0]),
+                metadata=json.loads(str(archive['metadata'][0]))
+            )
+
+
+def _vocabulary(values: pd.Series) -> np.ndarray:
+    counts = values.value_counts()
+    common = counts.index[counts >= MIN_CATEGORY_COUNT].astype(str)
+    return np.array(sorted(set(common) | {OTHER}), dtype=object)
+
+
+def _fit(features: pd.DataFrame, log_price: np.ndarray, alpha: float) -> PriceModel:
+    """Fit the ridge regression in closed form; the intercept is not penalized"""
+    vocabularies = {name: _vocabulary(features[name]) for name in CATEGORICAL_FEATURES}
+    numeric = features[list(NUMERIC_FEATURES)].to_numpy(dtype='float64')
+    missing = np.isnan(numeric)
+    known = np.where(missing.all(axis=0), 0.0, numeric)  # a feature never seen is left at 0
+    mean = np.nanmean(known, axis=0)
+    std = np.nanstd(known, axis=0)
+    std[std == 0] = 1.0
+
+    model = PriceModel(vocabularies, {}, mean, std, np.zeros(len(NUMERIC_FEATURES)),
+                       np.zeros(len(NUMERIC_FEATURES)), 0.0)
+    blocks, sizes = [], []
+    for name in CATEGORICAL_FEATURES:
+        one_hot = np.zeros((len(features), len(vocabularies[name])))
+        one_hot[np.arange(len(features)), model._codes(name, features[name])] = 1.0
+        blocks.append(one_hot)
+        sizes.append(len(vocabularies[name]))
+    blocks.append(np.where(missing, 0.0, (numeric - mean) / std))
+    blocks.append(missing.astype('float64'))
+    design = np.hstack([np.ones((len(features), 1)), *blocks])
+
+    penalty = np.full(design.shape[1], alpha)
+    penalty[0] = 0.0
+    weights = np.linalg.solve(design.T @ design + np.diag(penalty), design.T @ log_price)
+
+    model.intercept = float(weights[0])
+    offset = 1
+    for name, size in zip(CATEGORICAL_FEATURES, sizes):
+        model.category_weights[name] = weights[offset:offset + size]
+        offset += size
+    model.numeric_weights = weights[offset:offset + len(NUMERIC_FEATURES)]
+    model.missing_weights = weights[offset + len(NUMERIC_FEATURES):]
+    return model
+
+
+@timed('price_model_train')
+def train_price_model(frame: pd.DataFrame, target: str = None, alpha: float = RIDGE_ALPHA,
+                      holdout: float = HOLDOUT_SHARE, seed: int = 0) -> PriceModel:
+    """
+    Train the price model on merged pricing/spec rows.
+
+    The error is measured on a random holdout share of the rows first; the returned model is
+    then refit on every row.
+
+    :param frame: Merged rows with spec columns and a sale price (see TARGET_COLUMNS).
+    :param target: Sale price column, or None to use the first of TARGET_COLUMNS present.
+    :param alpha: Ridge penalty.
+    :param holdout: Share of rows held out to measure the error (0 to skip).
+    :param seed: Seed of the holdout split.
+    :return: PriceModel with the training details in its metadata.
+    """
+    target = target or next((name for name in TARGET_COLUMNS if name in frame.columns), None)
+    if target is None:
+        raise ValueError(f"No sale price column found (expected one of {', '.join(TARGET_COLUMNS)})")
+
+    price = pd.to_numeric(frame[target], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    priced = np.isfinite(price) & (price > 0)
+    if priced.sum() < 2:
+        raise ValueError("Not enough priced rows to train on")
+    features = extract_features(frame.loc[priced]).reset_index(drop=True)
+    log_price = np.log1p(price[priced])
+
+    metadata = {'target': target, 'rows': int(priced.sum()), 'alpha': alpha,
+                'trained': datetime.now().isoformat(timespec='seconds')}
+    if holdout:
+        test = np.random.default_rng(seed).random(len(features)) < holdout
+        if test.any() and (~test).sum() >= 2:
+            trial = _fit(features[~test], log_price[~test], alpha)
+            actual = np.expm1(log_price[test])
+            error = np.abs(trial.predict(features[test]) - actual)
+            metadata.update(holdout_rows=int(test.sum()), holdout_mae=float(error.mean()),
+                            holdout_median_ape=float(np.median(error / actual)))
+
+    model = _fit(features, log_price, alpha)
+    model.metadata = metadata
+    count_rows('price_model_train', len(features))
+    logger.info("Trained price model on %d rows (holdout MAE %s)", metadata['rows'], metadata.get('holdout_mae'))
+    return model
+
+
+_lock = threading.Lock()
+_loaded = {'path': None, 'stamp': None, 'model': None}
+
+
+def get_model(path: str = MODEL_PATH) -> PriceModel:
+    """
+    The saved model, loaded once per worker process and reloaded only when the file is replaced.
+
+    :raises FileNotFoundError: if no model has been trained yet.
+    """
+    stat = os.stat(path)
+    stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _lock:
+        if _loaded['path'] != path or _loaded['stamp'] != stamp:
+            with Timer('price_model_load'):
+                _loaded.update(path=path, stamp=stamp, model=PriceModel.load(path))
+            logger.info("Loaded price model trained %s", _loaded['model'].metadata.get('trained'))
+        return _loaded['model']
+
+
+@timed('price_model_predict')
+def predict_prices(frame: pd.DataFrame, model: PriceModel = None) -> np.ndarray:
+    """
+    Predicted sale price of every row.
+
+    :param frame: Inventory rows with spec columns.
+    :param model: PriceModel, or None for the saved model.
+    :return: Array of prices in dollars.
+    """
+    model = model or get_model()
+    prices = model.predict(extract_features(frame))
+    count_rows('price_model_predict', len(frame))
+    return prices
+
+
+def price_inventory(frame: pd.DataFrame, model: PriceModel = None) -> pd.DataFrame:
+    """Copy of the rows with a 'Predicted Price' column, rounded to cents"""
+    return frame.assign(**{'Predicted Price': np.round(predict_prices(frame, model), 2)})
+
+
+def training_frame(recovered_revenue: str = None, all_time: str = None, start=None, end=None) -> pd.DataFrame:
+    """
+    Rows to train on: merged straight from the two reports when both are given, otherwise the
+    slice of the feature store between start and end, reading only the columns the model uses.
+    """
+    if recovered_revenue and all_time:
+        from Pricing.ML_Export import merged_inventory
+        return merged_inventory(recovered_revenue, all_time)
+
+    from Pricing.Feature_Store import features
+    stored = set().union(*(info['columns'] for info in features.partitions().values()))
+    wanted = {name for names in SPEC_COLUMNS.values() for name in names} | set(TARGET_COLUMNS)
+    columns = sorted(col for col in stored if col in wanted or col.rsplit('_', 1)[0] in wanted)
+    return features.query(columns=columns, start=start, end=end)
+
+
+def main(argv=None):
+    configure_logging()
+    parser = argparse.ArgumentParser(description="Train the spec-based resale price model.")
+    parser.add_argument('--recovered-revenue', help="Recovered revenue workbook (default: read the feature store)")
+    parser.add_argument('--all-time', help="All-time inventory workbook")
+    parser.add_argument('--start', help="First sale date to train on (feature store only)")
+    parser.add_argument('--end', help="Last sale date to train on (feature store only)")
+    parser.add_argument('--alpha', type=float, default=RIDGE_ALPHA, help="Ridge penalty")
+    parser.add_argument('--output', default=MODEL_PATH, help="Where to save the model")
+    args = parser.parse_args(argv)
+
+    frame = training_frame(args.recovered_revenue, args.all_time, args.start, args.end)
+    model = train_price_model(frame, alpha=args.alpha)
+    model.save(args.output)
+    print(json.dumps(model.metadata, indent=2))
+
+
+if __name__ == "__main__":
+    main()
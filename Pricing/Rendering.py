@@ -0,0 +1,173 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from Utilities.Lazy_Import import lazy_import
+from Utilities.Logger import get_logger
+from Utilities.Metrics import count_bytes
+
+go = lazy_import('plotly.graph_objects')
+subplots = lazy_import('plotly.subplots')
+
+logger = get_logger(__name__)
+
+# Above this many rows, charts are binned on the server instead of shipping every value to the browser
+LARGE_DATA_ROWS = int(os.getenv('LARGE_DATA_ROWS', '50000'))
+
+# Maximum number of scatter points sent to the browser in large-data mode (0 disables downsampling)
+SCATTER_POINT_BUDGET = int(os.getenv('SCATTER_POINT_BUDGET', '20000'))
+
+# Grid resolution (per axis) used by density downsampling
+DOWNSAMPLE_GRID = 128
+
+
+def is_large(rows: int) -> bool:
+    return rows > LARGE_DATA_ROWS
+
+
+def box_statistics(values: np.ndarray) -> dict:
+    """
+    Compute the statistics plotly needs to draw a box without the raw values.
+
+    Whiskers follow plotly's default: the most extreme values within 1.5 IQR of the quartiles.
+
+    :param values: 1-D array of finite values.
+    :return: Dictionary of q1, median, q3, lowerfence and upperfence.
+    """
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return {
+        'q1': [q1],
+        'median': [median],
+        'q3': [q3],
+        'lowerfence': [inside.min()],
+        'upperfence': [inside.max()]
+    }
+
+
+def binned_histogram(values, nbins: int, title: str, x_title: str, y_title: str, color: str):
+    """
+    Histogram with a box-plot marginal, binned on the server.
+
+    Only the bin counts and five box statistics are sent to the browser, so the payload size is
+    independent of the number of rows.
+
+    :param values: Series or array of numeric values (NaN and inf are ignored).
+    :param nbins: Number of histogram bins.
+    :param title: Figure title.
+    :param x_title: X axis title.
+    :param y_title: Y axis title.
+    :param color: Bar and box color.
+    :return: Plotly figure object.
+    """
+    values = np.asarray(values, dtype='float64')
+    values = values[np.isfinite(values)]
+
+    fig = subplots.make_subplots(rows=2, cols=1, shared_xaxes=True, row_heights=[0.2, 0.8], vertical_spacing=0.02)
+    if values.size:
+        counts, edges = np.histogram(values, bins=nbins)
+        fig.add_trace(go.Box(
+            y=[x_title], orientation='h', name=x_title,
+            marker_color=color, showlegend=False, **box_statistics(values)
+        ), row=1, col=1)
+        fig.add_trace(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges),
+            marker_color=color, name=x_title, showlegend=False
+        ), row=2, col=1)
+
+    fig.update_layout(title=title, bargap=0.1)
+    fig.update_xaxes(title_text=x_title, row=2, col=1)
+    fig.update_yaxes(title_text=y_title, row=2, col=1)
+    fig.update_yaxes(showticklabels=False, row=1, col=1)
+    return fig
+
+
+def density_downsample(x, y, budget: int, grid: int = DOWNSAMPLE_GRID) -> np.ndarray:
+    """
+    Pick at most `budget` points, thinning dense regions while keeping sparse ones.
+
+    The plane is split into a grid and every cell keeps up to the same number of points, chosen
+    as the largest per-cell cap that fits the budget, so outliers always survive. When more cells
+    are occupied than the budget allows even one point each, the grid is coarsened until they fit.
+
+    :param x: X values.
+    :param y: Y values.
+    :param budget: Maximum number of points to keep.
+    :param grid: Number of cells per axis.
+    :return: Sorted integer positions of the points to keep.
+    """
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    if budget <= 0 or len(x) <= budget:
+        return np.arange(len(x))
+
+    def cell(values):
+        finite = np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+        low, high = finite.min(), finite.max()
+        scale = (grid - 1) / (high - low) if high > low else 0.0
+        return ((finite - low) * scale).astype('int64')
+
+    cells = cell(x) * grid + cell(y)
+
+    # Rank of each point inside its cell, in a random order so the kept points are unbiased
+    order = np.random.default_rng(0).permutation(len(cells))
+    order = order[np.argsort(cells[order], kind='stable')]
+    sorted_cells = cells[order]
+    starts = np.flatnonzero(np.r_[True, sorted_cells[1:] != sorted_cells[:-1]])
+    sizes = np.diff(np.r_[starts, len(sorted_cells)])
+    if len(sizes) > budget and grid > 1:
+        return density_downsample(x, y, budget, grid // 2)
+    ranks = np.arange(len(sorted_cells)) - np.repeat(starts, sizes)
+
+    # Largest per-cell cap whose total fits in the budget
+    low, high = 1, int(sizes.max())
+    while low < high:
+        cap = (low + high + 1) // 2
+        if np.minimum(sizes, cap).sum() <= budget:
+            low = cap
+        else:
+            high = cap - 1
+
+    return np.sort(order[ranks < low])
+
+
+def _data_bytes(value) -> int:
+    """Approximate size of a figure property: array bytes, text lengths and 8 bytes per other value"""
+    if isinstance(value, np.ndarray) and value.dtype != object:
+        return value.nbytes
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_data_bytes(item) for item in value.values())
+    if isinstance(value, (list, tuple, np.ndarray)):
+        types = set(map(type, value))
+        if types <= {int, float, bool, type(None)}:
+            return 8 * len(value)
+        if types == {str}:
+            return sum(map(len, value))
+        return sum(map(_data_bytes, value))
+    return 8
+
+
+def figure_payload_bytes(fig) -> int:
+    """
+    Estimated size of a figure sent to the browser: the bytes of its data arrays plus its layout.
+
+    Serializing the figure to measure it exactly costs as much as sending it, so the numeric arrays'
+    bytes and the lengths of all text (nested lists and object arrays included) are summed instead;
+    counted in the metrics and logged at debug level.
+
+    :param fig: Plotly figure object.
+    :return: Estimated payload size in bytes.
+    """
+    # The property dicts plotly serializes; to_plotly_json would deep-copy them first
+    size = _data_bytes(fig._data) + _data_bytes(fig._layout)
+    count_bytes('figure_payload', size)
+    logger.debug("Figure '%s' payload is about %.1f KiB", fig.layout.title.text or 'untitled', size / 1024)
+    return size
+
+
+def as_array(values: pd.Series) -> np.ndarray:
+    return pd.to_numeric(values, errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
@@ -0,0 +1,212 @@
+from dataclasses import dataclass, asdict
+
+import numpy as np
+import pandas as pd
+
+from Utilities.Columnar_Cache import cached_frame
+from Utilities.Logger import get_logger
+from Utilities.Metrics import count_rows, timed
+
+logger = get_logger(__name__)
+
+# Rows of the probe side handled at a time when it is given as one DataFrame
+PROBE_CHUNK_ROWS = 100_000
+
+# Text that stands for a missing serial number once normalized
+MISSING_SN = ['', 'NAN', 'NONE', 'NULL', 'N/A', 'NA', '<NA>']
+
+
+def normalize_sn(values: pd.Series) -> pd.Series:
+    """
+    Normalize serial numbers so the same device matches across sources.
+
+    Removes all whitespace, upper-cases, and strips the '.0' that Excel leaves on serial numbers
+    stored as numbers; placeholders such as 'N/A' become missing.
+
+    :param values: Raw serial numbers (any dtype).
+    :return: Series of normalized strings (pandas 'string' dtype) with <NA> for missing ones.
+    """
+    text = values.astype('string')
+    text = text.str.replace(r'\s+', '', regex=True).str.upper()
+    text = text.str.replace(r'^(\d+)\.0+$', r'\1', regex=True)
+    return text.mask(text.isin(MISSING_SN))
+
+
+@dataclass
+class JoinStats:
+    """Counts describing one serial number join"""
+    build_rows: int = 0
+    build_keys: int = 0
+    build_missing: int = 0
+    probe_rows: int = 0
+    probe_missing: int = 0
+    probe_matches: int = 0
+    matched_keys: int = 0
+    normalized_matches: int = 0
+
+    @property
+    def unmatched_keys(self) -> int:
+        return self.build_keys - self.matched_keys
+
+    @property
+    def match_rate(self) -> float:
+        return self.matched_keys / self.build_keys if self.build_keys else 0.0
+
+    def as_dict(self) -> dict:
+        return {**asdict(self), 'unmatched_keys': self.unmatched_keys, 'match_rate': self.match_rate}
+
+
+class SerialIndex:
+    """
+    Hash index from normalized serial number to the first row of a frame holding it.
+
+    Lookups go through a unique pandas Index (a hash table), so probing costs O(1) per row.
+    """
+
+    def __init__(self, keys: pd.Index, rows: np.ndarray, missing: int = 0, total: int = None):
+        self.keys = keys
+        self.rows = rows
+        self.missing = missing
+        self.total = len(rows) + missing if total is None else total
+
+    @classmethod
+    def build(cls, sn: pd.Series) -> 'SerialIndex':
+        normalized = normalize_sn(sn).reset_index(drop=True)
+        present = normalized.dropna()
+        first = ~present.duplicated(keep='first')
+        return cls(
+            keys=pd.Index(present[first].to_numpy(dtype=object)),
+            rows=present.index[first].to_numpy(),
+            missing=int(normalized.isna().sum()),
+            total=len(normalized)
+        )
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> 'SerialIndex':
+        """Rebuild from the frame written by to_frame"""
+        return cls(
+            keys=pd.Index(frame['key'].to_numpy(dtype=object)),
+            rows=frame['row'].to_numpy(dtype='int64'),
+            missing=int(frame['missing'].iloc[0]) if len(frame) else 0,
+            total=int(frame['total'].iloc[0]) if len(frame) else 0
+        )
+
+    def to_frame(self) -> pd.DataFrame:
+        """Flat frame of the index; the counts are repeated as columns so they survive the columnar cache"""
+        return pd.DataFrame({
+            'key': pd.array(self.keys, dtype='string'),
+            'row': self.rows,
+            'missing': self.missing,
+            'total': self.total
+        })
+
+    def lookup(self, normalized: pd.Series) -> np.ndarray:
+        """
+        Position in the index of each normalized key.
+
+        :return: Integer array, -1 where the key is missing or not indexed.
+        """
+        return self.keys.get_indexer(normalized.to_numpy(dtype=object, na_value=None))
+
+    def __len__(self):
+        return len(self.keys)
+
+
+def serial_index_for_file(filepath: str, loader: str, sn: pd.Series) -> SerialIndex:
+    """
+    Serial index of a source file's frame, kept in the columnar cache next to the frame itself
+    so the same file is only indexed once.
+
+    :param filepath: File the frame was read from.
+    :param loader: Name of the loader that produced the frame.
+    :param sn: The frame's SN column.
+    :return: SerialIndex.
+    """
+    frame = cached_frame(filepath, f'{loader}_sn_index', lambda: SerialIndex.build(sn).to_frame())
+    index = SerialIndex.from_frame(frame)
+    if not len(frame):
+        index.total = len(sn)
+    return index
+
+
+def _chunks(probe, chunk_rows: int):
+    if isinstance(probe, pd.DataFrame):
+        for start in range(0, len(probe), chunk_rows):
+            yield probe.iloc[start:start + chunk_rows]
+    else:
+        yield from probe
+
+
+def _suffixed(columns, other, key: str, suffix: str) -> dict:
+    """Rename columns that also appear on the other side, as pd.merge does"""
+    return {col: f'{col}{suffix}' for col in columns if col in other and col != key}
+
+
+@timed('serial_join')
+def join_on_serial(build: pd.DataFrame, probe, key: str = 'SN', index: SerialIndex = None,
+                   chunk_rows: int = PROBE_CHUNK_ROWS, suffixes=('_x', '_y')):
+    """
+    Inner join of two frames on normalized serial numbers, keeping one row per serial number.
+
+    Each build row is paired with the first probe row holding the same serial number, like
+    pd.merge followed by drop_duplicates on the key, but matching serial numbers that differ
+    only in whitespace, case or a trailing '.0'. The probe side is read chunk by chunk and only
+    its matching rows are kept, so it can be larger than memory when given as an iterator.
+
+    :param build: Frame to index (usually the smaller one); its row order is kept.
+    :param probe: DataFrame, or iterable of DataFrame chunks, to look up in the index.
+    :param key: Serial number column in both frames.
+    :param index: Prebuilt SerialIndex of build[key] (see serial_index_for_file).
+    :param chunk_rows: Chunk size used when probe is a single DataFrame.
+    :param suffixes: Suffixes for non-key columns present on both sides.
+    :return: (joined DataFrame, JoinStats).
+    """
+    index = index if index is not None else SerialIndex.build(build[key])
+    stats = JoinStats(build_rows=index.total, build_keys=len(index), build_missing=index.missing)
+
+    matched = np.zeros(len(index), dtype=bool)
+    positions, pieces = [], []
+    probe_columns = None
+    for chunk in _chunks(probe, chunk_rows):
+        probe_columns = chunk.columns
+        normalized = normalize_sn(chunk[key])
+        found = index.lookup(normalized)
+        stats.probe_rows += len(chunk)
+        stats.probe_missing += int(normalized.isna().sum())
+        stats.probe_matches += int((found >= 0).sum())
+
+        # First probe row for each indexed key not matched by an earlier chunk
+        hit_rows = np.flatnonzero(found >= 0)
+        hit_keys, first = np.unique(found[hit_rows], return_index=True)
+        new = ~matched[hit_keys]
+        hit_keys, rows = hit_keys[new], hit_rows[first[new]]
+        if len(rows) == 0:
+            continue
+        matched[hit_keys] = True
+
+        probe_raw = chunk[key].iloc[rows].astype('string').to_numpy(dtype=object, na_value=None)
+        build_raw = build[key].iloc[index.rows[hit_keys]].astype('string').to_numpy(dtype=object, na_value=None)
+        stats.normalized_matches += int((probe_raw != build_raw).sum())
+        positions.append(hit_keys)
+        pieces.append(chunk.iloc[rows].drop(columns=[key]).reset_index(drop=True))
+
+    stats.matched_keys = int(matched.sum())
+    left = build.rename(columns=_suffixed(build.columns, probe_columns if probe_columns is not None else [], key, suffixes[0]))
+    if not positions:
+        right_columns = [] if probe_columns is None else [col for col in probe_columns if col != key]
+        right = pd.DataFrame(columns=right_columns)
+        joined = pd.concat([left.iloc[:0].reset_index(drop=True), right], axis=1)
+    else:
+        order = np.argsort(index.rows[np.concatenate(positions)], kind='stable')
+        right = pd.concat(pieces, ignore_index=True).take(order).reset_index(drop=True)
+        build_rows = np.sort(index.rows[np.concatenate(positions)])
+        right = right.rename(columns=_suffixed(right.columns, build.columns, key, suffixes[1]))
+        joined = pd.concat([left.iloc[build_rows].reset_index(drop=True), right], axis=1)
+
+    count_rows('serial_join', stats.probe_rows)
+    logger.info(
+        "Serial join matched %d of %d serial numbers (%.1f%%), %d only after normalization; "
+        "%d probe rows scanned",
+        stats.matched_keys, stats.build_keys, 100 * stats.match_rate, stats.normalized_matches, stats.probe_rows
+    )
+    return joined, stats
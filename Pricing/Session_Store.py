@@ -0,0 +1,197 @@
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from Pricing.Dataset import PricingSnapshot
+from Pricing.Shared_Store import read_snapshot, write_snapshot
+from Utilities.Logger import get_logger
+from Utilities.Metrics import count_bytes, Timer
+
+logger = get_logger(__name__)
+
+# Total in-memory size of all session datasets in one worker; beyond it the least recently used are dropped
+SESSION_MEMORY_BYTES = int(os.getenv('SESSION_MEMORY_MB', '512')) * 1024 * 1024
+
+# Where every session's dataset is kept on disk (shared by the worker processes)
+SESSION_DIR = os.getenv('SESSION_DIR', os.path.join(tempfile.gettempdir(), 'work-projects-sessions'))
+
+# Session datasets not used for this long are deleted
+SESSION_TTL_SECONDS = float(os.getenv('SESSION_TTL_HOURS', '24')) * 3600
+
+# A session's files are marked as used at most this often (their mtime is its last use)
+TOUCH_INTERVAL_SECONDS = 60
+
+TOKEN_PATTERN = re.compile(r'^[A-Za-z0-9_-]{16,64}$')
+
+
+def new_token() -> str:
+    return secrets.token_urlsafe(24)
+
+
+def is_valid_token(token) -> bool:
+    """Tokens become file names, so only short url-safe strings are accepted"""
+    return isinstance(token, str) and TOKEN_PATTERN.match(token) is not None
+
+
+def frame_bytes(snapshot: PricingSnapshot) -> int:
+    return int(snapshot.frame.memory_usage(deep=True).sum())
+
+
+class SessionStore:
+    """
+    Per-session pricing datasets with a memory budget.
+
+    Every dataset is written through to a session file when stored, so evicting a session only
+    drops it from memory and the next access memory-maps it back. Because the files are the source
+    of truth, any worker process can serve any session, and an upload handled by one worker is
+    seen by the others on their next access (the file's identity is checked on every get).
+    """
+
+    def __init__(self, max_bytes: int = SESSION_MEMORY_BYTES, directory: str = SESSION_DIR,
+                 ttl_seconds: float = SESSION_TTL_SECONDS):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self._slots = OrderedDict()  # token -> (snapshot, size, file stamp)
+        self._total = 0
+        self._lock = threading.Lock()
+        self.reloads = 0
+        self.evictions = 0
+
+    def _paths(self, token: str):
+        base = os.path.join(self.directory, f'session-{token}')
+        return f'{base}.arrow', f'{base}.cube.arrow'
+
+    def aging_path(self, token: str) -> str:
+        """File of a session's inventory aging (see Pricing.Inventory_Aging.publish_update); expires like its dataset"""
+        return os.path.join(self.directory, f'session-{token}.aging.arrow')
+
+    @staticmethod
+    def _stat(path: str):
+        try:
+            return os.stat(path)
+        except FileNotFoundError:
+            return None
+
+    @staticmethod
+    def _stamp(stat):
+        # Not the mtime, which tracks last use: every write replaces the file, giving it a new inode
+        return None if stat is None else (stat.st_ino, stat.st_size)
+
+    @staticmethod
+    def _touch(paths, stat):
+        """Record a use of a session, so expiry counts from its last use rather than its last upload"""
+        if stat is None or time.time() - stat.st_mtime < TOUCH_INTERVAL_SECONDS:
+            return
+        for path in paths:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+
+    def get(self, token: str):
+        """
+        Return a session's dataset, reloading it from disk if it was evicted or replaced by another worker.
+
+        :param token: Session token.
+        :return: PricingSnapshot, or None if the session has no dataset.
+        """
+        if not is_valid_token(token):
+            return None
+
+        frame_path, cube_path = self._paths(token)
+        stat = self._stat(frame_path)
+        stamp = self._stamp(stat)
+        self._touch((frame_path, cube_path), stat)
+        with self._lock:
+            slot = self._slots.get(token)
+            if stamp is None:
+                if slot is not None:
+                    self._drop(token)
+                return None
+            if slot is not None and slot[2] == stamp:
+                self._slots.move_to_end(token)
+                return slot[0]
+
+        with Timer('session_reload'):
+            snapshot = read_snapshot(frame_path, cube_path)
+        self.reloads += 1
+        logger.info("Reloaded session dataset v%d from disk", snapshot.version)
+        return self._insert(token, snapshot, stamp)
+
+    def put(self, token: str, snapshot: PricingSnapshot) -> PricingSnapshot:
+        """
+        Store a session's dataset, replacing any previous one.
+
+        :param token: Session token.
+        :param snapshot: PricingSnapshot to store.
+        :return: The stored snapshot, memory-mapped from its session file.
+        """
+        if not is_valid_token(token):
+            raise ValueError('Invalid session token')
+
+        os.makedirs(self.directory, exist_ok=True)
+        frame_path, cube_path = self._paths(token)
+        with Timer('session_write'):
+            write_snapshot(frame_path, cube_path, snapshot)
+        count_bytes('session_write', os.path.getsize(frame_path))
+
+        stamp = self._stamp(self._stat(frame_path))
+        stored = self._insert(token, read_snapshot(frame_path, cube_path), stamp)
+        self.expire()
+        return stored
+
+    def _insert(self, token: str, snapshot: PricingSnapshot, stamp) -> PricingSnapshot:
+        size = frame_bytes(snapshot)
+        with self._lock:
+            if token in self._slots:
+                self._drop(token)
+            self._slots[token] = (snapshot, size, stamp)
+            self._total += size
+
+            # Always keep the session being served, even if it alone exceeds the budget
+            while self._total > self.max_bytes and len(self._slots) > 1:
+                evicted, _ = next(iter(self._slots.items()))
+                self._drop(evicted)
+                self.evictions += 1
+                logger.info("Evicted a session dataset from memory (%d sessions remain)", len(self._slots))
+        return snapshot
+
+    def _drop(self, token: str):
+        _, size, _ = self._slots.pop(token)
+        self._total -= size
+
+    def expire(self):
+        """Delete the files of sessions not used within the time-to-live"""
+        cutoff = time.time() - self.ttl_seconds
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.startswith('session-'):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'sessions_in_memory': len(self._slots),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'reloads': self.reloads,
+                'evictions': self.evictions
+            }
+
+
+# Store used by the apps in this process
+sessions = SessionStore()
@@ -0,0 +1,253 @@
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from Pricing.Aggregates import AggregateCube
+from Pricing.Dataset import PricingSnapshot
+from Utilities.Atomic_Write import write_arrow_table, write_atomic
+from Utilities.Columnar_Cache import PYARROW_AVAILABLE, make_arrow_compatible
+from Utilities.Lazy_Import import lazy_import
+from Utilities.Logger import get_logger
+from Utilities.Metrics import count_bytes, Timer
+
+try:
+    import fcntl
+except ImportError:  # Windows: versions are still ordered within one process
+    fcntl = None
+
+pa = lazy_import('pyarrow')
+
+logger = get_logger(__name__)
+
+# Directory shared by every worker process of the app
+STORE_DIR = os.getenv('SHARED_STORE_DIR', os.path.join(tempfile.gettempdir(), 'work-projects-store'))
+
+# Older dataset files kept around for workers still reading them
+KEEP_VERSIONS = 2
+
+MARKER = 'current.json'
+KEY_COLUMN = '__row_key'
+METADATA_KEY = b'pricing_snapshot'
+CUBE_METADATA_KEY = b'aggregate_cube'
+SKETCH_COLUMN = '__price_sketch'
+
+_lock = threading.Lock()
+_mapped = {'stamp': None, 'snapshot': None}
+
+
+def is_available() -> bool:
+    return PYARROW_AVAILABLE
+
+
+def _path(name: str) -> str:
+    return os.path.join(STORE_DIR, name)
+
+
+def _column_array(values: pd.Series):
+    """
+    Arrow array for one column, laid out so that reading it back does not copy.
+
+    Floats keep NaN as a value and datetimes keep NaT as its integer sentinel instead of using a
+    null bitmap, because Arrow only hands pandas its buffers directly when a column has no nulls.
+    """
+    if values.dtype.kind == 'f':
+        return pa.array(values.to_numpy(), from_pandas=False)
+    if values.dtype.kind == 'M':
+        data = values.to_numpy()
+        unit = np.datetime_data(data.dtype)[0]
+        return pa.Array.from_buffers(pa.timestamp(unit), len(data), [None, pa.py_buffer(data.view('int64'))])
+    return pa.Array.from_pandas(values)
+
+
+def _write_cube(path: str, cube: AggregateCube):
+    """
+    Write a cube as an Arrow IPC file: its groups, each group's price sketch as a fixed-size list
+    column, and the bin edges in the schema metadata. Only data is stored, never code, so a
+    tampered store file cannot run anything in the workers that read it.
+    """
+    table = pa.Table.from_pandas(make_arrow_compatible(cube.groups), preserve_index=False)
+    sketch = np.ascontiguousarray(cube.price_sketch, dtype='int64')
+    table = table.append_column(SKETCH_COLUMN, pa.FixedSizeListArray.from_arrays(
+        pa.array(sketch.ravel()), sketch.shape[1]
+    ))
+    edges = {'cost_edges': cube.cost_edges.tolist(), 'price_edges': cube.price_edges.tolist()}
+    metadata = {**(table.schema.metadata or {}), CUBE_METADATA_KEY: json.dumps(edges).encode()}
+    write_arrow_table(path, table.replace_schema_metadata(metadata))
+
+
+def _read_cube(path: str) -> AggregateCube:
+    """Read a cube written by _write_cube"""
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    edges = json.loads(table.schema.metadata[CUBE_METADATA_KEY])
+    bins = len(edges['price_edges']) - 1
+    sketch = table.column(SKETCH_COLUMN).combine_chunks().flatten().to_numpy(zero_copy_only=False)
+    groups = table.drop_columns([SKETCH_COLUMN]).to_pandas()
+    return AggregateCube(
+        groups=groups,
+        price_sketch=np.array(sketch, dtype='int64').reshape(len(groups), bins),
+        cost_edges=np.asarray(edges['cost_edges'], dtype='float64'),
+        price_edges=np.asarray(edges['price_edges'], dtype='float64')
+    )
+
+
+def write_snapshot(frame_path: str, cube_path: str, snapshot: PricingSnapshot, version: int = None):
+    """
+    Atomically write a snapshot as an uncompressed Arrow IPC file plus an Arrow file of its cube.
+
+    :param frame_path: Destination of the frame.
+    :param cube_path: Destination of the cube.
+    :param snapshot: PricingSnapshot to write.
+    :param version: Version recorded in the file; defaults to the snapshot's own.
+    """
+    frame = make_arrow_compatible(snapshot.frame)
+    columns = {str(col): _column_array(frame[col]) for col in frame.columns}
+    if snapshot.keys is not None:
+        columns[KEY_COLUMN] = pa.array(snapshot.keys, type=pa.uint64())
+    info = {'version': snapshot.version if version is None else version, 'created': snapshot.created}
+    table = pa.table(columns).replace_schema_metadata({METADATA_KEY: json.dumps(info).encode()})
+
+    # Cube first, so a reader that sees the new frame also finds its cube
+    write_atomic(cube_path, lambda path: _write_cube(path, snapshot.cube))
+    write_atomic(frame_path, lambda path: write_arrow_table(path, table))
+
+
+def read_snapshot(frame_path: str, cube_path: str) -> PricingSnapshot:
+    """
+    Memory-map a snapshot written by write_snapshot.
+
+    Numeric, date and text columns reference the mapped pages instead of being copied.
+
+    :param frame_path: Arrow IPC file.
+    :param cube_path: Arrow file of the cube.
+    :return: PricingSnapshot.
+    """
+    source = pa.memory_map(frame_path)
+    table = pa.ipc.open_file(source).read_all()
+    info = json.loads(table.schema.metadata[METADATA_KEY])
+    mapped = table.to_pandas(split_blocks=True)
+
+    keys = None
+    if KEY_COLUMN in mapped.columns:
+        keys = mapped[KEY_COLUMN].to_numpy()
+        mapped = mapped.drop(columns=[KEY_COLUMN])
+
+    cube = _read_cube(cube_path)
+
+    return PricingSnapshot(version=info['version'], frame=mapped, cube=cube, keys=keys, created=info['created'])
+
+
+class _VersionLock:
+    """Exclusive lock across processes (and threads) while a version is being published"""
+
+    def __enter__(self):
+        _lock.acquire()
+        if fcntl is not None:
+            self._file = open(_path('publish.lock'), 'w')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+        _lock.release()
+
+
+def read_marker():
+    """
+    Read the version marker.
+
+    :return: Dictionary with version, frame and cube file names, or None if nothing is published.
+    """
+    try:
+        with open(_path(MARKER)) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def next_version() -> int:
+    marker = read_marker()
+    return marker['version'] + 1 if marker else 1
+
+
+def publish(snapshot: PricingSnapshot) -> PricingSnapshot:
+    """
+    Write a snapshot to the shared store and make it the active dataset for every worker.
+
+    The frame is written as an uncompressed Arrow IPC file that workers memory-map, so the
+    operating system keeps a single copy of the data in its page cache. The cube is small and
+    written next to it. The snapshot is renumbered to follow the last published version.
+
+    :param snapshot: PricingSnapshot built by this worker.
+    :return: The published snapshot, mapped from the store.
+    """
+    os.makedirs(STORE_DIR, exist_ok=True)
+    with Timer('shared_store_publish'), _VersionLock():
+        version = next_version()
+        frame_file = f'pricing-v{version}.arrow'
+        cube_file = f'pricing-v{version}.cube.arrow'
+        write_snapshot(_path(frame_file), _path(cube_file), snapshot, version)
+
+        marker = {'version': version, 'frame': frame_file, 'cube': cube_file, 'created': snapshot.created}
+        write_atomic(_path(MARKER), lambda path: _write_json(path, marker))
+        _remove_old_versions(version)
+
+    count_bytes('shared_store_publish', os.path.getsize(_path(frame_file)))
+    logger.info("Published pricing dataset v%d (%d rows) to %s", version, snapshot.rows, STORE_DIR)
+    return current_snapshot()
+
+
+def _write_json(path: str, data: dict):
+    with open(path, 'w') as f:
+        json.dump(data, f)
+
+
+def _remove_old_versions(version: int):
+    """Delete dataset files more than KEEP_VERSIONS versions old"""
+    for name in os.listdir(STORE_DIR):
+        if not name.startswith('pricing-v'):
+            continue
+        try:
+            file_version = int(name[len('pricing-v'):].split('.')[0])
+            if file_version <= version - KEEP_VERSIONS:
+                # Workers that still map the file keep their pages until they move on
+                os.remove(_path(name))
+        except (ValueError, OSError):
+            continue
+
+
+def current_snapshot():
+    """
+    Return the active published snapshot, mapping a newer version if one appeared since the last call.
+
+    Checking costs one stat of the marker file, so it is cheap enough to call on every callback.
+
+    :return: PricingSnapshot, or None if nothing has been published.
+    """
+    try:
+        stat = os.stat(_path(MARKER))
+    except FileNotFoundError:
+        return None
+    stamp = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    if stamp == _mapped['stamp']:
+        return _mapped['snapshot']
+
+    with _lock:
+        if stamp != _mapped['stamp']:
+            marker = read_marker()
+            current = _mapped['snapshot']
+            if marker is not None and (current is None or current.version != marker['version']):
+                try:
+                    _mapped['snapshot'] = read_snapshot(_path(marker['frame']), _path(marker['cube']))
+                    logger.info("Mapped shared pricing dataset v%d", marker['version'])
+                except FileNotFoundError:
+                    # Superseded while we were reading the marker; the next call picks up the newer one
+                    return current
+            _mapped['stamp'] = stamp
+    return _mapped['snapshot']
@@ -0,0 +1,153 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from Utilities.Logger import get_logger
+from Utilities.Metrics import count_rows, timed
+
+logger = get_logger(__name__)
+
+# Worker processes used to parse sheets (defaults to one per core)
+SHEET_READER_WORKERS = int(os.getenv('SHEET_READER_WORKERS', '0')) or os.cpu_count() or 1
+
+# Sheets of an all-time inventory workbook that are not category data
+EXCLUDED_SHEETS = ('Dash Inventory',)
+
+# Column naming the sheet each row came from, when read_sheets is asked to tag rows
+SHEET_COLUMN = 'Sheet'
+
+
+def sheet_headers(filepath: str, exclude=EXCLUDED_SHEETS) -> dict:
+    """
+    Header row of every sheet, read without parsing the sheets' data.
+
+    :param filepath: Path to the Excel workbook.
+    :param exclude: Sheet names to skip.
+    :return: Dictionary of sheet name to list of column names, in workbook order.
+    """
+    workbook = openpyxl.load_workbook(filepath, read_only=True)
+    try:
+        headers = {}
+        for sheet in workbook.worksheets:
+            if sheet.title in exclude:
+                continue
+            first_row = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+            headers[sheet.title] = [value for value in first_row if value is not None]
+        return headers
+    finally:
+        workbook.close()
+
+
+def union_columns(headers: dict, columns=None) -> list:
+    """Every column found in any sheet, in order of first appearance, optionally pruned to `columns`"""
+    union = list(dict.fromkeys(col for names in headers.values() for col in names))
+    if columns is not None:
+        wanted = set(columns)
+        union = [col for col in union if col in wanted]
+    return union
+
+
+def _pruned(union: list, columns):
+    """Column filter handed to the workers: None (parse everything) unless columns were requested"""
+    return None if columns is None else set(union)
+
+
+def _read_sheet(filepath: str, sheet: str, columns) -> pd.DataFrame:
+    """Parse one sheet (runs in a worker process)"""
+    usecols = None if columns is None else (lambda name: name in columns)
+    return pd.read_excel(filepath, sheet_name=sheet, usecols=usecols)
+
+
+def common_dtype(dtypes, has_missing: bool = False):
+    """
+    Dtype that holds the values of every given dtype without loss.
+
+    :param dtypes: Dtypes of one column across sheets.
+    :param has_missing: Whether some sheet lacks the column, so it will be filled with NA there.
+    :return: The shared dtype when all agree (and it can hold NA if needed); float64 for mixed
+        numbers, the finest datetime64 for datetimes, object otherwise.
+    """
+    dtypes = list(dtypes)
+    kinds = {dtype.kind if isinstance(dtype, np.dtype) else 'O' for dtype in dtypes}
+    if kinds <= {'i', 'u', 'f'}:
+        if not has_missing and len(set(dtypes)) == 1:
+            return dtypes[0]
+        return np.dtype('float64')
+    if kinds == {'M'}:
+        return np.result_type(*dtypes)
+    if len(set(dtypes)) == 1 and not (has_missing and kinds == {'b'}):
+        return dtypes[0]
+    return np.dtype('object')
+
+
+def align(frame: pd.DataFrame, columns: list, dtypes: dict = None) -> pd.DataFrame:
+    """
+    Give a sheet's frame the union schema: every column in `columns` order (missing ones filled
+    with NA) and, when given, the unified dtypes. Only the columns cast to another dtype are copied.
+    """
+    aligned = frame.reindex(columns=columns)
+    if dtypes:
+        changed = {col: dtype for col, dtype in dtypes.items() if aligned[col].dtype != dtype}
+        if changed:
+            aligned = aligned.astype(changed)
+    return aligned
+
+
+def _parsed_sheets(filepath: str, sheets: list, columns, workers: int):
+    """Yield (sheet, frame) in workbook order, parsing the sheets in parallel"""
+    workers = max(1, min(workers, len(sheets)))
+    if workers == 1:
+        for sheet in sheets:
+            yield sheet, _read_sheet(filepath, sheet, columns)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_read_sheet, filepath, sheet, columns) for sheet in sheets]
+        for sheet, future in zip(sheets, futures):
+            yield sheet, future.result()
+
+
+@timed('read_all_sheets')
+def read_sheets(filepath: str, columns=None, exclude=EXCLUDED_SHEETS, workers: int = SHEET_READER_WORKERS,
+                sheet_column: str = None) -> pd.DataFrame:
+    """
+    Read every category sheet of a workbook in parallel into one DataFrame.
+
+    Every sheet is given the union columns and the unified dtypes, then all are concatenated.
+    With Copy-on-Write (pandas 3) the alignment copies only the columns whose dtype changes, so a
+    column already of its final dtype is copied once, by the concatenation.
+
+    :param filepath: Path to the Excel workbook.
+    :param columns: Columns to keep (others are never parsed), or None for all.
+    :param exclude: Sheet names to skip.
+    :param workers: Number of worker processes.
+    :param sheet_column: Name of a column to add holding each row's sheet name (e.g. SHEET_COLUMN),
+        or None to add none. The sheets of an all-time inventory are its categories.
+    :return: Combined DataFrame.
+    """
+    headers = sheet_headers(filepath, exclude)
+    union = union_columns(headers, columns)
+    sheets, frames = [], []
+    for sheet, frame in _parsed_sheets(filepath, list(headers), _pruned(union, columns), workers):
+        sheets.append(sheet)
+        frames.append(frame)
+    if not frames:
+        return pd.DataFrame(columns=union + ([sheet_column] if sheet_column else []))
+    if columns is None:
+        # The parsed frames are authoritative (e.g. pandas names blank headers 'Unnamed: n')
+        union = list(dict.fromkeys(col for frame in frames for col in frame.columns))
+
+    dtypes = {}
+    for col in union:
+        present = [frame[col].dtype for frame in frames if col in frame.columns]
+        dtypes[col] = common_dtype(present, has_missing=len(present) < len(frames))
+
+    combined = pd.concat([align(frame, union, dtypes) for frame in frames], ignore_index=True)
+    if sheet_column is not None:
+        codes = np.repeat(np.arange(len(frames)), [len(frame) for frame in frames])
+        combined[sheet_column] = pd.Categorical.from_codes(codes, categories=pd.Index(sheets, dtype=object))
+    logger.info("Read %d rows from %d sheets of %s", len(combined), len(frames), os.path.basename(filepath))
+    return combined
@@ -0,0 +1,224 @@
+import os
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from Pricing.Summary import _quantiles, _values, segments
+from Utilities.Lazy_Import import lazy_import
+from Utilities.Logger import get_logger
+from Utilities.Metrics import count_rows, timed
+
+go = lazy_import('plotly.graph_objects')
+
+logger = get_logger(__name__)
+
+# Scenarios simulated per request unless asked otherwise
+DEFAULT_SCENARIOS = int(os.getenv('SIMULATION_SCENARIOS', '200000'))
+MAX_SCENARIOS = 1_000_000
+
+# Random draws held in memory at once (scenarios x units); more are drawn in chunks
+DRAW_BUDGET = 4_000_000
+
+# Draws per simulation (about a second's work); large lots get fewer scenarios to stay within it
+MAX_DRAWS = int(os.getenv('SIMULATION_MAX_DRAWS', '40000000'))
+
+# A group needs this many past sales to be used; otherwise the next broader group is
+MIN_SAMPLES = 5
+
+# Groups tried for each lot line, most specific first
+LEVELS = (('Item', 'Condition'), ('Item',), ('Condition',), ())
+
+PROFIT_QUANTILES = (0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95)
+
+
+@dataclass(frozen=True)
+class EmpiricalSales:
+    """
+    Past sales of a pricing history arranged for sampling.
+
+    net holds what each sale brought in before its purchase cost (Profit + Purchase Cost, so fees
+    and revenue shares count as they happened; the sale price when either is missing) and days its
+    days to sell. order lists the sales once per level of LEVELS, grouped so the sales of each group
+    are contiguous, and groups[level] maps a group's labels to its (start, count) in order: a draw
+    from a group is one random offset into its slice.
+    """
+    net: np.ndarray
+    days: np.ndarray
+    order: np.ndarray
+    groups: dict
+
+    @property
+    def nbytes(self) -> int:
+        return self.net.nbytes + self.days.nbytes + self.order.nbytes
+
+    def locate(self, item, condition):
+        """
+        Slice of order to draw a lot line from.
+
+        :return: (level used, start, count), or None when the history has no sales at all.
+        """
+        wanted = {'Item': str(item or ''), 'Condition': str(condition or '')}
+        for level in LEVELS:
+            found = self.groups[level].get(tuple(wanted[col] for col in level))
+            if found is not None and (found[1] >= MIN_SAMPLES or not level):
+                return (level,) + found
+        return None
+
+
+@timed('empirical_sales')
+def build_empirical_sales(frame: pd.DataFrame) -> EmpiricalSales:
+    """
+    Arrange a processed pricing history for sampling (see EmpiricalSales).
+
+    :param frame: Pricing history with Item, Condition, Purchase Cost, Sale Price, Profit and # Days to sell.
+    :return: EmpiricalSales.
+    """
+    net = _values(frame, 'Profit') + _values(frame, 'Purchase Cost')
+    net = np.where(np.isnan(net), _values(frame, 'Sale Price'), net)
+    days = np.nan_to_num(_values(frame, '# Days to sell'))
+    usable = np.flatnonzero(~np.isnan(net))
+    labels = {col: frame[col].iloc[usable].astype('string').fillna('').to_numpy(dtype=object)
+              for col in ('Item', 'Condition')}
+
+    orders, groups, base = [], {}, 0
+    for level in LEVELS:
+        if level:
+            keys = pd.MultiIndex.from_arrays([labels[col] for col in level])
+            codes, names = pd.factorize(keys, sort=True)
+        else:
+            codes, names = np.zeros(len(usable), dtype='int64'), [()]
+        order, starts, counts = segments(np.asarray(codes, dtype='int64'), len(names))
+        orders.append(usable[order])
+        groups[level] = {tuple(name): (base + int(start), int(count))
+                         for name, start, count in zip(names, starts, counts) if count}
+        base += len(order)
+
+    count_rows('empirical_sales', len(frame))
+    return EmpiricalSales(net=net, days=days, order=np.concatenate(orders), groups=groups)
+
+
+@dataclass
+class SimulationResult:
+    """Outcome of simulating one lot"""
+    profit: np.ndarray
+    days_to_clear: np.ndarray
+    purchase_cost: float
+    lines: pd.DataFrame
+    quantiles: dict = field(default_factory=dict)
+
+    @property
+    def loss_probability(self) -> float:
+        return float((self.profit < 0).mean())
+
+    def as_dict(self) -> dict:
+        days = np.quantile(self.days_to_clear, [0.5, 0.9])
+        return {
+            'scenarios': len(self.profit),
+            'purchase_cost': self.purchase_cost,
+            'expected_profit': float(self.profit.mean()),
+            'loss_probability': self.loss_probability,
+            'profit_quantiles': self.quantiles,
+            'days_to_clear_quantiles': {'P50': float(days[0]), 'P90': float(days[1])},
+            'lines': self.lines.to_dict('records')
+        }
+
+
+@timed('simulate_lot')
+def simulate_lot(sales: EmpiricalSales, lot, purchase_cost: float, scenarios: int = DEFAULT_SCENARIOS,
+                 seed=None) -> SimulationResult:
+    """
+    Monte Carlo profit of buying a lot at a proposed cost.
+
+    In every scenario each unit of the lot sells like a past sale drawn at random from the same item
+    and condition (falling back to the item, then the condition, then all sales while a group has
+    fewer than MIN_SAMPLES), so its price and days to sell come from the same sale. The draws of all
+    scenarios and units are one array of random offsets, taken in chunks of DRAW_BUDGET.
+
+    :param sales: EmpiricalSales of the pricing history.
+    :param lot: Iterable of dicts with 'item', 'condition' and 'quantity'.
+    :param purchase_cost: Proposed total cost of the lot.
+    :param scenarios: Number of scenarios (at most MAX_SCENARIOS, and at most MAX_DRAWS / units).
+    :param seed: Random seed, for repeatable results.
+    :return: SimulationResult with the profit and the days to sell the whole lot in every scenario.
+    """
+    rng = np.random.default_rng(seed)
+    lines, starts, counts = [], [], []
+    for entry in lot:
+        quantity = int(entry.get('quantity', 1))
+        found = sales.locate(entry.get('item'), entry.get('condition')) if quantity > 0 else None
+        level, start, count = found or (None, 0, 0)
+        lines.append({
+            'item': entry.get('item'), 'condition': entry.get('condition'), 'quantity': quantity,
+            'basis': None if found is None else ' + '.join(level) or 'All sales', 'samples': count
+        })
+        if found is not None:
+            starts.append(np.full(quantity, start, dtype='int64'))
+            counts.append(np.full(quantity, count, dtype='int64'))
+    lines = pd.DataFrame(lines, columns=['item', 'condition', 'quantity', 'basis', 'samples'])
+
+    units = sum(len(unit_starts) for unit_starts in starts)
+    scenarios = max(1, min(int(scenarios), MAX_SCENARIOS, MAX_DRAWS // max(units, 1)))
+    profit = np.full(scenarios, -float(purchase_cost))
+    days = np.zeros(scenarios)
+    if starts:
+        starts, counts = np.concatenate(starts), np.concatenate(counts)
+        chunk = max(1, DRAW_BUDGET // len(starts))
+        for first in range(0, scenarios, chunk):
+            size = min(chunk, scenarios - first)
+            offsets = (rng.random((size, len(starts))) * counts).astype('int64')
+            rows = sales.order[offsets + starts]
+            profit[first:first + size] += sales.net[rows].sum(axis=1)
+            days[first:first + size] = sales.days[rows].max(axis=1)
+        count_rows('simulate_lot', scenarios * len(starts))
+
+    quantiles = dict(zip((f'P{level * 100:g}' for level in PROFIT_QUANTILES),
+                         _quantiles(profit.copy(), np.asarray(PROFIT_QUANTILES)).tolist()))
+    return SimulationResult(profit=profit, days_to_clear=days, purchase_cost=float(purchase_cost),
+                            lines=lines, quantiles=quantiles)
+
+
+def parse_lot(text: str) -> list:
+    """
+    Lot lines typed as 'Item, Condition, Quantity' (quantity optional, default 1), one per line.
+
+    :return: List of dicts for simulate_lot.
+    """
+    lot = []
+    for line in (text or '').splitlines():
+        parts = [part.strip() for part in line.split(',')]
+        if not parts[0]:
+            continue
+        quantity = int(float(parts[2])) if len(parts) > 2 and parts[2] else 1
+        lot.append({'item': parts[0], 'condition': parts[1] if len(parts) > 1 else '', 'quantity': quantity})
+    return lot
+
+
+def simulation_figure(result: SimulationResult, bins: int = 60):
+    """
+    Histogram of simulated lot profit with the P10, P50 and P90 marked.
+
+    The histogram is binned here, so the figure stays small however many scenarios were run.
+
+    :param result: SimulationResult.
+    :param bins: Number of bins.
+    :return: Plotly figure object.
+    """
+    counts, edges = np.histogram(result.profit, bins=bins)
+    centers = (edges[:-1] + edges[1:]) / 2
+    colors = np.where(centers < 0, 'indianred', 'seagreen')
+
+    fig = go.Figure(go.Bar(x=centers, y=counts / max(len(result.profit), 1), width=np.diff(edges),
+                           marker_color=colors, name='Scenarios'))
+    for label in ('P10', 'P50', 'P90'):
+        value = result.quantiles[label]
+        fig.add_vline(x=value, line_dash='dash', annotation_text=f'{label}: ${value:,.0f}')
+
+    fig.update_layout(
+        title=f'Simulated Lot Profit ({len(result.profit):,} scenarios, '
+              f'{100 * result.loss_probability:.1f}% chance of loss)',
+        xaxis_title='Profit ($)',
+        yaxis_title='Share of Scenarios',
+        bargap=0
+    )
+    return fig
@@ -0,0 +1,165 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from Utilities.Metrics import count_rows, timed
+
+# Row fields reported for individual items (the fields print_summary has always shown)
+SUMMARY_COLUMNS = [
+    'Item', 'Condition', 'Purchase Date', 'Purchase Cost', 'Sale Date', 'Sale Price',
+    'Profit', 'Revenue Share', 'Status', '# Days to sell'
+]
+
+DEFAULT_K = 20
+DEFAULT_QUANTILES = (0.1, 0.5, 0.9)
+
+
+def _values(frame: pd.DataFrame, column: str) -> np.ndarray:
+    return pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+
+
+def group_codes(values: pd.Series):
+    """Integer code of each row's group (-1 if missing) and the group labels, in sorted order"""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(dtype='int64'), values.cat.categories
+    codes, labels = pd.factorize(values, sort=True)
+    return codes.astype('int64'), labels
+
+
+def segments(codes: np.ndarray, groups: int):
+    """
+    Rows of each group, contiguous: (order, starts, counts) such that
+    order[starts[g]:starts[g] + counts[g]] are the rows of group g in their original order.
+
+    Codes are narrowed to the smallest integer type first, because a stable sort of 8 or 16-bit
+    integers is a radix sort: this costs O(n) rather than a full sort of the values.
+    """
+    present = codes >= 0
+    order = np.flatnonzero(present)
+    narrow = codes[present].astype(np.min_scalar_type(max(groups - 1, 0)))
+    order = order[np.argsort(narrow, kind='stable')]
+    counts = np.bincount(codes[present], minlength=groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    return order, starts, counts
+
+
+def top_positions(values: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """
+    Positions of the k largest (or smallest) non-missing values, best first.
+
+    Only the k selected values are sorted; the rest are split off with a linear-time partition.
+    """
+    if k <= 0:
+        return np.empty(0, dtype='int64')
+    candidates = np.flatnonzero(~np.isnan(values))
+    keys = -values[candidates] if largest else values[candidates]
+    if k < len(candidates):
+        chosen = np.argpartition(keys, k - 1)[:k]
+        candidates, keys = candidates[chosen], keys[chosen]
+    return candidates[np.argsort(keys, kind='stable')]
+
+
+@timed('summary_top_k')
+def top_k(frame: pd.DataFrame, by: str = 'Profit', k: int = DEFAULT_K, group: str = None,
+          largest: bool = True, columns=None) -> pd.DataFrame:
+    """
+    The k rows with the highest (or lowest) value of a column, overall or within each group.
+
+    :param frame: Processed pricing history.
+    :param by: Numeric column to rank by.
+    :param k: Rows to keep (per group when grouped).
+    :param group: Column to rank within (e.g. 'Condition'), or None to rank all rows.
+    :param largest: Keep the largest values (True) or the smallest.
+    :param columns: Columns to return; defaults to the SUMMARY_COLUMNS present.
+    :return: DataFrame ordered by group then rank, with a 1-based 'Rank' column.
+    """
+    columns = columns or [col for col in SUMMARY_COLUMNS if col in frame.columns]
+    values = _values(frame, by)
+    count_rows('summary_top_k', len(values))
+
+    if group is None:
+        positions = top_positions(values, k, largest)
+        ranks = np.arange(1, len(positions) + 1)
+    else:
+        codes, labels = group_codes(frame[group])
+        order, starts, counts = segments(codes, len(labels))
+        picked = []
+        for start, count in zip(starts, counts):
+            rows = order[start:start + count]
+            picked.append(rows[top_positions(values[rows], k, largest)])
+        positions = np.concatenate(picked) if picked else np.empty(0, dtype='int64')
+        ranks = np.concatenate([np.arange(1, len(rows) + 1) for rows in picked]) if picked else positions
+
+    result = frame.iloc[positions][columns].reset_index(drop=True)
+    result.insert(0, 'Rank', ranks)
+    if group is not None and group not in columns:
+        result.insert(0, group, frame[group].iloc[positions].to_numpy())
+    return result
+
+
+def _quantiles(values: np.ndarray, quantiles: np.ndarray) -> np.ndarray:
+    """Linearly interpolated quantiles (np.quantile's default), partitioning only around the needed ranks"""
+    positions = quantiles * (len(values) - 1)
+    low = np.floor(positions).astype('int64')
+    high = np.ceil(positions).astype('int64')
+    parted = np.partition(values, np.union1d(low, high))
+    return parted[low] + (parted[high] - parted[low]) * (positions - low)
+
+
+@timed('summary_quantiles')
+def grouped_quantiles(frame: pd.DataFrame, value: str = 'Sale Price', by: str = 'Item',
+                      quantiles=DEFAULT_QUANTILES) -> pd.DataFrame:
+    """
+    Exact quantiles of a column per group, e.g. P10/P50/P90 sale price per item.
+
+    Each group's values are only partitioned around the ranks the quantiles need, never sorted.
+
+    :param frame: Processed pricing history.
+    :param value: Numeric column to summarize.
+    :param by: Column to group by.
+    :param quantiles: Quantile levels between 0 and 1.
+    :return: DataFrame indexed by group with a 'Count' column and one 'P<level>' column per quantile;
+        groups without any value are left out.
+    """
+    quantiles = np.asarray(list(quantiles), dtype='float64')
+    values = _values(frame, value)
+    codes, labels = group_codes(frame[by])
+    codes = np.where(np.isnan(values), -1, codes)
+    order, starts, counts = segments(codes, len(labels))
+
+    kept = np.flatnonzero(counts)
+    table = np.empty((len(kept), len(quantiles)))
+    for row, code in enumerate(kept):
+        table[row] = _quantiles(values[order[starts[code]:starts[code] + counts[code]]], quantiles)
+
+    names = [f'P{level * 100:g}' for level in quantiles]
+    result = pd.DataFrame(table, columns=names, index=pd.Index(np.asarray(labels)[kept], name=by))
+    result.insert(0, 'Count', counts[kept])
+    count_rows('summary_quantiles', len(values))
+    return result
+
+
+def summarize(frame: pd.DataFrame, k: int = DEFAULT_K, quantiles=DEFAULT_QUANTILES) -> dict:
+    """
+    Standard summary of a pricing history.
+
+    :param frame: Processed pricing history.
+    :param k: Rows per top list.
+    :param quantiles: Quantile levels for the percentile tables.
+    :return: Dictionary of label to DataFrame.
+    """
+    return {
+        'Top Profit Items': top_k(frame, 'Profit', k),
+        'Lowest Profit Items': top_k(frame, 'Profit', k, largest=False),
+        'Top Profit Items by Condition': top_k(frame, 'Profit', k, group='Condition'),
+        'Slowest Sellers': top_k(frame, '# Days to sell', k),
+        'Sale Price Percentiles by Item': grouped_quantiles(frame, 'Sale Price', 'Item', quantiles),
+        'Profit Percentiles by Condition': grouped_quantiles(frame, 'Profit', 'Condition', quantiles),
+    }
+
+
+def as_records(result: pd.DataFrame) -> list:
+    """JSON-ready rows of a summary table (dates as ISO strings, missing values as None)"""
+    table = result.reset_index() if result.index.name is not None else result
+    return json.loads(table.to_json(orient='records', date_format='iso'))
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+from Utilities.Lazy_Import import lazy_import
+
+pa = lazy_import('pyarrow')
+
+
+def write_atomic(path: str, write):
+    """
+    Write a file so readers only ever see the old or the complete new version.
+
+    :param path: Destination file.
+    :param write: Function writing the content to the temporary path it is given (in the same folder).
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)  # readers never see a partial file
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def write_arrow_table(path: str, table):
+    """Write a pyarrow Table as an uncompressed Arrow IPC file, which readers can memory-map"""
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
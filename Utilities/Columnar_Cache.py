@@ -0,0 +1,248 @@
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from Utilities.Lazy_Import import lazy_import
+from Utilities.Logger import get_logger
+from Utilities.Metrics import count_bytes, Timer
+
+# pyarrow is optional: without it every load simply parses the source file
+pa = lazy_import('pyarrow')
+feather = lazy_import('pyarrow.feather')
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+logger = get_logger(__name__)
+
+CACHE_DIR = os.getenv('COLUMNAR_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'work-projects-cache'))
+CACHE_MAX_BYTES = int(os.getenv('COLUMNAR_CACHE_MB', '1024')) * 1024 * 1024
+
+# Bump whenever the cached representation or the loaders' output changes shape
+CACHE_FORMAT_VERSION = 2
+
+METADATA_KEY = b'work_projects_cache'
+
+# Suffix of the timestamp column holding the datetimes of a column that mixes them with other values
+DATETIME_SUFFIX = '__datetimes'
+
+_evict_lock = threading.Lock()
+
+
+def file_digest(filepath: str) -> str:
+    """SHA-256 of a file's contents, read in 1 MiB blocks"""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(digest: str, loader: str, params: dict = None) -> str:
+    """Key identifying one parse of one file content by one loader with given parameters"""
+    payload = json.dumps([CACHE_FORMAT_VERSION, digest, loader, params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _to_cacheable_value(value):
+    if pd.isna(value):
+        return value
+    # Midnight datetimes are written in a format parse_dates reads back exactly (the columnar cache
+    # keeps datetimes as timestamps instead, see _split_datetimes)
+    if isinstance(value, datetime):
+        return value.strftime('%Y/%m/%d') if value.time() == datetime.min.time() else value.isoformat(' ')
+    return str(value)
+
+
+def make_arrow_compatible(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert columns Arrow cannot store (typically Excel columns mixing numbers, text and dates)
+    to strings. Every other column is left untouched.
+
+    :param df: DataFrame to cache.
+    :return: DataFrame whose columns can all be written to Arrow.
+    """
+    converted = {}
+    for col in df.columns:
+        if df[col].dtype == object:
+            try:
+                pa.array(df[col], from_pandas=True)
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                converted[col] = df[col].map(_to_cacheable_value).astype('string')
+    if not converted:
+        return df
+    return df.assign(**converted)
+
+
+def _split_datetimes(df: pd.DataFrame):
+    """
+    Move the datetimes of columns mixing them with other values into timestamp columns of their own.
+
+    make_arrow_compatible would turn them into text, losing their type (and parse_dates only reads
+    dates without a time). Arrow stores the timestamp columns natively, so _join_datetimes puts
+    back exactly the values that were read from the source file.
+
+    :return: (DataFrame with the datetimes replaced by missing values plus the timestamp columns,
+              names of the split columns).
+    """
+    split = {}
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        try:
+            pa.array(df[col], from_pandas=True)
+            continue
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            pass
+        is_datetime = df[col].map(lambda value: isinstance(value, datetime)).to_numpy(dtype=bool)
+        if is_datetime.any():
+            split[col] = is_datetime
+    if not split:
+        return df, []
+
+    df = df.copy(deep=False)
+    for col, is_datetime in split.items():
+        df[f'{col}{DATETIME_SUFFIX}'] = pd.to_datetime(df[col].where(is_datetime))
+        df[col] = df[col].mask(is_datetime)
+    return df, [str(col) for col in split]
+
+
+def _join_datetimes(df: pd.DataFrame, columns: list) -> pd.DataFrame:
+    """Undo _split_datetimes on a frame read back from the cache"""
+    if not columns:
+        return df
+    restored = {}
+    for col in columns:
+        stamps = df[f'{col}{DATETIME_SUFFIX}']
+        restored[col] = df[col].astype(object).mask(stamps.notna(), stamps.astype(object))
+    return df.drop(columns=[f'{col}{DATETIME_SUFFIX}' for col in columns]).assign(**restored)
+
+
+def _dtypes(df: pd.DataFrame) -> dict:
+    return {str(col): str(dtype) for col, dtype in df.dtypes.items()}
+
+
+def _path(key: str) -> str:
+    return os.path.join(CACHE_DIR, f'{key}.feather')
+
+
+def read_cached(key: str, loader: str):
+    """
+    Memory-map a cached frame, checking its format version, loader and schema.
+
+    :return: DataFrame, or None on a miss or when the entry is stale (stale entries are deleted).
+    """
+    path = _path(key)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        table = feather.read_table(path, memory_map=True)
+        metadata = json.loads((table.schema.metadata or {}).get(METADATA_KEY, b'{}'))
+        if metadata.get('format_version') != CACHE_FORMAT_VERSION or metadata.get('loader') != loader:
+            raise ValueError('cache entry written by a different version')
+
+        df = table.to_pandas(split_blocks=True)
+        if list(df.columns.astype(str)) != metadata.get('columns') or _dtypes(df) != metadata.get('dtypes'):
+            raise ValueError('cached schema does not match')
+    except Exception as e:
+        logger.warning("Discarding cache entry %s: %s", key, e)
+        _remove(path)
+        return None
+
+    os.utime(path)  # mark as recently used for eviction
+    return _join_datetimes(df, metadata.get('datetime_columns', []))
+
+
+def write_cached(key: str, loader: str, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Store a frame (uncompressed, so later reads can be memory-mapped) and evict old entries.
+
+    :return: The frame as it will be read back from the cache.
+    """
+    df, datetime_columns = _split_datetimes(df)
+    df = make_arrow_compatible(df).reset_index(drop=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    restored = table.to_pandas(split_blocks=True)
+    metadata = {
+        'format_version': CACHE_FORMAT_VERSION,
+        'loader': loader,
+        'columns': list(restored.columns.astype(str)),
+        'dtypes': _dtypes(restored),
+        'datetime_columns': datetime_columns
+    }
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), METADATA_KEY: json.dumps(metadata).encode()})
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = _path(key)
+    fd, temp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    os.close(fd)
+    try:
+        feather.write_feather(table, temp_path, compression='uncompressed')
+        os.replace(temp_path, path)  # atomic, so readers never see a partial file
+    finally:
+        _remove(temp_path)
+
+    count_bytes('columnar_cache_write', os.path.getsize(path))
+    evict(CACHE_MAX_BYTES)
+    return _join_datetimes(restored, datetime_columns)
+
+
+def evict(max_bytes: int = CACHE_MAX_BYTES):
+    """Delete least recently used cache files until the cache fits in max_bytes"""
+    with _evict_lock:
+        if not os.path.isdir(CACHE_DIR):
+            return
+        entries = []
+        for name in os.listdir(CACHE_DIR):
+            if name.endswith('.feather'):
+                path = os.path.join(CACHE_DIR, name)
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            _remove(path)
+            total -= size
+            logger.info("Evicted %s from the columnar cache", os.path.basename(path))
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def cached_frame(filepath: str, loader: str, load_func, params: dict = None) -> pd.DataFrame:
+    """
+    Return load_func()'s DataFrame for a file, reusing the cached copy when the file content was seen before.
+
+    :param filepath: Source file; its content hash is part of the cache key.
+    :param loader: Name of the loading step (also part of the key).
+    :param load_func: Zero-argument function that parses the file on a miss.
+    :param params: Any reader parameters that affect the result.
+    :return: DataFrame.
+    """
+    if not PYARROW_AVAILABLE:
+        return load_func()
+
+    key = cache_key(file_digest(filepath), loader, params)
+    with Timer('columnar_cache_read'):
+        df = read_cached(key, loader)
+    if df is not None:
+        logger.debug("Columnar cache hit for %s (%s)", filepath, loader)
+        return df
+
+    df = load_func()
+    try:
+        df = write_cached(key, loader, df)
+    except Exception as e:
+        logger.warning("Could not cache %s (%s): %s", filepath, loader, e)
+    return df
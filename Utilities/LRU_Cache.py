@@ -0,0 +1,94 @@
+import sys
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache bounded by the total size of its values.
+
+    Sizes are measured once, when a value is stored, with the supplied sizeof function.
+    """
+
+    def __init__(self, max_bytes: int, sizeof=sys.getsizeof):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._total = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size: int = None):
+        """Store a value, evicting the least recently used entries until it fits"""
+        size = self.sizeof(value) if size is None else size
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total -= old[1]
+
+            # values larger than the whole budget are not worth keeping
+            if size > self.max_bytes:
+                return value
+
+            self._entries[key] = (value, size)
+            self._total += size
+            while self._total > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._total -= evicted_size
+                self.evictions += 1
+        return value
+
+    def get_or_create(self, key, factory):
+        """
+        Return the cached value for key, building and storing it with factory() on a miss.
+
+        The factory runs outside the lock, so two callers may occasionally build the same value.
+        """
+        sentinel = object()
+        value = self.get(key, sentinel)
+        if value is sentinel:
+            value = self.put(key, factory())
+        return value
+
+    def invalidate(self, predicate):
+        """Drop every entry whose key satisfies predicate(key)"""
+        with self._lock:
+            for key in [k for k in self._entries if predicate(k)]:
+                _, size = self._entries.pop(key)
+                self._total -= size
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
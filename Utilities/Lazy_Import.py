@@ -0,0 +1,117 @@
+import importlib
+import sys
+import threading
+import time
+import types
+
+# Registry of every lazily imported module, keyed by module name
+_LAZY_MODULES = {}
+
+# Startup timings recorded by the apps, keyed by label
+_STARTUP_TIMES = {}
+
+_LOCK = threading.RLock()
+
+
+class LazyModule(types.ModuleType):
+    """Module placeholder that performs the real import on first attribute access"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+        self.__dict__['_lazy_load_seconds'] = None
+
+    def _load(self):
+        """Import the wrapped module (once) and record how long it took"""
+        module = self.__dict__['_lazy_module']
+        if module is not None:
+            return module
+
+        with _LOCK:
+            module = self.__dict__['_lazy_module']
+            if module is None:
+                already_loaded = self.__name__ in sys.modules
+                start = time.perf_counter()
+                module = importlib.import_module(self.__name__)
+                # a module that was already imported elsewhere cost us nothing here
+                elapsed = 0.0 if already_loaded else time.perf_counter() - start
+                self.__dict__['_lazy_load_seconds'] = elapsed
+                self.__dict__['_lazy_module'] = module
+        return module
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.__dict__['_lazy_module'] is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.is_loaded else 'not loaded'
+        return f"<lazy module '{self.__name__}' ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """
+    Return a placeholder for a module that is only imported when first used.
+
+    Repeated calls for the same name share one placeholder so the import report stays accurate.
+
+    :param name: Dotted module name, e.g. 'pandas' or 'Pricing.Price_History'.
+    :return: LazyModule proxy for the module.
+    """
+    with _LOCK:
+        module = _LAZY_MODULES.get(name)
+        if module is None:
+            module = LazyModule(name)
+            _LAZY_MODULES[name] = module
+    return module
+
+
+def warm_up(names=None) -> dict:
+    """
+    Import lazily registered modules ahead of time.
+
+    Meant for pre-fork servers (e.g. gunicorn --preload) so the master process pays the import
+    cost once and the forked workers share the loaded pages.
+
+    :param names: Optional iterable of module names to load; defaults to every registered module.
+    :return: Dictionary of module name to load time in seconds.
+    """
+    targets = list(_LAZY_MODULES) if names is None else list(names)
+    timings = {}
+    for name in targets:
+        module = lazy_import(name)
+        module._load()
+        timings[name] = module.__dict__['_lazy_load_seconds']
+    return timings
+
+
+def record_startup(label: str, seconds: float):
+    """Store a startup timing (e.g. how long an app module took to import)"""
+    _STARTUP_TIMES[label] = round(seconds, 6)
+
+
+def import_report() -> dict:
+    """
+    Summarize which lazy modules have been imported so far and what each one cost.
+
+    :return: JSON-serializable dictionary.
+    """
+    modules = {}
+    for name, module in sorted(_LAZY_MODULES.items()):
+        load_seconds = module.__dict__['_lazy_load_seconds']
+        modules[name] = {
+            'loaded': module.is_loaded,
+            'load_seconds': None if load_seconds is None else round(load_seconds, 6)
+        }
+
+    return {
+        'startup': dict(_STARTUP_TIMES),
+        'lazy_modules': modules,
+        'loaded_count': sum(1 for m in modules.values() if m['loaded']),
+        'sys_modules_count': len(sys.modules)
+    }
@@ -0,0 +1,135 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import uuid
+
+# Correlation ID of the request currently being handled ('-' outside of a request)
+_request_id = contextvars.ContextVar('request_id', default='-')
+
+# Log one out of every LOG_SAMPLE_RATE high-volume debug messages per key
+LOG_SAMPLE_RATE = max(int(os.getenv('LOG_SAMPLE_RATE', '100')), 1)
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+
+_configure_lock = threading.Lock()
+
+_sample_counts = {}
+_sample_lock = threading.Lock()
+
+
+def get_request_id() -> str:
+    return _request_id.get()
+
+
+def set_request_id(request_id: str = None) -> str:
+    """
+    Set the correlation ID attached to every log record from the current context.
+
+    :param request_id: ID to use; a new random one is generated when omitted.
+    :return: The ID that was set.
+    """
+    request_id = request_id or uuid.uuid4().hex[:16]
+    _request_id.set(request_id)
+    return request_id
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current correlation ID to each record as record.request_id"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats each record as a single JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'request_id': getattr(record, 'request_id', '-'),
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: str = None, json_output: bool = None):
+    """
+    Set up the root handler for every module in the project.
+
+    Only entry points (the apps and command-line mains) call this; library modules just use
+    get_logger, so importing them never changes the logging of a host application.
+
+    :param level: Log level name; defaults to the LOG_LEVEL environment variable or INFO.
+    :param json_output: Emit JSON lines; defaults to LOG_JSON=1.
+    """
+    with _configure_lock:
+        level = (level or os.getenv('LOG_LEVEL', 'INFO')).upper()
+        if json_output is None:
+            json_output = os.getenv('LOG_JSON') == '1'
+
+        handler = logging.StreamHandler()
+        handler.addFilter(RequestIdFilter())
+        handler.setFormatter(JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+
+        root = logging.getLogger()
+        # replace our own handler when reconfiguring, but leave handlers installed by others alone
+        for existing in list(root.handlers):
+            if getattr(existing, '_work_projects_handler', False):
+                root.removeHandler(existing)
+        handler._work_projects_handler = True
+        root.addHandler(handler)
+        root.setLevel(level)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return a module logger; its output goes wherever the entry point configured (see configure_logging)"""
+    return logging.getLogger(name)
+
+
+def debug_sampled(logger: logging.Logger, key: str, msg: str, *args, rate: int = LOG_SAMPLE_RATE):
+    """
+    Log a high-volume debug message only once every `rate` calls for the given key.
+
+    Nothing is formatted (or counted) unless debug logging is enabled for the logger.
+
+    :param logger: Logger to write to.
+    :param key: Identifies the message stream being sampled.
+    :param msg: %-style message, formatted lazily by logging.
+    :param rate: Log one out of every `rate` calls.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    with _sample_lock:
+        count = _sample_counts.get(key, 0)
+        _sample_counts[key] = count + 1
+    if count % rate == 0:
+        logger.debug(msg, *args)
+
+
+def init_app(flask_app):
+    """
+    Attach correlation ID handling to a Flask app.
+
+    The ID is taken from the incoming X-Request-ID header (or generated) and echoed back on the response.
+    """
+    from flask import request
+
+    @flask_app.before_request
+    def _assign_request_id():
+        set_request_id(request.headers.get(REQUEST_ID_HEADER))
+
+    @flask_app.after_request
+    def _echo_request_id(response):
+        response.headers[REQUEST_ID_HEADER] = get_request_id()
+        return response
+
+    return flask_app
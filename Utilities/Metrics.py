@@ -0,0 +1,179 @@
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Instrumentation can be switched off with METRICS_ENABLED=0; timed functions then cost one flag check
+_enabled = os.getenv('METRICS_ENABLED', '1') != '0'
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_LOCK = threading.Lock()
+
+# stage name -> Histogram of latencies
+_LATENCIES = {}
+
+# counter name -> {stage name: value}
+_COUNTERS = {
+    'rows': {},
+    'bytes': {},
+    'errors': {}
+}
+
+_COUNTER_HELP = {
+    'rows': 'Rows processed by each stage.',
+    'bytes': 'Bytes processed by each stage.',
+    'errors': 'Errors raised by each stage.'
+}
+
+
+class Histogram:
+    """Cumulative bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def set_enabled(enabled: bool):
+    """Turn instrumentation on or off at runtime"""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def observe_latency(stage: str, seconds: float):
+    """Record one latency sample for a stage"""
+    if not _enabled:
+        return
+    with _LOCK:
+        histogram = _LATENCIES.get(stage)
+        if histogram is None:
+            histogram = _LATENCIES[stage] = Histogram()
+        histogram.observe(seconds)
+
+
+def _increment(counter: str, stage: str, amount):
+    if not _enabled:
+        return
+    with _LOCK:
+        values = _COUNTERS[counter]
+        values[stage] = values.get(stage, 0) + amount
+
+
+def count_rows(stage: str, rows: int):
+    """Add to the number of rows a stage has processed"""
+    _increment('rows', stage, rows)
+
+
+def count_bytes(stage: str, size: int):
+    """Add to the number of bytes a stage has processed"""
+    _increment('bytes', stage, size)
+
+
+def count_error(stage: str):
+    """Record an error for a stage that handles its own exceptions"""
+    _increment('errors', stage, 1)
+
+
+def timed(stage: str):
+    """
+    Decorator that records the latency of every call, and an error count when the call raises.
+
+    :param stage: Stage name used as the metric label.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            except Exception:
+                count_error(stage)
+                raise
+            finally:
+                observe_latency(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+class Timer:
+    """Context manager version of timed() for stages that are not a single function"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, Exception):
+            count_error(self.stage)
+        observe_latency(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def _format_value(value) -> str:
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def render_metrics() -> str:
+    """
+    Render every metric in the Prometheus text exposition format.
+
+    :return: Text suitable for a /metrics endpoint.
+    """
+    with _LOCK:
+        latencies = {stage: (h.buckets, list(h.counts), h.sum, h.count) for stage, h in _LATENCIES.items()}
+        counters = {name: dict(values) for name, values in _COUNTERS.items()}
+
+    lines = [
+        '# HELP stage_latency_seconds Latency of each instrumented stage.',
+        '# TYPE stage_latency_seconds histogram'
+    ]
+    for stage, (buckets, counts, total, count) in sorted(latencies.items()):
+        cumulative = 0
+        for bound, bucket_count in zip(buckets, counts):
+            cumulative += bucket_count
+            lines.append(f'stage_latency_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'stage_latency_seconds_bucket{{stage="{stage}",le="+Inf"}} {count}')
+        lines.append(f'stage_latency_seconds_sum{{stage="{stage}"}} {_format_value(total)}')
+        lines.append(f'stage_latency_seconds_count{{stage="{stage}"}} {count}')
+
+    for name, values in counters.items():
+        metric = f'stage_{name}_total'
+        lines.append(f'# HELP {metric} {_COUNTER_HELP[name]}')
+        lines.append(f'# TYPE {metric} counter')
+        for stage, value in sorted(values.items()):
+            lines.append(f'{metric}{{stage="{stage}"}} {_format_value(value)}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def reset_metrics():
+    """Clear every recorded metric"""
+    with _LOCK:
+        _LATENCIES.clear()
+        for values in _COUNTERS.values():
+            values.clear()
@@ -0,0 +1,156 @@
+import cProfile
+import functools
+import hmac
+import io
+import os
+import pstats
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+
+from flask import request, make_response
+
+# Profiling is only available when a token is configured, and only to callers that present it
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+
+# Folder where profile dumps are written for download
+ARTIFACT_DIR = os.getenv('ARTIFACT_DIR', os.path.join(tempfile.gettempdir(), 'work-projects-artifacts'))
+
+# Number of functions / allocation sites listed in the text summary
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+# cProfile and tracemalloc are process wide, so only one request is profiled at a time
+_PROFILE_LOCK = threading.Lock()
+
+
+def profiling_requested() -> bool:
+    """Checks the current request for the X-Profile header or ?profile=1 query flag"""
+    flag = request.headers.get('X-Profile') or request.args.get('profile')
+    return str(flag).lower() in {'1', 'true', 'yes'}
+
+
+def is_authorized() -> bool:
+    """Checks the X-Profile-Token header against the configured PROFILE_TOKEN"""
+    if not PROFILE_TOKEN:
+        return False
+    token = request.headers.get('X-Profile-Token', '')
+    return hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+def is_artifact(path: str) -> bool:
+    """Whether a downloadable file is a profile dump, which only authorized callers may fetch"""
+    return os.path.dirname(os.path.abspath(path)) == os.path.abspath(ARTIFACT_DIR)
+
+
+class RequestProfiler:
+    """Captures a cProfile dump and tracemalloc statistics for the code run inside it"""
+
+    def __init__(self, label: str, artifact_dir: str = ARTIFACT_DIR):
+        self.label = label
+        self.artifact_dir = artifact_dir
+        self.profile = cProfile.Profile()
+        self.started_tracing = False
+        self.snapshot = None
+        self.peak_bytes = 0
+        self.elapsed = 0.0
+        self._start = None
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        tracemalloc.reset_peak()
+        self._start = time.perf_counter()
+        self.profile.enable()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profile.disable()
+        self.elapsed = time.perf_counter() - self._start
+        self.snapshot = tracemalloc.take_snapshot()
+        self.peak_bytes = tracemalloc.get_traced_memory()[1]
+        if self.started_tracing:
+            tracemalloc.stop()
+        return False
+
+    def save(self) -> list:
+        """
+        Write the .prof dump and a readable .txt summary to the artifact folder.
+
+        :return: List of (filename, full path) tuples for the written files.
+        """
+        os.makedirs(self.artifact_dir, exist_ok=True)
+        base = f'profile-{self.label}-{uuid.uuid4().hex[:12]}'
+
+        prof_name = f'{base}.prof'
+        prof_path = os.path.join(self.artifact_dir, prof_name)
+        self.profile.dump_stats(prof_path)
+
+        summary = io.StringIO()
+        summary.write(f'Request     : {self.label}\n')
+        summary.write(f'Wall time   : {self.elapsed:.3f} s\n')
+        summary.write(f'Peak memory : {self.peak_bytes / 1024 / 1024:.2f} MiB\n\n')
+
+        summary.write(f'Top {TOP_FUNCTIONS} functions by cumulative time\n')
+        summary.write('-' * 40 + '\n')
+        stats = pstats.Stats(self.profile, stream=summary)
+        stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+
+        summary.write(f'\nTop {TOP_ALLOCATIONS} allocation sites\n')
+        summary.write('-' * 40 + '\n')
+        for stat in self.snapshot.statistics('lineno')[:TOP_ALLOCATIONS]:
+            summary.write(f'{stat}\n')
+
+        txt_name = f'{base}.txt'
+        txt_path = os.path.join(self.artifact_dir, txt_name)
+        with open(txt_path, 'w') as f:
+            f.write(summary.getvalue())
+
+        return [(prof_name, prof_path), (txt_name, txt_path)]
+
+
+def profiled(artifact_files: dict):
+    """
+    Decorator for Flask views that profiles the request when asked to by an authorized caller.
+
+    The artifact filenames are returned in the X-Profile-Artifacts response header and registered
+    in artifact_files so the app's /download/<filename> route can serve them (to callers presenting
+    the token again, see is_artifact).
+
+    :param artifact_files: The app's filename -> path dictionary of downloadable files.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not profiling_requested():
+                return view(*args, **kwargs)
+
+            if not is_authorized():
+                response = make_response(view(*args, **kwargs))
+                response.headers['X-Profile-Status'] = 'unauthorized'
+                return response
+
+            # another request is already being profiled; serve this one normally
+            if not _PROFILE_LOCK.acquire(blocking=False):
+                response = make_response(view(*args, **kwargs))
+                response.headers['X-Profile-Status'] = 'busy'
+                return response
+
+            try:
+                with RequestProfiler(view.__name__) as profiler:
+                    response = make_response(view(*args, **kwargs))
+                artifacts = profiler.save()
+            finally:
+                _PROFILE_LOCK.release()
+
+            for name, path in artifacts:
+                artifact_files[name] = path
+            response.headers['X-Profile-Status'] = 'captured'
+            response.headers['X-Profile-Artifacts'] = ', '.join(name for name, _ in artifacts)
+            response.headers['X-Profile-Peak-Memory'] = str(profiler.peak_bytes)
+            return response
+        return wrapper
+    return decorator
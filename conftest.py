@@ -0,0 +1 @@
+# Lets the tests import the repo's packages (Pricing, Utilities, ...) when pytest runs from the repo root
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def _pricing_history(rows: int = 2000) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        'Item': rng.choice(['Latitude 5400', 'EliteBook 840'], rows),
+        'Condition': rng.choice(['New', 'Used', None], rows),
+        'Purchase Date': pd.Timestamp('2023-01-01') + pd.to_timedelta(rng.integers(0, 300, rows), 'D'),
+        'Purchase Cost': rng.uniform(10, 100, rows),
+        'Sale Price': rng.uniform(50, 300, rows),
+        'Revenue Share': 0.1,
+        'Status': 'Sold',
+        '# Days to sell': rng.integers(0, 100, rows)
+    })
+    frame['Sale Date'] = frame['Purchase Date'] + pd.to_timedelta(frame['# Days to sell'], 'D')
+    frame['Profit'] = frame['Sale Price'] - frame['Purchase Cost']
+    return frame
+
+
+@pytest.fixture(scope='session')
+def pricing_history():
+    """Factory of processed pricing histories: pricing_history(rows) -> DataFrame (the same rows every call)"""
+    return _pricing_history
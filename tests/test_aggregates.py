@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Pricing.Aggregates import build_cube, merge_cube, rollup, sketch_quantiles
+from Pricing.Dataset import ingest_pricing_history
+
+
+@pytest.fixture(scope='module')
+def frame(pricing_history):
+    history = pricing_history(3000)
+    history.loc[::71, 'Sale Price'] = np.nan
+    return ingest_pricing_history(history, 1).frame
+
+
+def test_rollup_matches_groupby_on_rows(frame):
+    summed = rollup(build_cube(frame), 'month')
+
+    months = frame['Sale Date'].dt.to_period('M').dt.to_timestamp()
+    expected = frame.groupby(months)
+    np.testing.assert_array_equal(summed['count'], expected.size())
+    np.testing.assert_allclose(summed['profit_mean'], expected['Profit'].mean())
+    np.testing.assert_allclose(summed['days_mean'], expected['# Days to sell'].mean())
+    np.testing.assert_allclose(summed['sale_min'], expected['Sale Price'].min())
+    np.testing.assert_allclose(summed['sale_max'], expected['Sale Price'].max())
+
+
+def test_sketch_quantiles_stay_within_one_bin_of_exact(frame):
+    cube = build_cube(frame)
+    approximate = sketch_quantiles(cube, 'condition', [0.1, 0.5, 0.9])
+
+    exact = frame.groupby('Condition', observed=True)['Sale Price'].quantile([0.1, 0.5, 0.9]).unstack()
+    width = cube.price_edges[1] - cube.price_edges[0]
+    assert (np.abs(approximate.loc[exact.index].to_numpy() - exact.to_numpy()) <= width).all()
+
+
+def test_merging_in_batches_matches_one_build(frame):
+    # Every batch lies inside the ranges of the first, so each merge folds in without a rebuild
+    first = frame.iloc[:1000]
+    cube = build_cube(first)
+    batches = [first]
+    for start in range(1000, len(frame), 500):
+        batch = frame.iloc[start:start + 500]
+        batch = batch[batch['Purchase Cost'].between(*cube.cost_edges[[0, -1]])
+                      & batch['Sale Price'].between(*cube.price_edges[[0, -1]])]
+        batches.append(batch)
+        cube = merge_cube(cube, batch, pd.concat(batches, ignore_index=True))
+
+    expected = build_cube(pd.concat(batches, ignore_index=True), cost_edges=cube.cost_edges,
+                          price_edges=cube.price_edges)
+    pd.testing.assert_frame_equal(cube.groups, expected.groups, check_dtype=False)
+    np.testing.assert_array_equal(cube.price_sketch, expected.price_sketch)
@@ -0,0 +1,13 @@
+from ConsolidatedApp import app
+from Pricing.Dataset import ingest_pricing_history
+
+
+def test_datasets_with_the_same_version_do_not_share_caches(pricing_history):
+    # As when a session expires and its next upload starts again at version 1
+    first = ingest_pricing_history(pricing_history(500), 1)
+    second = ingest_pricing_history(pricing_history(800), 1)
+    filters = (('cost_min', 0.0),)
+
+    assert app.filtered_view(first, filters, 'token').rows == 500
+    assert app.filtered_view(second, filters, 'token').rows == 800
+    assert app.empirical_sales(first, 'token') is not app.empirical_sales(second, 'token')
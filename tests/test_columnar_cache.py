@@ -0,0 +1,31 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from Pricing.Price_History import parse_dates
+from Utilities import Columnar_Cache
+
+
+def test_cache_round_trip_keeps_datetimes_with_a_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(Columnar_Cache, 'CACHE_DIR', str(tmp_path))
+    source = tmp_path / 'source.xlsx'
+    source.write_bytes(b'workbook')
+
+    # Excel columns mix text dates, real datetimes and numbers
+    frame = pd.DataFrame({
+        'Sale Date': ['01/05/2023', datetime(2023, 3, 1, 15, 30), datetime(2023, 4, 2), None, 45000],
+        'Purchase Date': [datetime(2022, 12, 1, 9, 15)] * 4 + [None],
+        'Price': [10.0, 20.0, 30.0, 40.0, 50.0]
+    })
+
+    first = Columnar_Cache.cached_frame(str(source), 'test', lambda: frame)
+    second = Columnar_Cache.cached_frame(str(source), 'test', lambda: pytest.fail('cache missed'))
+
+    for loaded in (first, second):
+        assert list(loaded.columns) == list(frame.columns)
+        assert loaded.loc[1, 'Sale Date'] == datetime(2023, 3, 1, 15, 30)
+        for col in ('Sale Date', 'Purchase Date'):
+            pd.testing.assert_series_equal(parse_dates(loaded[col]), parse_dates(frame[col]), check_dtype=False)
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Pricing.Comparables import ComparablesIndex, spec_points
+from Pricing.Price_Model import extract_features
+
+PROCESSORS = ['Intel Core i5-8350U @ 1.70GHz', 'Intel Core i5-10310U @ 1.70GHz', 'Intel Core i7-8650U @ 1.90GHz',
+              'Intel Core i7-1185G7 @ 3.00GHz', 'AMD Ryzen 5 5600U @ 2.30GHz', None]
+
+
+def sold_items(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'SN': [f'{seed}-{row}' for row in range(rows)],
+        'Processor': rng.choice(PROCESSORS, rows),
+        'RAM Capacity': rng.choice(['4GB', '8GB', '16GB', '32GB', None], rows),
+        'Drive Capacity': rng.choice(['128GB', '256GB', '512GB', '1TB'], rows),
+        'Condition': rng.choice(['Used', 'Refurbished'], rows),
+        'Sale Price': rng.uniform(50, 600, rows).round(2)
+    })
+
+
+@pytest.fixture(scope='module')
+def index():
+    index = ComparablesIndex()
+    index.extend(sold_items(3000, 0))
+    index.extend(sold_items(500, 1))  # a second batch joins existing groups
+    return index
+
+
+def scan(index: ComparablesIndex, item: dict) -> pd.DataFrame:
+    """Every sold row with the item's exact-match features and its distance to the item"""
+    features = extract_features(index.frame)
+    query = extract_features(pd.DataFrame([item]))
+    points = np.nan_to_num((spec_points(features) - index.center) / index.scale, nan=0.0)
+    point = np.nan_to_num((spec_points(query)[0] - index.center) / index.scale, nan=0.0)
+
+    same = np.ones(len(features), dtype=bool)
+    for name in index.match:
+        same &= features[name].astype(str).to_numpy() == str(query[name].iloc[0])
+    return index.frame[same].assign(Distance=np.sqrt(((points[same] - point) ** 2).sum(axis=1)))
+
+
+@pytest.mark.parametrize('item', [
+    {'Processor': 'Intel Core i5-8350U @ 1.70GHz', 'RAM Capacity': '8GB', 'Drive Capacity': '256GB', 'Condition': 'Used'},
+    {'Processor': 'Intel Core i7-1185G7 @ 3.00GHz', 'RAM Capacity': '64GB', 'Drive Capacity': '2TB', 'Condition': 'Used'},
+    {'Processor': 'Intel Core i5-9500 @ 3.00GHz', 'RAM Capacity': None, 'Drive Capacity': '500GB',
+     'Condition': 'Refurbished'},
+])
+@pytest.mark.parametrize('k', [1, 10, 250])
+def test_nearest_matches_a_brute_force_scan(index, item, k):
+    comparables = index.nearest(item, k)
+    expected = scan(index, item).sort_values('Distance', kind='stable')
+
+    assert len(comparables) == min(k, len(expected))
+    np.testing.assert_allclose(comparables['Distance'], expected['Distance'].iloc[:k])
+    # Each row returned is a real comparable at the distance reported (ties may come in any order)
+    scanned = expected.set_index('SN')['Distance']
+    np.testing.assert_allclose(comparables['Distance'], scanned.loc[comparables['SN']])
+
+
+def test_nearest_returns_a_whole_small_group(index):
+    item = {'Processor': 'AMD Ryzen 5 5600U @ 2.30GHz', 'RAM Capacity': '16GB', 'Drive Capacity': '512GB',
+            'Condition': 'Refurbished'}
+    expected = scan(index, item)
+    assert len(index.nearest(item, len(expected) + 100)) == len(expected)
+
+
+def test_nearest_without_a_matching_group_is_empty(index):
+    item = {'Processor': 'Intel Xeon E5-2690', 'RAM Capacity': '16GB', 'Drive Capacity': '512GB', 'Condition': 'Used'}
+    comparables = index.nearest(item)
+    assert comparables.empty
+    assert 'Distance' in comparables.columns
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Pricing.Aggregates import build_cube, merge_cube
+from Pricing.Dataset import SchemaError, append_pricing_history, ingest_pricing_history
+
+
+def with_serials(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.assign(SN=[f'SN{row:06d}' for row in range(len(frame))])
+
+
+def assert_cubes_equal(actual, expected):
+    pd.testing.assert_frame_equal(actual.groups, expected.groups, check_dtype=False)
+    np.testing.assert_array_equal(actual.price_sketch, expected.price_sketch)
+
+
+def test_merge_cube_matches_build_cube_on_combined_rows(pricing_history):
+    frame = ingest_pricing_history(pricing_history(3000), 1).frame
+    old, new = frame.iloc[:2000], frame.iloc[2000:]
+    cube = build_cube(old)
+
+    # New rows inside the old ranges are folded in; the combined cube uses the same edges
+    inside = new[new['Purchase Cost'].between(*cube.cost_edges[[0, -1]])
+                 & new['Sale Price'].between(*cube.price_edges[[0, -1]])]
+    combined = pd.concat([old, inside], ignore_index=True)
+    assert_cubes_equal(merge_cube(cube, inside, combined),
+                       build_cube(combined, cost_edges=cube.cost_edges, price_edges=cube.price_edges))
+
+    # A new row outside them moves the edges, so the cube is rebuilt
+    outside = new.assign(**{'Sale Price': new['Sale Price'] + 1000})
+    combined = pd.concat([old, outside], ignore_index=True)
+    assert_cubes_equal(merge_cube(cube, outside, combined), build_cube(combined))
+
+
+def test_append_skips_rows_already_loaded_or_repeated(pricing_history):
+    history = with_serials(pricing_history(1000))
+    snapshot = ingest_pricing_history(history.iloc[:600], 1)
+
+    # Overlaps the loaded rows, repeats a row, and pads and lower-cases a loaded serial
+    batch = pd.concat([history.iloc[500:], history.iloc[[900]]], ignore_index=True)
+    batch.loc[0, 'SN'] = f" {batch.loc[0, 'SN'].lower()} "
+    appended = append_pricing_history(snapshot, batch, 2)
+
+    assert appended.rows == 1000
+    assert appended.frame['SN'].nunique() == 1000
+    assert_cubes_equal(appended.cube, build_cube(appended.frame, appended.cube.cost_edges, appended.cube.price_edges))
+
+
+def test_append_needs_serial_numbers(pricing_history):
+    snapshot = ingest_pricing_history(with_serials(pricing_history(100)), 1)
+    with pytest.raises(SchemaError, match='SN'):
+        append_pricing_history(snapshot, pricing_history(100), 2)
+
+
+@pytest.mark.parametrize('large_data_rows', [50_000, 1000])
+def test_readers_leave_the_shared_frame_unchanged(pricing_history, monkeypatch, large_data_rows):
+    from ConsolidatedApp.app import GRAPH_NAMES
+    from Pricing import Filtering, Price_History, Rendering, Simulation, Summary
+
+    monkeypatch.setattr(Rendering, 'LARGE_DATA_ROWS', large_data_rows)  # 1000: the binned charts
+    snapshot = ingest_pricing_history(with_serials(pricing_history(3000)), 1)
+    before = snapshot.frame.copy(deep=True)
+
+    for func in GRAPH_NAMES.values():
+        getattr(Price_History, func)(snapshot.frame)
+    Summary.summarize(snapshot.frame)
+    Filtering.filtered_snapshot(snapshot, Filtering.build_filter_index(snapshot), cost_min=20.0)
+    Simulation.build_empirical_sales(snapshot.frame)
+
+    # Frames derived from it are independent, even when written to
+    derived = snapshot.frame[snapshot.frame['Profit'] > 0]
+    derived['Profit'] = 0.0
+    derived.loc[derived.index[:10], 'Sale Price'] = -1.0
+    snapshot.frame.assign(Extra=1)
+
+    pd.testing.assert_frame_equal(snapshot.frame, before)
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Pricing.Dataset import ingest_pricing_history
+from Pricing.Filtering import build_filter_index, filtered_snapshot
+
+
+@pytest.fixture(scope='module')
+def snapshot(pricing_history):
+    history = pricing_history(3000)
+    history.loc[::97, 'Sale Date'] = pd.NaT
+    history.loc[::89, 'Item'] = None
+    history.loc[::83, 'Purchase Cost'] = np.nan
+    return ingest_pricing_history(history, 1)
+
+
+def scan(frame: pd.DataFrame, start=None, end=None, conditions=None, items=None, cost_min=None, cost_max=None):
+    """The filters as boolean masks over every row"""
+    keep = pd.Series(True, index=frame.index)
+    if start is not None:
+        keep &= frame['Sale Date'] >= pd.Timestamp(start)
+    if end is not None:
+        keep &= frame['Sale Date'] < pd.Timestamp(end).normalize() + pd.Timedelta(days=1)
+    if conditions:
+        keep &= frame['Condition'].astype(object).isin(conditions)
+    if items:
+        keep &= frame['Item'].isin(items)
+    if cost_min is not None:
+        keep &= frame['Purchase Cost'] >= cost_min
+    if cost_max is not None:
+        keep &= frame['Purchase Cost'] <= cost_max
+    return frame[keep].reset_index(drop=True)
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    {'start': '2023-03-01'},
+    {'end': '2023-06-15 08:00'},
+    {'start': '2023-04-01', 'end': '2023-04-30'},
+    {'start': '2024-06-01', 'end': '2023-01-01'},
+    {'conditions': ['Used']},
+    {'items': ['Latitude 5400', 'Unknown']},
+    {'cost_min': 40, 'cost_max': 60},
+    {'start': '2023-02-01', 'end': '2023-09-30', 'conditions': ['New', 'Used'],
+     'items': ['EliteBook 840'], 'cost_min': 20},
+])
+def test_filter_index_matches_mask_scan(snapshot, filters):
+    view = filtered_snapshot(snapshot, build_filter_index(snapshot), **filters)
+    pd.testing.assert_frame_equal(view.frame, scan(snapshot.frame, **filters))
@@ -0,0 +1,77 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Pricing.Inventory_Aging import InventoryAging, aging_rows
+from Pricing.Sheet_Reader import SHEET_COLUMN, read_sheets
+
+
+def inventory(rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'SN': [f'SN{seed}-{i}' for i in range(rows)],
+        SHEET_COLUMN: rng.choice(['Laptops', 'Desktops'], rows),
+        'Condition': rng.choice(['A', 'B', 'C'], rows),
+        'Date Received': (pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 600, rows), 'D'))
+        .where(rng.random(rows) > 0.05),
+        'Cost': rng.uniform(5, 200, rows),
+        'QTY': 1,
+        'Status': rng.choice(['Available', 'Sold'], rows)
+    })
+
+
+def test_incremental_update_matches_full_build():
+    first = inventory(5000, 1)
+    newer = first.iloc[300:].copy()
+    newer.loc[newer.index[:200], 'Status'] = 'Sold'
+    newer = pd.concat([newer, inventory(400, 2)], ignore_index=True)
+
+    incremental = InventoryAging()
+    incremental.update(first)
+    changes = incremental.update(newer)
+    full = InventoryAging()
+    full.update(newer)
+
+    assert changes['added'] < len(newer)
+    pd.testing.assert_frame_equal(incremental.report('2026-10-19'), full.report('2026-10-19'))
+
+
+def test_report_matches_row_scan():
+    frame = inventory(3000, 3)
+    aging = InventoryAging()
+    aging.update(frame)
+
+    rows = aging_rows(frame)
+    held = rows[rows['Units'] > 0]
+    expected = held.groupby(['Category', 'Condition'])['Capital'].sum()
+    report = aging.report('2026-10-19')
+
+    np.testing.assert_allclose(report['Capital'].to_numpy(), expected.loc[report.index].to_numpy())
+    assert set(report.index.get_level_values('Category')) == {'Laptops', 'Desktops'}
+
+
+def test_saved_state_round_trips(tmp_path):
+    pytest.importorskip('pyarrow')
+    aging = InventoryAging()
+    aging.update(inventory(2000, 4))
+    path = str(tmp_path / 'aging.arrow')
+
+    aging.save(path)
+    loaded = InventoryAging.load(path)
+
+    assert loaded.version == aging.version
+    pd.testing.assert_frame_equal(loaded.report('2026-10-19'), aging.report('2026-10-19'))
+    assert loaded.update(inventory(2000, 4))['added'] == 0
+
+
+def test_read_sheets_tags_rows_with_their_sheet(tmp_path):
+    path = str(tmp_path / 'inventory.xlsx')
+    with pd.ExcelWriter(path) as writer:
+        pd.DataFrame({'SN': ['a', 'b'], 'Cost': [1.0, 2.0]}).to_excel(writer, sheet_name='Laptops', index=False)
+        pd.DataFrame({'SN': ['c'], 'Cost': [3.0]}).to_excel(writer, sheet_name='Desktops', index=False)
+        pd.DataFrame({'x': [1]}).to_excel(writer, sheet_name='Dash Inventory', index=False)
+
+    combined = read_sheets(path, workers=1, sheet_column=SHEET_COLUMN)
+
+    assert list(combined[SHEET_COLUMN].astype(str)) == ['Laptops', 'Laptops', 'Desktops']
+    assert SHEET_COLUMN not in read_sheets(path, workers=1).columns
@@ -0,0 +1,33 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from Utilities.Lazy_Import import lazy_import
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages the apps must leave unimported until a request needs them
+HEAVY = ('Pricing', 'plotly', 'pandas', 'numpy', 'dash', 'openpyxl', 'pyarrow')
+
+
+@pytest.mark.parametrize('app', ['ConsolidatedApp.app', 'ExcelFormatAPI.app'])
+def test_importing_an_app_leaves_heavy_modules_unloaded(app, tmp_path):
+    # A fresh interpreter, since this one has already imported them for the other tests
+    script = (
+        f'import json, sys, {app}; '
+        f'print(json.dumps(sorted(name for name in sys.modules if name.split(".")[0] in {HEAVY!r})))'
+    )
+    env = {**os.environ, 'PYTHONPATH': ROOT, 'WARM_UP': '0'}
+    result = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, check=True)
+    assert json.loads(result.stdout.splitlines()[-1]) == []
+
+
+def test_lazy_module_loads_on_first_attribute():
+    module = lazy_import('json')
+    assert not module.is_loaded
+    assert module.dumps([1]) == '[1]'
+    assert module.is_loaded
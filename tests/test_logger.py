@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_importing_library_modules_leaves_logging_alone(tmp_path):
+    script = (
+        'import logging, Pricing.Dataset, Pricing.Serial_Join, Utilities.Columnar_Cache; '
+        'root = logging.getLogger(); print(len(root.handlers), root.level)'
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=tmp_path, env={**os.environ, 'PYTHONPATH': ROOT},
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.split() == ['0', str(30)]  # no handler, WARNING as Python leaves it
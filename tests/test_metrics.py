@@ -0,0 +1,58 @@
+import pytest
+
+from Utilities import Metrics
+
+
+@pytest.fixture(autouse=True)
+def metrics():
+    Metrics.set_enabled(True)
+    Metrics.reset_metrics()
+    yield
+    Metrics.reset_metrics()
+
+
+def test_counters_add_up_per_stage():
+    Metrics.count_rows('ingest', 10)
+    Metrics.count_rows('ingest', 5)
+    Metrics.count_bytes('ingest', 2048)
+    Metrics.count_rows('export', 3)
+
+    text = Metrics.render_metrics()
+    assert 'stage_rows_total{stage="ingest"} 15' in text
+    assert 'stage_rows_total{stage="export"} 3' in text
+    assert 'stage_bytes_total{stage="ingest"} 2048' in text
+
+
+def test_timed_counts_errors_and_latencies():
+    @Metrics.timed('parse')
+    def parse(value):
+        return int(value)
+
+    parse('1')
+    with pytest.raises(ValueError):
+        parse('x')
+
+    text = Metrics.render_metrics()
+    assert 'stage_latency_seconds_count{stage="parse"} 2' in text
+    assert 'stage_latency_seconds_bucket{stage="parse",le="+Inf"} 2' in text
+    assert 'stage_errors_total{stage="parse"} 1' in text
+
+
+def test_timer_records_a_sample():
+    with Metrics.Timer('render'):
+        pass
+    assert 'stage_latency_seconds_count{stage="render"} 1' in Metrics.render_metrics()
+
+
+def test_disabled_metrics_record_nothing():
+    Metrics.set_enabled(False)
+    try:
+        Metrics.count_rows('ingest', 10)
+        with Metrics.Timer('render'):
+            pass
+    finally:
+        Metrics.set_enabled(True)
+
+    text = Metrics.render_metrics()
+    assert 'stage="ingest"' not in text
+    assert 'stage="render"' not in text
@@ -0,0 +1,59 @@
+import numpy as np
+import openpyxl
+import pandas as pd
+import pytest
+
+from ExcelFormatAPI.FormatReportProduction import autofit, copy_data, create_table, format_header
+from Pricing.ML_Export import export_merged, write_columnar
+from Utilities.Columnar_Cache import PYARROW_AVAILABLE
+
+
+@pytest.fixture
+def merged():
+    rows = 50
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({
+        'SN': [f'5CD{row:07d}' for row in range(rows)],
+        'Description': [f'Latitude 5400 {row} - Dash Specs' for row in range(rows)],
+        'Grade': rng.choice(['A', 'B', None], rows),
+        'Price': rng.uniform(50, 300, rows).round(2),
+        'Units': rng.integers(1, 5, rows)
+    })
+    frame.loc[::7, 'Price'] = np.nan
+    return frame
+
+
+def legacy_workbook(df: pd.DataFrame, tmp_path) -> openpyxl.Workbook:
+    """The workbook the old raw_output.xlsx route produced"""
+    raw = tmp_path / 'raw_output.xlsx'
+    df.to_excel(raw, index=False)
+    final = copy_data(openpyxl.load_workbook(raw))
+    for sheet in final.worksheets:
+        create_table(sheet)
+        format_header(sheet)
+        autofit(sheet)
+    final.save(tmp_path / 'legacy.xlsx')
+    return openpyxl.load_workbook(tmp_path / 'legacy.xlsx')
+
+
+def test_export_matches_the_raw_workbook_route(merged, tmp_path):
+    export_merged(merged, str(tmp_path / 'final_output.xlsx'))
+    sheet = openpyxl.load_workbook(tmp_path / 'final_output.xlsx')['Sheet1']
+    expected = legacy_workbook(merged, tmp_path)['Sheet1']
+
+    assert [[cell.value for cell in row] for row in sheet.iter_rows()] == \
+           [[cell.value for cell in row] for row in expected.iter_rows()]
+    assert sheet['B2'].value == 'Latitude 5400 0'
+    for column in 'ABCDE':
+        assert sheet.column_dimensions[column].width == expected.column_dimensions[column].width
+        assert sheet[f'{column}1'].fill.fgColor.rgb == expected[f'{column}1'].fill.fgColor.rgb
+    assert [table.ref for table in sheet.tables.values()] == [table.ref for table in expected.tables.values()]
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason='pyarrow is not installed')
+@pytest.mark.parametrize('name', ['merged.parquet', 'merged.feather'])
+def test_columnar_output_round_trips(merged, tmp_path, name):
+    path = str(tmp_path / name)
+    write_columnar(merged, path)
+    read = pd.read_parquet(path) if name.endswith('.parquet') else pd.read_feather(path)
+    pd.testing.assert_frame_equal(read, merged, check_dtype=False)
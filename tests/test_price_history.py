@@ -0,0 +1,33 @@
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from Pricing.Price_History import calculate_date_difference, days_between, parse_dates
+
+# Everything an exported date column has been seen to hold
+DATE_VALUES = [
+    '01/05/2023', '1/5/2023', '2023/01/05', '2023/1/31', '12/31/2022', '02/30/2023', '2023-01-05',
+    'not a date', '', None, np.nan, pd.NaT, datetime(2023, 3, 1, 15, 30), pd.Timestamp('2022-11-11'),
+    date(2023, 2, 1), 45000, 45000.0
+]
+
+
+def test_days_between_matches_calculate_date_difference():
+    start = pd.Series([first for first in DATE_VALUES for _ in DATE_VALUES], dtype=object)
+    end = pd.Series(DATE_VALUES * len(DATE_VALUES), dtype=object)
+
+    expected = [calculate_date_difference(first, second) for first, second in zip(start, end)]
+    assert days_between(start, end).tolist() == expected
+
+
+def test_parse_dates_keeps_datetime_columns():
+    values = pd.Series(pd.to_datetime(['2023-01-05', None]))
+    assert parse_dates(values) is values
+
+
+def test_parse_dates_broadcasts_repeated_values():
+    parsed = parse_dates(pd.Series(['01/05/2023', '2023/01/05', 'junk'] * 1000))
+    assert (parsed.iloc[0::3] == pd.Timestamp('2023-01-05')).all()
+    assert (parsed.iloc[1::3] == pd.Timestamp('2023-01-05')).all()
+    assert parsed.iloc[2::3].isna().all()
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Pricing.Price_Model import capacity_gb
+
+
+@pytest.mark.parametrize('text, gb', [
+    ('16GB', 16.0),
+    ('16 gb', 16.0),
+    ('1 TB', 1024.0),
+    ('8192MB', 8.0),
+    ('2x8GB', 16.0),
+    ('2 X 4 GB', 8.0),
+    ('DDR4 16GB', 16.0),
+    ('16GB DDR4', 16.0),
+    ('M.2 256GB', 256.0),
+    ('256GB M.2 NVMe', 256.0),
+    ('512G SSD', 512.0),
+    ('16', 16.0),
+    (8, 8.0),
+    ('No Drive', 0.0),
+    ('None', 0.0),
+    ('DDR4', np.nan),
+    ('M.2', np.nan),
+    (None, np.nan),
+])
+def test_capacity_gb(text, gb):
+    np.testing.assert_equal(capacity_gb(pd.Series([text], dtype=object)).iloc[0], gb)
@@ -0,0 +1,26 @@
+import pytest
+
+from ExcelFormatAPI import app as format_app
+from Utilities import Profiling
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(Profiling, 'PROFILE_TOKEN', 'secret')
+    monkeypatch.setattr(Profiling, 'ARTIFACT_DIR', str(tmp_path / 'artifacts'))
+    (tmp_path / 'artifacts').mkdir()
+    (tmp_path / 'artifacts' / 'profile-x.txt').write_text('profile')
+    (tmp_path / 'formatted.xlsx').write_text('workbook')
+    monkeypatch.setitem(format_app.TEMP_FILES, 'profile-x.txt', str(tmp_path / 'artifacts' / 'profile-x.txt'))
+    monkeypatch.setitem(format_app.TEMP_FILES, 'formatted.xlsx', str(tmp_path / 'formatted.xlsx'))
+    return format_app.app.test_client()
+
+
+def test_profile_artifacts_need_the_token(client):
+    assert client.get('/download/profile-x.txt').status_code == 403
+    assert client.get('/download/profile-x.txt', headers={'X-Profile-Token': 'wrong'}).status_code == 403
+    assert client.get('/download/profile-x.txt', headers={'X-Profile-Token': 'secret'}).status_code == 200
+
+
+def test_other_downloads_need_no_token(client):
+    assert client.get('/download/formatted.xlsx').status_code == 200
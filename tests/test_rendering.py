@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from Pricing.Rendering import DOWNSAMPLE_GRID, density_downsample, figure_payload_bytes
+
+
+@pytest.mark.parametrize('rows, budget', [(200_000, 5000), (200_000, 500), (1803, 500), (50_000, 20_000), (10, 1)])
+def test_density_downsample_keeps_at_most_budget(rows, budget):
+    rng = np.random.default_rng(rows + budget)
+    x, y = rng.random(rows), rng.random(rows)
+
+    keep = density_downsample(x, y, budget)
+
+    assert len(keep) <= budget
+    assert len(np.unique(keep)) == len(keep)
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_density_downsample_budget_below_occupied_cells():
+    # Uniform points occupy nearly every cell of the full grid, far more than the budget
+    rng = np.random.default_rng(0)
+    x, y = rng.random(200_000), rng.random(200_000)
+    assert len(density_downsample(x, y, DOWNSAMPLE_GRID ** 2 // 4)) <= DOWNSAMPLE_GRID ** 2 // 4
+
+
+def test_density_downsample_keeps_outliers():
+    rng = np.random.default_rng(1)
+    x = np.r_[rng.normal(0, 1, 100_000), 1000.0]
+    y = np.r_[rng.normal(0, 1, 100_000), 1000.0]
+    assert len(x) - 1 in density_downsample(x, y, 1000)
+
+
+def test_density_downsample_small_input_untouched():
+    assert list(density_downsample([1, 2, 3], [3, 2, 1], 10)) == [0, 1, 2]
+
+
+def test_figure_payload_counts_data_arrays():
+    import plotly.graph_objects as go
+
+    values = np.random.default_rng(0).random(100_000)
+    fig = go.Figure(go.Scattergl(x=values, y=values, mode='markers'))
+    size = figure_payload_bytes(fig)
+    assert 2 * values.nbytes <= size < 2 * values.nbytes + 64 * 1024
+
+
+def test_figure_payload_counts_text_in_nested_lists():
+    import plotly.graph_objects as go
+
+    labels = np.array([f'Latitude 5400 unit {row:06d}' for row in range(20_000)], dtype=object)
+    fig = go.Figure(go.Table(cells={'values': [labels.tolist(), labels]}))
+    text_bytes = 2 * sum(len(label) for label in labels)
+    assert text_bytes <= figure_payload_bytes(fig) <= 1.2 * len(fig.to_json())
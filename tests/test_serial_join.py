@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Pricing.Serial_Join import join_on_serial, normalize_sn
+
+
+@pytest.fixture(scope='module')
+def frames():
+    rng = np.random.default_rng(0)
+    serials = np.array([f'5CD{number:07d}' for number in range(400)], dtype=object)
+
+    build = pd.DataFrame({
+        'SN': rng.choice(serials, 600),
+        'Item': rng.choice(['Latitude 5400', 'EliteBook 840'], 600),
+        'Price': rng.uniform(50, 300, 600)
+    })
+    build.loc[::37, 'SN'] = None
+
+    # The same serials as another export writes them: padded, lower case, or as numbers with '.0'
+    probe = pd.DataFrame({
+        'SN': rng.choice(serials, 900),
+        'Item': rng.choice(['Latitude 5400', 'EliteBook 840'], 900),
+        'Grade': rng.choice(['A', 'B', 'C'], 900)
+    })
+    probe['SN'] = [f' {sn.lower()} ' if row % 3 == 0 else sn for row, sn in enumerate(probe['SN'])]
+    probe.loc[::41, 'SN'] = 'N/A'
+    numbers = pd.DataFrame({'SN': ['1234567.0', 1234567, ' 7654321 '], 'Item': 'OptiPlex', 'Grade': 'A'})
+    build = pd.concat([build, pd.DataFrame({'SN': [1234567, '7654321.0'], 'Item': 'OptiPlex', 'Price': 80.0})],
+                      ignore_index=True)
+    return build, pd.concat([probe, numbers], ignore_index=True)
+
+
+def merged(build: pd.DataFrame, probe: pd.DataFrame) -> pd.DataFrame:
+    """pd.merge on the normalized serial numbers, keeping each one's first row on both sides"""
+    left = build.assign(key=normalize_sn(build['SN'])).dropna(subset=['key']).drop_duplicates('key')
+    right = probe.assign(key=normalize_sn(probe['SN'])).dropna(subset=['key']).drop_duplicates('key')
+    joined = pd.merge(left, right.drop(columns=['SN']), on='key', how='inner')
+    return joined.drop(columns=['key']).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('chunk_rows', [100_000, 64, 1])
+def test_join_on_serial_matches_merge(frames, chunk_rows):
+    build, probe = frames
+    joined, stats = join_on_serial(build, probe, chunk_rows=chunk_rows)
+
+    expected = merged(build, probe)
+    pd.testing.assert_frame_equal(joined, expected, check_dtype=False)
+    assert stats.matched_keys == len(expected)
+
+
+def test_join_on_serial_reads_probe_chunks(frames):
+    build, probe = frames
+    chunks = (probe.iloc[first:first + 100] for first in range(0, len(probe), 100))
+    joined, _ = join_on_serial(build, chunks)
+    pd.testing.assert_frame_equal(joined, merged(build, probe), check_dtype=False)
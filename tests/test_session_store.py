@@ -0,0 +1,41 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from Pricing.Dataset import ingest_pricing_history
+from Pricing.Session_Store import SessionStore, new_token
+
+
+def age(paths, seconds):
+    then = time.time() - seconds
+    for path in paths:
+        os.utime(path, (then, then))
+
+
+def test_using_a_session_keeps_it_alive(tmp_path, pricing_history):
+    store = SessionStore(directory=str(tmp_path), ttl_seconds=3600)
+    token = new_token()
+    store.put(token, ingest_pricing_history(pricing_history(200), 1))
+    paths = store._paths(token)
+
+    age(paths, 3000)  # uploaded long ago but still in use
+    first = store.get(token)
+    store.expire()
+
+    assert all(os.path.exists(path) for path in paths)
+    assert store.get(token) is first
+    assert store.reloads == 0
+
+
+def test_unused_session_expires(tmp_path, pricing_history):
+    store = SessionStore(directory=str(tmp_path), ttl_seconds=3600)
+    token = new_token()
+    store.put(token, ingest_pricing_history(pricing_history(200), 1))
+
+    age(store._paths(token), 7200)
+    store.expire()
+
+    assert store.get(token) is None
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from Pricing.Dataset import ingest_pricing_history
+from Pricing.Shared_Store import read_snapshot, write_snapshot
+
+
+def test_snapshot_round_trip_keeps_cube(tmp_path, pricing_history):
+    snapshot = ingest_pricing_history(pricing_history(), 1)
+    frame_path, cube_path = str(tmp_path / 'frame.arrow'), str(tmp_path / 'cube.arrow')
+
+    write_snapshot(frame_path, cube_path, snapshot)
+    loaded = read_snapshot(frame_path, cube_path)
+
+    pd.testing.assert_frame_equal(loaded.cube.groups, snapshot.cube.groups)
+    np.testing.assert_array_equal(loaded.cube.price_sketch, snapshot.cube.price_sketch)
+    np.testing.assert_array_equal(loaded.cube.cost_edges, snapshot.cube.cost_edges)
+    np.testing.assert_array_equal(loaded.cube.price_edges, snapshot.cube.price_edges)
+    assert loaded.version == snapshot.version
+
+
+def test_cube_file_is_not_a_pickle(tmp_path, pricing_history):
+    snapshot = ingest_pricing_history(pricing_history(100), 1)
+    cube_path = tmp_path / 'cube.arrow'
+    write_snapshot(str(tmp_path / 'frame.arrow'), str(cube_path), snapshot)
+    assert cube_path.read_bytes()[:6] == b'ARROW1'
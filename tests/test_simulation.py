@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from Pricing import Simulation
+from Pricing.Dataset import ingest_pricing_history
+from Pricing.Simulation import build_empirical_sales, simulate_lot
+
+LOT = [
+    {'item': 'Latitude 5400', 'condition': 'Used', 'quantity': 3},
+    {'item': 'EliteBook 840', 'condition': 'New', 'quantity': 2},
+    {'item': 'Unknown', 'condition': 'Used', 'quantity': 1}
+]
+
+
+@pytest.fixture(scope='module')
+def frame(pricing_history):
+    return ingest_pricing_history(pricing_history(2000), 1).frame
+
+
+@pytest.fixture(scope='module')
+def sales(frame):
+    return build_empirical_sales(frame)
+
+
+def test_a_fixed_seed_repeats_the_simulation(sales):
+    first = simulate_lot(sales, LOT, 500.0, scenarios=5000, seed=7)
+    again = simulate_lot(sales, LOT, 500.0, scenarios=5000, seed=7)
+    other = simulate_lot(sales, LOT, 500.0, scenarios=5000, seed=8)
+
+    np.testing.assert_array_equal(first.profit, again.profit)
+    np.testing.assert_array_equal(first.days_to_clear, again.days_to_clear)
+    assert first.quantiles == again.quantiles
+    assert not np.array_equal(first.profit, other.profit)
+
+
+def test_drawing_in_chunks_does_not_change_the_result(sales, monkeypatch):
+    whole = simulate_lot(sales, LOT, 500.0, scenarios=5000, seed=7)
+    monkeypatch.setattr(Simulation, 'DRAW_BUDGET', 60)
+    chunked = simulate_lot(sales, LOT, 500.0, scenarios=5000, seed=7)
+    np.testing.assert_array_equal(whole.profit, chunked.profit)
+
+
+def test_scenarios_stay_within_max_draws(sales, monkeypatch):
+    monkeypatch.setattr(Simulation, 'MAX_DRAWS', 1000)
+    result = simulate_lot(sales, LOT, 500.0, scenarios=5000, seed=7)
+    assert len(result.profit) == 1000 // 6
+
+    monkeypatch.setattr(Simulation, 'MAX_DRAWS', 3)
+    assert len(simulate_lot(sales, LOT, 500.0, scenarios=5000, seed=7).profit) == 1
+
+
+def test_one_unit_sells_like_a_past_sale_of_its_group(frame, sales):
+    result = simulate_lot(sales, [{'item': 'Latitude 5400', 'condition': 'Used', 'quantity': 1}], 100.0,
+                          scenarios=2000, seed=7)
+    group = frame[(frame['Item'] == 'Latitude 5400') & (frame['Condition'] == 'Used')]
+    net = (group['Profit'] + group['Purchase Cost']).to_numpy()
+
+    assert np.abs((result.profit + 100.0)[:, None] - net[None, :]).min(axis=1).max() < 1e-9
+    assert np.isin(result.days_to_clear, group['# Days to sell'].to_numpy()).all()
+    assert result.lines['basis'].tolist() == ['Item + Condition']
+
+
+def test_unknown_items_fall_back_to_broader_groups(sales):
+    result = simulate_lot(sales, LOT, 500.0, scenarios=100, seed=7)
+    assert result.lines['basis'].tolist() == ['Item + Condition', 'Item + Condition', 'Condition']
@@ -0,0 +1,13 @@
+import numpy as np
+import pytest
+
+from Pricing.Summary import top_positions
+
+
+@pytest.mark.parametrize('k', [-1, 0, 1, 3, 5, 10])
+@pytest.mark.parametrize('largest', [True, False])
+def test_top_positions_matches_full_sort(k, largest):
+    values = np.array([5.0, 1.0, np.nan, 9.0, 3.0, 7.0])
+    order = [position for position in np.argsort(-values if largest else values, kind='stable')
+             if not np.isnan(values[position])]
+    assert top_positions(values, k, largest).tolist() == order[:max(k, 0)]